@@ -24,6 +24,9 @@ from src.models.merchant import Merchant
 from src.models.product import ProductList
 from src.models.receipt_product import Product
 from src.models.measurement_unit import MeasurementUnit
+from src.models.stored_file import StoredFile
+from src.models.table_version import TableVersion
+from src.models.idempotency_key import IdempotencyKey
 # from src.models.user import User  # Adicione se existir
 
 target_metadata = Base.metadata
@@ -0,0 +1,84 @@
+"""purchase_date index on product, optional BRIN mode
+
+Revision ID: 125f354d8543
+Revises: ebe341433eb3
+Create Date: 2026-10-18 12:41:53.207161
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '125f354d8543'
+down_revision: Union[str, Sequence[str], None] = 'ebe341433eb3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copies of the src.services.index_services values as of this revision
+MODES = ('btree', 'brin')
+DEFAULT_PAGES_PER_RANGE = 32
+BRIN_INDEXES = {
+    'receipts': 'brin_receipts_purchase_date',
+    'product': 'brin_product_purchase_date',
+}
+
+
+def _concurrently() -> bool:
+    # CONCURRENTLY is not supported on partitioned tables
+    if context.is_offline_mode():
+        return True
+    conn = op.get_bind()
+    if conn.dialect.name != 'postgresql':
+        return True
+    return not conn.execute(
+        sa.text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('product'))")
+    ).scalar()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # `alembic -x purchase_date_index=brin [-x brin_pages_per_range=32] upgrade head`
+    x_args = context.get_x_argument(as_dictionary=True)
+    mode = x_args.get('purchase_date_index', 'btree')
+    pages_per_range = int(x_args.get('brin_pages_per_range', DEFAULT_PAGES_PER_RANGE))
+    if mode not in MODES:
+        raise ValueError(f"purchase_date_index must be one of {MODES}")
+
+    concurrently = _concurrently()
+    with op.get_context().autocommit_block():
+        if mode == 'btree':
+            op.create_index(
+                'idx_product_purchase_date', 'product', ['purchase_date'], unique=False,
+                postgresql_include=['receipt_id', 'product_list_id', 'line_total'],
+                postgresql_concurrently=concurrently, if_not_exists=True
+            )
+        else:
+            for table, name in BRIN_INDEXES.items():
+                op.create_index(
+                    name, table, ['purchase_date'], unique=False, postgresql_using='brin',
+                    postgresql_with={'pages_per_range': pages_per_range, 'autosummarize': 'on'},
+                    postgresql_concurrently=concurrently, if_not_exists=True
+                )
+            op.drop_index(
+                'idx_receipts_purchase_date_id', table_name='receipts',
+                postgresql_concurrently=concurrently, if_exists=True
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    concurrently = _concurrently()
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_receipts_purchase_date_id', 'receipts', ['purchase_date', 'id'], unique=False,
+            postgresql_include=['merchant_id'], postgresql_concurrently=concurrently, if_not_exists=True
+        )
+        for table, name in BRIN_INDEXES.items():
+            op.drop_index(name, table_name=table, postgresql_concurrently=concurrently, if_exists=True)
+        op.drop_index(
+            'idx_product_purchase_date', table_name='product',
+            postgresql_concurrently=concurrently, if_exists=True
+        )
@@ -0,0 +1,43 @@
+"""add stored_file (content-addressed uploads)
+
+Revision ID: 4c1e7b9d2a60
+Revises: 938f0085bc10
+Create Date: 2026-10-18 14:02:37.519843
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c1e7b9d2a60'
+down_revision: Union[str, Sequence[str], None] = '938f0085bc10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('stored_file',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('path', sa.String(length=500), nullable=False),
+    sa.Column('content_type', sa.String(length=100), nullable=False),
+    sa.Column('size_bytes', sa.Integer(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.CheckConstraint('ref_count >= 0', name='constraint_check_stored_file_ref_count_negative'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('path')
+    )
+    op.create_index(op.f('ix_stored_file_id'), 'stored_file', ['id'], unique=False)
+    op.create_index(op.f('ix_stored_file_sha256'), 'stored_file', ['sha256'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_stored_file_sha256'), table_name='stored_file')
+    op.drop_index(op.f('ix_stored_file_id'), table_name='stored_file')
+    op.drop_table('stored_file')
@@ -0,0 +1,42 @@
+"""add product line_total
+
+Revision ID: 60b3b27d5c62
+Revises: 6a06879cdf32
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '60b3b27d5c62'
+down_revision: Union[str, Sequence[str], None] = '6a06879cdf32'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Adding a STORED generated column rewrites the table, so every existing
+    # row is backfilled with round(price * quantity, 2) by PostgreSQL itself.
+    op.add_column(
+        'product',
+        sa.Column('line_total', sa.Numeric(20, 2), sa.Computed('round(price * quantity, 2)', persisted=True), nullable=True)
+    )
+    # Covering index: receipt totals are answered with index-only scans.
+    # It replaces the plain receipt_id index.
+    op.create_index(
+        'idx_product_receipt_id_covering', 'product', ['receipt_id'], unique=False,
+        postgresql_include=['line_total', 'product_list_id']
+    )
+    op.drop_index(op.f('ix_product_receipt_id'), table_name='product')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_product_receipt_id'), 'product', ['receipt_id'], unique=False)
+    op.drop_index('idx_product_receipt_id_covering', table_name='product')
+    op.drop_column('product', 'line_total')
@@ -0,0 +1,30 @@
+"""add photo variants
+
+Revision ID: 938f0085bc10
+Revises: 125f354d8543
+Create Date: 2026-10-18 13:20:11.804512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '938f0085bc10'
+down_revision: Union[str, Sequence[str], None] = '125f354d8543'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('product_list', sa.Column('product_list_photo_variants', sa.JSON(), nullable=True))
+    op.add_column('receipts', sa.Column('receipt_photo_variants', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('receipts', 'receipt_photo_variants')
+    op.drop_column('product_list', 'product_list_photo_variants')
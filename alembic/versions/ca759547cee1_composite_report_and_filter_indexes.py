@@ -0,0 +1,72 @@
+"""composite report and filter indexes
+
+Revision ID: ca759547cee1
+Revises: 60b3b27d5c62
+Create Date: 2026-10-18 11:04:09.552317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ca759547cee1'
+down_revision: Union[str, Sequence[str], None] = '60b3b27d5c62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction block.
+    # Building concurrently does not lock out writes, so this can be applied
+    # without downtime. If a concurrent build fails it leaves an INVALID
+    # index: drop it and re-run the upgrade.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_receipts_merchant_date_id', 'receipts',
+            ['merchant_id', sa.text('purchase_date DESC'), 'id'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'idx_receipts_barcode', 'receipts', ['barcode'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'idx_receipts_purchase_date_id', 'receipts', ['purchase_date', 'id'],
+            unique=False, postgresql_include=['merchant_id'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'idx_product_product_list_receipt', 'product', ['product_list_id', 'receipt_id'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True
+        )
+
+        # Superseded by the composite indexes above (same leading column)
+        op.drop_index(
+            op.f('ix_receipts_purchase_date'), table_name='receipts',
+            postgresql_concurrently=True, if_exists=True
+        )
+        op.drop_index(
+            op.f('ix_product_product_list_id'), table_name='product',
+            postgresql_concurrently=True, if_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f('ix_product_product_list_id'), 'product', ['product_list_id'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            op.f('ix_receipts_purchase_date'), 'receipts', ['purchase_date'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True
+        )
+        op.drop_index('idx_product_product_list_receipt', table_name='product', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('idx_receipts_purchase_date_id', table_name='receipts', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('idx_receipts_barcode', table_name='receipts', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('idx_receipts_merchant_date_id', table_name='receipts', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,51 @@
+"""add product search indexes
+
+Revision ID: e4a9c2d7b815
+Revises: b83e0f6d4c17
+Create Date: 2026-10-19 14:22:47.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a9c2d7b815'
+down_revision: Union[str, Sequence[str], None] = 'b83e0f6d4c17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # gist_trgm_ops (trigram word similarity) comes from pg_trgm
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # Built concurrently (outside a transaction) so product_list stays writable.
+    # A failed concurrent build leaves an INVALID index: drop it and re-run.
+    with op.get_context().autocommit_block():
+        # "C" collation: prefix LIKE is an index range scan, in ORDER BY order
+        op.create_index(
+            'idx_product_list_barcode_prefix', 'product_list', [sa.text('barcode COLLATE "C"')],
+            unique=False, postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'idx_product_list_name_prefix', 'product_list', [sa.text('lower(name) COLLATE "C"')],
+            unique=False, postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'idx_product_list_name_trgm', 'product_list', ['name'],
+            unique=False, postgresql_using='gist', postgresql_ops={'name': 'gist_trgm_ops'},
+            postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('idx_product_list_name_trgm', table_name='product_list', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('idx_product_list_name_prefix', table_name='product_list', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('idx_product_list_barcode_prefix', table_name='product_list', postgresql_concurrently=True, if_exists=True)
+    # pg_trgm is left installed: other objects may use it
@@ -0,0 +1,196 @@
+"""product purchase_date, optional partitioning
+
+Revision ID: ebe341433eb3
+Revises: ca759547cee1
+Create Date: 2026-10-18 12:02:37.418820
+
+"""
+from datetime import date
+from typing import List, Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ebe341433eb3'
+down_revision: Union[str, Sequence[str], None] = 'ca759547cee1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Frozen copy of the conversion in src/services/partition_services.py as of
+# this revision (the service may change later; this migration must not)
+
+PARTITIONED_TABLES = ('receipts', 'product')
+PARTITION_KEY = 'purchase_date'
+MONTHS_AHEAD = 3
+
+
+def _month_start(value: date) -> date:
+    return value.replace(day=1)
+
+
+def _add_months(value: date, months: int) -> date:
+    index = value.year * 12 + (value.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _is_partitioned(conn, table: str) -> bool:
+    if conn.dialect.name != 'postgresql':
+        return False
+    return bool(conn.execute(
+        sa.text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:t))"),
+        {'t': table},
+    ).scalar())
+
+
+def _insertable_columns(conn, table: str) -> List[str]:
+    return list(conn.execute(
+        sa.text(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = :t AND is_generated = 'NEVER' "
+            "ORDER BY ordinal_position"
+        ),
+        {'t': table},
+    ).scalars())
+
+
+def _index_definitions(conn, table: str) -> List[str]:
+    definitions = conn.execute(
+        sa.text(
+            "SELECT pg_get_indexdef(indexrelid) FROM pg_index "
+            "WHERE indrelid = to_regclass(:t) AND NOT indisprimary"
+        ),
+        {'t': table},
+    ).scalars()
+    return [definition.replace(' ON ONLY ', ' ON ') for definition in definitions]
+
+
+def _foreign_keys(conn, table: str) -> list:
+    return [tuple(row) for row in conn.execute(
+        sa.text(
+            "SELECT conname, confrelid::regclass::text, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE contype = 'f' AND conparentid = 0 AND conrelid = to_regclass(:t)"
+        ),
+        {'t': table},
+    )]
+
+
+def _incoming_foreign_keys(conn) -> list:
+    return [tuple(row) for row in conn.execute(sa.text(
+        "SELECT conrelid::regclass::text, conname, confrelid::regclass::text FROM pg_constraint "
+        "WHERE contype = 'f' AND conparentid = 0 "
+        "AND confrelid IN (to_regclass('receipts'), to_regclass('product'))"
+    ))]
+
+
+def _rebuild(conn, table: str, partitioned: bool, first: date, last: date) -> None:
+    legacy = f'{table}_legacy'
+    columns = ', '.join(_insertable_columns(conn, table))
+    indexes = _index_definitions(conn, table)
+    foreign_keys = [
+        (name, definition) for name, referenced, definition in _foreign_keys(conn, table)
+        if referenced != 'receipts'
+    ]
+    sequence = conn.execute(sa.text("SELECT pg_get_serial_sequence(:t, 'id')"), {'t': table}).scalar()
+
+    conn.execute(sa.text(f'ALTER TABLE {table} RENAME TO {legacy}'))
+    conn.execute(sa.text(
+        f'CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED)'
+        + (f' PARTITION BY RANGE ({PARTITION_KEY})' if partitioned else '')
+    ))
+    if partitioned:
+        month = first
+        while month <= last:
+            conn.execute(sa.text(
+                f'CREATE TABLE IF NOT EXISTS {table}_p{month.year:04d}_{month.month:02d} PARTITION OF {table} '
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+            ))
+            month = _add_months(month, 1)
+        conn.execute(sa.text(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT'))
+
+    conn.execute(sa.text(f'INSERT INTO {table} ({columns}) SELECT {columns} FROM {legacy}'))
+    if sequence:
+        conn.execute(sa.text(f'ALTER SEQUENCE {sequence} OWNED BY {table}.id'))
+    conn.execute(sa.text(f'DROP TABLE {legacy}'))
+
+    primary_key = f'id, {PARTITION_KEY}' if partitioned else 'id'
+    conn.execute(sa.text(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY ({primary_key})'))
+    for definition in indexes:
+        conn.execute(sa.text(definition))
+    for name, definition in foreign_keys:
+        conn.execute(sa.text(f'ALTER TABLE {table} ADD CONSTRAINT {name} {definition}'))
+
+
+def _convert(conn, partitioned: bool) -> None:
+    """Rebuild receipts and product as monthly range-partitioned (or plain) tables."""
+    if conn.dialect.name != 'postgresql':
+        raise RuntimeError("Table partitioning requires PostgreSQL")
+    unexpected = [
+        f'{source}.{name} -> {target}'
+        for source, name, target in _incoming_foreign_keys(conn)
+        if (source, target) != ('product', 'receipts')
+    ]
+    if unexpected:
+        raise RuntimeError(f"Foreign keys would break; convert them first: {', '.join(unexpected)}")
+
+    for name, referenced, _ in _foreign_keys(conn, 'product'):
+        if referenced == 'receipts':
+            conn.execute(sa.text(f'ALTER TABLE product DROP CONSTRAINT {name}'))
+
+    first_date = conn.execute(sa.text(f'SELECT min({PARTITION_KEY}) FROM receipts')).scalar()
+    current = _month_start(date.today())
+    first = _month_start(first_date) if first_date else current
+    last = _add_months(current, MONTHS_AHEAD if partitioned else 0)
+
+    for table in PARTITIONED_TABLES:
+        _rebuild(conn, table, partitioned, first, last)
+
+    if partitioned:
+        conn.execute(sa.text(
+            "ALTER TABLE product ADD CONSTRAINT product_receipt_id_purchase_date_fkey "
+            "FOREIGN KEY (receipt_id, purchase_date) REFERENCES receipts (id, purchase_date) "
+            "ON UPDATE CASCADE ON DELETE CASCADE"
+        ))
+    else:
+        conn.execute(sa.text(
+            "ALTER TABLE product ADD CONSTRAINT product_receipt_id_fkey "
+            "FOREIGN KEY (receipt_id) REFERENCES receipts (id) ON DELETE CASCADE"
+        ))
+    for table in PARTITIONED_TABLES:
+        conn.execute(sa.text(f'ANALYZE {table}'))
+
+
+def _partitioning_requested() -> bool:
+    """`alembic -x partition=true upgrade head` also converts the tables."""
+    value = context.get_x_argument(as_dictionary=True).get('partition', '')
+    return value.lower() in ('1', 'true', 'yes')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Denormalized copy of receipts.purchase_date: the partition key of product
+    op.add_column('product', sa.Column('purchase_date', sa.Date(), nullable=True))
+    op.execute(
+        "UPDATE product SET purchase_date = "
+        "(SELECT receipts.purchase_date FROM receipts WHERE receipts.id = product.receipt_id)"
+    )
+    op.alter_column('product', 'purchase_date', existing_type=sa.Date(), nullable=False)
+
+    if _partitioning_requested():
+        if context.is_offline_mode():
+            raise RuntimeError("Partitioning inspects the live schema; it cannot run with --sql")
+        conn = op.get_bind()
+        if not all(_is_partitioned(conn, table) for table in PARTITIONED_TABLES):
+            _convert(conn, partitioned=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # The partition key cannot be dropped from a partitioned table
+    if not context.is_offline_mode():
+        conn = op.get_bind()
+        if any(_is_partitioned(conn, table) for table in PARTITIONED_TABLES):
+            _convert(conn, partitioned=False)
+    op.drop_column('product', 'purchase_date')
@@ -22,5 +22,8 @@ python -m src.scripts.load_json_to_db --generate sample.json --products 200 --re
 echo "📥 Loading sample.json..."
 python -m src.scripts.load_json_to_db sample.json
 
+echo "🗜️  Precompressing static assets..."
+python -m src.scripts.compress_static
+
 echo "✅ DB ready, starting uvicorn..."
 exec uvicorn src.main:app --host 0.0.0.0 --port 8000 --reload
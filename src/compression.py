@@ -0,0 +1,270 @@
+# src/compression.py
+
+"""
+Negotiated response compression (zstd, brotli, gzip) as ASGI middleware.
+
+Responses are compressed when the client accepts one of the encodings,
+the content type is text-like (JSON, CSV, HTML, JS...) and the body is at
+least `minimum_size` bytes. Bodies are compressed chunk by chunk as the app
+sends them: streamed responses (exports) stay streamed and a large JSON
+body is never held twice in memory. Big chunks are compressed in a worker
+thread (the compressors release the GIL) so the event loop keeps serving.
+
+Left untouched: responses that already have a Content-Encoding (e.g. the
+precompressed static files), partial content (206) and bodiless statuses.
+A compressed response's strong ETag is made weak (the bytes differ from
+the identity representation); a 304 gets the weak form only when the
+client revalidates with it, i.e. when the 200 it has was compressed here.
+
+brotli and zstd need the optional 'brotli' / 'zstandard' packages; gzip is
+always available. `stats` keeps the totals (bytes in/out per encoding).
+"""
+
+import logging
+import threading
+import zlib
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.static_files import negotiate_encoding
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/x-ndjson",
+    "image/svg+xml",
+)
+# Chunks above this size are compressed off the event loop
+THREAD_THRESHOLD = 256 * 1024
+
+
+class _GzipEncoder:
+    def __init__(self, level: int) -> None:
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliEncoder:
+    def __init__(self, level: int) -> None:
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _ZstdEncoder:
+    def __init__(self, level: int) -> None:
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+def available_encodings() -> List[str]:
+    """Supported Content-Encodings, in order of preference."""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return encodings
+
+
+@dataclass
+class CompressionStats:
+    """Totals since startup, per encoding."""
+    responses: Dict[str, int] = field(default_factory=dict)
+    bytes_in: Dict[str, int] = field(default_factory=dict)
+    bytes_out: Dict[str, int] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, encoding: str, bytes_in: int, bytes_out: int) -> None:
+        with self._lock:
+            self.responses[encoding] = self.responses.get(encoding, 0) + 1
+            self.bytes_in[encoding] = self.bytes_in.get(encoding, 0) + bytes_in
+            self.bytes_out[encoding] = self.bytes_out.get(encoding, 0) + bytes_out
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            encodings = {
+                encoding: {
+                    "responses": self.responses[encoding],
+                    "bytes_in": self.bytes_in[encoding],
+                    "bytes_out": self.bytes_out[encoding],
+                    "bytes_saved": self.bytes_in[encoding] - self.bytes_out[encoding],
+                }
+                for encoding in self.responses
+            }
+        return {
+            "encodings": encodings,
+            "bytes_saved": sum(e["bytes_saved"] for e in encodings.values()),
+        }
+
+
+stats = CompressionStats()
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        zstd_level: int = 3,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encoders: Dict[str, Callable[[], object]] = {"gzip": lambda: _GzipEncoder(gzip_level)}
+        if brotli is not None:
+            self.encoders["br"] = lambda: _BrotliEncoder(brotli_quality)
+        if zstandard is not None:
+            self.encoders["zstd"] = lambda: _ZstdEncoder(zstd_level)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"), available_encodings())
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        responder = _CompressingResponder(self, encoding, send, if_none_match)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:
+    """Per-request state: waits for the first body chunk to decide, then encodes every chunk."""
+
+    def __init__(
+        self, middleware: CompressionMiddleware, encoding: str, send: Send, if_none_match: Optional[str] = None
+    ) -> None:
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self.if_none_match = if_none_match
+        self.start: Optional[Message] = None
+        self.encoder = None
+        self.passthrough = False
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = (
+                message["status"] in (204, 206, 304)
+                or "content-encoding" in headers
+                or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+                or int(headers.get("content-length", self.middleware.minimum_size)) < self.middleware.minimum_size
+            )
+            if message["status"] == 304 and self._revalidates_weak_etag(headers.get("etag")):
+                # Same validator as the compressed 200 the client revalidates
+                message = {**message, "headers": self._weak_etag(MutableHeaders(raw=list(message["headers"]))).raw}
+            if self.passthrough:
+                await self._send(message)
+            return
+
+        if self.passthrough or message["type"] != "http.response.body":
+            # e.g. http.response.pathsend: the server sends the file itself
+            if self.start is not None and not self.passthrough:
+                await self._send(self.start)
+                self.passthrough = True
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.encoder is None:
+            if not more_body and len(body) < self.middleware.minimum_size:
+                # Whole body known and small: not worth it
+                self.passthrough = True
+                await self._send(self.start)
+                await self._send(message)
+                return
+            self.encoder = self.middleware.encoders[self.encoding]()
+            data = await self._encode(body, more_body)
+            # Single-chunk bodies keep a Content-Length; streams go chunked
+            await self._send(self._compressed_start(None if more_body else len(data)))
+        else:
+            data = await self._encode(body, more_body)
+
+        await self._send({"type": "http.response.body", "body": data, "more_body": more_body})
+        if not more_body:
+            stats.record(self.encoding, self.bytes_in, self.bytes_out)
+
+    async def _encode(self, body: bytes, more_body: bool) -> bytes:
+        self.bytes_in += len(body)
+        if len(body) > THREAD_THRESHOLD:
+            data = await anyio.to_thread.run_sync(self.encoder.compress, body)
+        else:
+            data = self.encoder.compress(body)
+        if not more_body:
+            data += self.encoder.finish()
+        self.bytes_out += len(data)
+        return data
+
+    def _revalidates_weak_etag(self, etag: Optional[str]) -> bool:
+        """
+        Whether the client sent the weak form of a strong `etag`: only the
+        200s compressed here have it (a 304 does not tell whether its 200
+        would have been compressed: passed through, too small...).
+        """
+        if not etag or etag.startswith("W/") or not self.if_none_match:
+            return False
+        return f"W/{etag}" in (candidate.strip() for candidate in self.if_none_match.split(","))
+
+    @staticmethod
+    def _weak_etag(headers: MutableHeaders) -> MutableHeaders:
+        # The compressed bytes differ from the identity representation
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+        return headers
+
+    def _compressed_start(self, content_length: Optional[int]) -> Message:
+        headers = MutableHeaders(raw=list(self.start["headers"]))
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        self._weak_etag(headers)
+        if content_length is None:
+            del headers["content-length"]
+        else:
+            headers["Content-Length"] = str(content_length)
+        return {**self.start, "headers": headers.raw}
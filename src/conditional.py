@@ -0,0 +1,116 @@
+# src/conditional.py
+
+"""
+Conditional GET for read endpoints backed by table change counters.
+
+    @router.get("/", dependencies=[Depends(versioned("merchants"))])
+
+`versioned(*tables)` reads the counters of `tables` (services/table_versions)
+before the endpoint runs. If the request's `If-None-Match` matches the
+resulting ETag (or, without it, `If-Modified-Since` is not older than the
+last write), the request ends there with 304 Not Modified: no rows are
+loaded and nothing is serialized. Otherwise the endpoint runs and
+`ConditionalRoute` adds `ETag`, `Last-Modified` and `Cache-Control: no-cache`
+(always revalidate) to its 200 response.
+
+For a single resource, `versioned(..., model=Receipt, id_param="receipt_id")`
+first checks that the row exists (one primary-key query, 404 if not) and
+puts its ID in the ETag, so the ETag of one resource never validates
+another and `If-None-Match: *` only matches a resource that exists.
+
+Routers opt in with `APIRouter(route_class=ConditionalRoute)`.
+"""
+
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Callable, Optional
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.routing import APIRoute
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from src.database import get_db
+from src.services import table_versions
+
+_SCOPE_KEY = "conditional_headers"
+
+
+def _http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison (RFC 9110): W/ prefixes are ignored."""
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def _not_modified_since(header: str, modified: Optional[datetime]) -> bool:
+    if modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if modified.tzinfo is None:
+        modified = modified.replace(tzinfo=timezone.utc)
+    # HTTP dates have whole seconds
+    return modified.replace(microsecond=0) <= since
+
+
+def versioned(*tables: str, model: Any = None, id_param: Optional[str] = None) -> Callable:
+    """
+    Dependency answering 304 when none of `tables` changed since the client's copy.
+    With `model`, the row whose ID is the path parameter `id_param` must exist (404 otherwise).
+    """
+
+    def check(request: Request, db: Session = Depends(get_db)) -> None:
+        resource = None
+        if model is not None:
+            row_id = request.path_params.get(id_param, "")
+            if not row_id.isdigit():
+                return  # left to the endpoint's validation
+            if db.scalar(select(model.id).where(model.id == int(row_id))) is None:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{model.__name__} not found")
+            resource = f"{model.__tablename__}:{int(row_id)}"
+
+        versions = table_versions.get_versions(db, tables)
+        etag = table_versions.etag(versions, resource)
+        modified = table_versions.last_modified(versions)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if modified is not None:
+            headers["Last-Modified"] = _http_date(modified)
+
+        if_none_match = request.headers.get("if-none-match")
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_none_match is not None:
+            not_modified = _etag_matches(if_none_match, etag)
+        else:
+            not_modified = if_modified_since is not None and _not_modified_since(if_modified_since, modified)
+        if not_modified:
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        request.scope[_SCOPE_KEY] = headers
+
+    return check
+
+
+class ConditionalRoute(APIRoute):
+    """Adds the validators computed by `versioned` to successful responses."""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request):
+            response = await handler(request)
+            headers = request.scope.get(_SCOPE_KEY)
+            if headers and response.status_code == status.HTTP_200_OK:
+                response.headers.update(headers)
+            return response
+
+        return route_handler
@@ -0,0 +1,148 @@
+# src/idempotency.py
+
+"""
+`Idempotency-Key` support for create endpoints.
+
+A client that may retry a POST sends a unique key with it:
+
+    POST /receipts
+    Idempotency-Key: 5f1c2a0e-...
+
+The first request runs normally and its successful response is stored
+(services/idempotency_services) in the same transaction as the changes it
+reports, so a stored response always means the changes were committed and
+the reverse. A retry with the same key and body gets the
+stored response back, with `Idempotent-Replayed: true`, without running the
+endpoint again. The same key with a different body is rejected (422), and a
+retry that arrives while the first request is still running gets 409.
+Failed requests are not stored: retrying them runs them again.
+
+Endpoints opt in with the `idempotency_key` dependency:
+
+    def create_receipt(..., idempotency: Idempotency = Depends(idempotency_key)):
+        if idempotency.replay is not None:
+            return idempotency.replay
+        db_receipt = ReceiptService.create_receipt(
+            db, receipt, before_commit=idempotency.before_commit(db, ReceiptSchema, status_code=201)
+        )
+        return idempotency.respond(ReceiptSchema, db_receipt, status_code=201)
+
+The service calls `before_commit` with its result just before committing.
+
+Keys are kept for IDEMPOTENCY_TTL_HOURS.
+"""
+
+import hashlib
+import logging
+from datetime import timedelta
+from typing import Any, AsyncIterator, Callable, Optional
+
+from fastapi import HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from starlette.responses import Response
+
+from src.database import SessionLocal
+from src.responses import dump_json, fast_response
+from src.services import idempotency_services
+from src.settings import settings
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+
+class Idempotency:
+    """The idempotency state of one request."""
+
+    def __init__(self, record_id: Optional[int] = None, replay: Optional[Response] = None):
+        self.record_id = record_id
+        # Stored response of an earlier request with the same key
+        self.replay = replay
+        # Response stored by before_commit, returned by respond()
+        self.response: Optional[Response] = None
+        self.completed = False
+
+    def before_commit(self, db: Any, schema: Any, status_code: int = 200) -> Optional[Callable[[Any], None]]:
+        """
+        Callback for a service's `before_commit`: stores the response for its
+        result in `db`'s open transaction. None when the request has no key.
+        """
+        if self.record_id is None:
+            return None
+
+        def store(content: Any) -> None:
+            response = Response(dump_json(schema, content), status_code=status_code, media_type="application/json")
+            idempotency_services.complete(db, self.record_id, idempotency_services.StoredResponse(
+                status_code=response.status_code, body=response.body, content_type=response.media_type
+            ))
+            self.response = response
+
+        return store
+
+    def respond(self, schema: Any, content: Any, status_code: int = 200) -> Any:
+        """The response stored by before_commit, or the response for `content` (see fast_response)."""
+        if self.response is not None:
+            self.completed = True
+            return self.response
+        return fast_response(schema, content, status_code=status_code)
+
+
+def _reserve(key: str, method: str, path: str, request_hash: str) -> idempotency_services.Reservation:
+    with SessionLocal() as db:
+        return idempotency_services.reserve(
+            db, key, method, path, request_hash, timedelta(hours=settings.idempotency_ttl_hours)
+        )
+
+
+def _release(record_id: int) -> None:
+    with SessionLocal() as db:
+        idempotency_services.release(db, record_id)
+
+
+async def idempotency_key(request: Request) -> AsyncIterator[Idempotency]:
+    """Dependency: reserve the request's Idempotency-Key, or find the stored response."""
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if key is None:
+        yield Idempotency()
+        return
+    if not key.strip() or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{IDEMPOTENCY_HEADER} must be 1 to {MAX_KEY_LENGTH} characters"
+        )
+
+    request_hash = hashlib.sha256(await request.body()).hexdigest()
+    reservation = await run_in_threadpool(_reserve, key, request.method, request.url.path, request_hash)
+
+    if reservation.outcome == "mismatch":
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail=f"{IDEMPOTENCY_HEADER} was already used with a different request"
+        )
+    if reservation.outcome == "in_progress":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"A request with this {IDEMPOTENCY_HEADER} is still being processed",
+            headers={"Retry-After": "1"}
+        )
+    if reservation.outcome == "replay":
+        stored = reservation.response
+        logger.info(f"Replaying stored response for {request.method} {request.url.path}")
+        yield Idempotency(replay=Response(
+            stored.body,
+            status_code=stored.status_code,
+            media_type=stored.content_type,
+            headers={REPLAYED_HEADER: "true"},
+        ))
+        return
+
+    idempotency = Idempotency(record_id=reservation.record_id)
+    try:
+        yield idempotency
+    finally:
+        # Also after a failure once the response was committed: release() keeps
+        # a stored response, so a retry replays it instead of running again
+        if not idempotency.completed:
+            await run_in_threadpool(_release, reservation.record_id)
@@ -3,10 +3,9 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pathlib import Path
+import asyncio
 import logging
 import time
 
@@ -17,8 +16,17 @@ from src.routers import (
     merchants, 
     measurement_units,
     reports,  
-    uploads   
+    uploads,
+    exports
 )
+from src.database import SessionLocal, engine
+from src.settings import settings
+from src.static_files import CachedStaticFiles, IMMUTABLE
+from src import compression
+from src.page_cache import PageCache
+from src.responses import FastJSONResponse
+from src.services.analytics_snapshot import snapshot as analytics_snapshot
+from src.services import partition_services, image_services, upload_gc_services
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -28,6 +36,8 @@ UPLOAD_DIR = BASE_DIR / "uploads"
 
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
+page_cache = PageCache(STATIC_DIR)
+
 # Logs Directory
 LOG_DIR = BASE_DIR / "logs"
 LOG_DIR.mkdir(parents=True, exist_ok=True)
@@ -52,15 +62,78 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+PARTITION_MAINTENANCE_INTERVAL = 24 * 60 * 60  # seconds
+
+
+def _ensure_partitions() -> None:
+    with engine.begin() as conn:
+        partition_services.ensure_future_partitions(conn, settings.partition_months_ahead)
+
+
+async def _partition_maintenance():
+    """Keep the monthly partitions of receipts/product created ahead of time."""
+    while True:
+        try:
+            await asyncio.to_thread(_ensure_partitions)
+        except Exception as e:
+            logger.error(f"Partition maintenance failed: {str(e)}", exc_info=True)
+        await asyncio.sleep(PARTITION_MAINTENANCE_INTERVAL)
+
+
+def _collect_orphaned_uploads() -> None:
+    with SessionLocal() as db:
+        upload_gc_services.collect_orphans(
+            db,
+            grace_seconds=settings.upload_gc_grace_hours * 60 * 60,
+            quarantine=settings.upload_gc_quarantine,
+        )
+
+
+async def _upload_gc():
+    """Periodically remove uploaded files no product/receipt references."""
+    while True:
+        try:
+            await asyncio.to_thread(_collect_orphaned_uploads)
+        except Exception as e:
+            logger.error(f"Upload GC failed: {str(e)}", exc_info=True)
+        await asyncio.sleep(settings.upload_gc_interval_hours * 60 * 60)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     logger.info("Infinexpense API starting up...")
     logger.info(f"Static directory: {STATIC_DIR}")
     logger.info(f"Upload directory: {UPLOAD_DIR}")
+    if settings.analytics_snapshot_enabled:
+        try:
+            with SessionLocal() as db:
+                analytics_snapshot.build(db)
+        except Exception as e:
+            # Reports keep working through the SQL path
+            logger.error(f"Could not build analytics snapshot: {str(e)}", exc_info=True)
+    maintenance_task = None
+    if settings.partition_maintenance_enabled:
+        maintenance_task = asyncio.create_task(_partition_maintenance())
+    page_cache.refresh_if_changed()
+    page_cache_task = None
+    if settings.page_cache_reload:
+        page_cache_task = asyncio.create_task(page_cache.watch())
+    gc_task = None
+    if settings.upload_gc_enabled:
+        gc_task = asyncio.create_task(_upload_gc())
     yield
     # Shutdown
     logger.info("Infinexpense API shutting down...")
+    if maintenance_task is not None:
+        maintenance_task.cancel()
+    if gc_task is not None:
+        gc_task.cancel()
+    if page_cache_task is not None:
+        page_cache_task.cancel()
+    image_services.shutdown()
+    if settings.compression_enabled:
+        logger.info(f"Response compression: {compression.stats.snapshot()}")
 
 
 app = FastAPI(
@@ -68,6 +141,8 @@ app = FastAPI(
     description="See Where Your Money Really Goes.",
     version="0.1.0",
     lifespan=lifespan,
+    # Endpoints that go through response_model are rendered with orjson (if installed)
+    default_response_class=FastJSONResponse,
 )
 
 app.add_middleware(
@@ -78,6 +153,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.compression_enabled:
+    app.add_middleware(
+        compression.CompressionMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        gzip_level=settings.compression_gzip_level,
+        brotli_quality=settings.compression_brotli_quality,
+        zstd_level=settings.compression_zstd_level,
+    )
+
 # Middleware para logar requests
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
@@ -103,72 +187,51 @@ app.include_router(merchants.router)
 app.include_router(measurement_units.router)
 app.include_router(reports.router)
 app.include_router(uploads.router)
+app.include_router(exports.router)
 
 logger.info("All routers registered successfully")
 
 
-# Montagem de Ficheiros Estáticos (Static Files)
-# Para o Frontend (HTML/CSS/JS)
-app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
-
-# Para as Fotos dos Produtos
-app.mount("/css", StaticFiles(directory=str(STATIC_DIR / "css")), name="css")
-app.mount("/js", StaticFiles(directory=str(STATIC_DIR / "js")), name="js")
-app.mount("/images", StaticFiles(directory=str(STATIC_DIR / "images")), name="images")
-app.mount("/templates", StaticFiles(directory=str(STATIC_DIR / "templates")), name="templates")
-app.mount("/api", StaticFiles(directory=str(STATIC_DIR / "api")), name="api")
-app.mount("/category", StaticFiles(directory=str(STATIC_DIR / "category")), name="category")
-app.mount("/merchant", StaticFiles(directory=str(STATIC_DIR / "merchant")), name="merchant")
-app.mount("/product", StaticFiles(directory=str(STATIC_DIR / "product")), name="product")
-app.mount("/receipt", StaticFiles(directory=str(STATIC_DIR / "receipt")), name="receipt")
-app.mount("/docs", StaticFiles(directory=str(STATIC_DIR / "docs")), name="docs")
-app.mount("/uploads", StaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
-
-
-@app.get("/", include_in_schema=False)
-def read_root():
+# Páginas HTML (servidas da memória, ver src/page_cache.py)
+# Registadas antes das montagens estáticas para terem prioridade sobre elas
+@app.api_route("/", methods=["GET", "HEAD"], include_in_schema=False)
+def read_root(request: Request):
     """Serve the homepage from static directory."""
-    index_path = STATIC_DIR / "index.html"
-    if not index_path.is_file():
-        return {"error": "index.html not found in static directory"}, 404
-    return FileResponse(index_path)
-
-@app.get("/index.html", include_in_schema=False)
-def read_index():
-    """Serve index.html directly."""
-    index_path = STATIC_DIR / "index.html"
-    if not index_path.is_file():
-        logger.warning("index.html not found in static directory")
-        return {"error": "index.html not found in static directory"}, 404
-    return FileResponse(index_path)
-
-
-# Serve HTML pages from subdirectories (receipts, products, categories, merchants)
-@app.get("/{folder}/{page}", include_in_schema=False)
-def serve_page(folder: str, page: str):
-    """
-    Serve HTML pages from subdirectories like /receipts/list.html, /products/add.html, etc.
-    """
-    # Only serve HTML files, reject other extensions
-    if not page.endswith('.html'):
-        return {"error": "Not found"}, 404
-    
-    file_path = STATIC_DIR / folder / page
-    if not file_path.is_file():
-        return {"error": f"{folder}/{page} not found"}, 404
-    return FileResponse(file_path)
+    return page_cache.response("index.html", request.headers)
 
 
-# Serve individual receipt/product/category/merchant view pages with query params
-@app.get("/{folder}/{action}.html", include_in_schema=False)
-def serve_action_page(folder: str, action: str):
+@app.api_route("/{page:path}.html", methods=["GET", "HEAD"], include_in_schema=False)
+def serve_page(page: str, request: Request):
     """
-    Serve action pages like /receipts/view.html?id=1
+    Serve HTML pages like /index.html, /receipt/view.html?id=1, /product/add.html
+    and the shared templates (/static/templates/header.html).
     """
-    file_path = STATIC_DIR / folder / f"{action}.html"
-    if not file_path.is_file():
-        return {"error": f"{folder}/{action}.html not found"}, 404
-    return FileResponse(file_path)
+    relative = f"{page}.html"
+    if relative.startswith("static/"):
+        relative = relative[len("static/"):]
+    return page_cache.response(relative, request.headers)
 
 
+# Montagem de Ficheiros Estáticos (Static Files)
+# Para o Frontend (HTML/CSS/JS)
+app.mount("/static", CachedStaticFiles(directory=str(STATIC_DIR), content_etags=True, precompressed=True), name="static")
 
+# Para as Fotos dos Produtos
+app.mount("/css", CachedStaticFiles(directory=str(STATIC_DIR / "css"), content_etags=True, precompressed=True), name="css")
+app.mount("/js", CachedStaticFiles(directory=str(STATIC_DIR / "js"), content_etags=True, precompressed=True), name="js")
+app.mount("/images", CachedStaticFiles(directory=str(STATIC_DIR / "images"), content_etags=True, precompressed=True), name="images")
+app.mount("/templates", CachedStaticFiles(directory=str(STATIC_DIR / "templates"), content_etags=True, precompressed=True), name="templates")
+app.mount("/api", CachedStaticFiles(directory=str(STATIC_DIR / "api"), content_etags=True, precompressed=True), name="api")
+app.mount("/category", CachedStaticFiles(directory=str(STATIC_DIR / "category"), content_etags=True, precompressed=True), name="category")
+app.mount("/merchant", CachedStaticFiles(directory=str(STATIC_DIR / "merchant"), content_etags=True, precompressed=True), name="merchant")
+app.mount("/product", CachedStaticFiles(directory=str(STATIC_DIR / "product"), content_etags=True, precompressed=True), name="product")
+app.mount("/receipt", CachedStaticFiles(directory=str(STATIC_DIR / "receipt"), content_etags=True, precompressed=True), name="receipt")
+app.mount("/docs", CachedStaticFiles(directory=str(STATIC_DIR / "docs"), content_etags=True, precompressed=True), name="docs")
+# Uploads nunca mudam de conteúdo no mesmo URL: cache de um ano, sem revalidação
+app.mount("/uploads", CachedStaticFiles(directory=str(UPLOAD_DIR), cache_control=IMMUTABLE), name="uploads")
+
+
+@app.get("/metrics/compression", include_in_schema=False)
+def compression_metrics():
+    """Bytes in/out and saved by the response compression, per encoding, since startup."""
+    return compression.stats.snapshot()
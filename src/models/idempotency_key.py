@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary, UniqueConstraint
+from sqlalchemy.sql import func
+from src.database import Base
+
+
+class IdempotencyKey(Base):
+    """
+    This class represents a request made with an `Idempotency-Key` header
+    (see idempotency_services). While the request runs `status_code` is NULL;
+    once it succeeded the response is stored, so a retry with the same key
+    gets it back instead of creating the resource again. Rows are removed
+    after `expires_at`.
+    """
+
+    __tablename__ = "idempotency_keys"
+
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String(255), nullable=False)
+    method = Column(String(10), nullable=False)
+    path = Column(String(255), nullable=False)
+    request_hash = Column(String(64), nullable=False)  # sha256 of the body
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(LargeBinary, nullable=True)
+    content_type = Column(String(100), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    __table_args__ = (
+        UniqueConstraint('key', 'method', 'path', name='uq_idempotency_keys_key_method_path'),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Index
+from sqlalchemy import Column, Integer, String, ForeignKey, Index, JSON, DDL, event, text
 from sqlalchemy.orm import relationship
 from src.models.category import Category
 from src.models.measurement_unit import MeasurementUnit
@@ -51,6 +51,7 @@ class ProductList(Base):
     )
 
     product_list_photo = Column(String(500), nullable=True)
+    product_list_photo_variants = Column(JSON, nullable=True) # {"thumb": url, ...}, see image_services
 
     category = relationship("Category", back_populates="product_lists")
     measurement_unit = relationship("MeasurementUnit", back_populates="product_lists")
@@ -59,4 +60,19 @@ class ProductList(Base):
     __table_args__ = (
         Index('idx_product_list_name_unique', 'name', unique=True),
         Index('idx_product_list_barcode_unique', 'barcode', unique=True, postgresql_where=barcode.isnot(None)),
-    )
\ No newline at end of file
+        # Product search (src/services/product_search.py), PostgreSQL only: prefix LIKE
+        # on the barcode and the lowercased name ("C" collation), and trigram word similarity
+        Index('idx_product_list_barcode_prefix', text('barcode COLLATE "C"')).ddl_if(dialect='postgresql'),
+        Index('idx_product_list_name_prefix', text('lower(name) COLLATE "C"')).ddl_if(dialect='postgresql'),
+        Index(
+            'idx_product_list_name_trgm', 'name',
+            postgresql_using='gist', postgresql_ops={'name': 'gist_trgm_ops'}
+        ).ddl_if(dialect='postgresql'),
+    )
+
+
+# The trigram operator class comes from the pg_trgm extension
+event.listen(
+    ProductList.__table__, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
\ No newline at end of file
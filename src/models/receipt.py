@@ -1,5 +1,5 @@
 # src/models/receipt.py
-from sqlalchemy import Column, Integer, Date, DateTime, ForeignKey, String, Numeric
+from sqlalchemy import Column, Integer, Date, DateTime, ForeignKey, String, Numeric, Index, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from decimal import Decimal
@@ -19,14 +19,29 @@ class Receipt(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     merchant_id = Column(Integer, ForeignKey("merchants.id", ondelete="RESTRICT"), nullable=False)
-    purchase_date = Column(Date, nullable=False, index=True)
+    purchase_date = Column(Date, nullable=False)
     barcode = Column(String(20), nullable=True)
     total_price = Column(Numeric(10, 2), default=Decimal('0.00'), nullable=False) 
     receipt_photo = Column(String(500), nullable=True) # URL or path to the receipt photo
+    receipt_photo_variants = Column(JSON, nullable=True) # {"thumb": url, ...}, see image_services
     notes = Column(String(1000), nullable=True)
     
     merchant = relationship("Merchant", back_populates="receipts")
-    products = relationship("Product", back_populates="receipt", cascade="all, delete-orphan")
+    # Items are removed by the database (product.receipt_id ON DELETE CASCADE):
+    # deleting a receipt does not load them
+    products = relationship(
+        "Product", back_populates="receipt", cascade="all, delete-orphan", passive_deletes=True
+    )
     
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        # get_receipts / get_receipts_by_merchant: filter by merchant, newest first
+        Index('idx_receipts_merchant_date_id', merchant_id, purchase_date.desc(), id),
+        # get_receipt_by_barcode / barcode filter
+        Index('idx_receipts_barcode', barcode),
+        # Date-range reports: index-only scan returning the merchant
+        # (can be swapped for a BRIN index, see index_services)
+        Index('idx_receipts_purchase_date_id', purchase_date, id, postgresql_include=['merchant_id']),
+    )
\ No newline at end of file
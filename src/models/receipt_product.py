@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Index, Numeric, CheckConstraint
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Index, Numeric, CheckConstraint, Computed
 from sqlalchemy.orm import relationship
 from src.models.product import ProductList
 from src.database import Base
@@ -27,6 +27,12 @@ class Product(Base):
         info={'description':'Quantity of this specific item (e.g., 0.5)"'}
     )
     
+    line_total = Column(
+        Numeric(20, 2),
+        Computed("round(price * quantity, 2)", persisted=True),
+        info={'description':'price * quantity rounded to the cent (stored generated column)'}
+    )
+    
     description = Column(
         String(100), 
         nullable=True, 
@@ -36,15 +42,19 @@ class Product(Base):
     receipt_id = Column(
         Integer, 
         ForeignKey("receipts.id", ondelete="CASCADE"),
+        nullable=False
+    )
+
+    purchase_date = Column(
+        Date,
         nullable=False,
-        index=True
+        info={'description':'Copy of the receipt purchase_date (partition key, see partition_services)'}
     )
     
     product_list_id = Column(
         Integer, 
         ForeignKey("product_list.id", ondelete="RESTRICT"),
-        nullable=False,
-        index=True
+        nullable=False
     )
 
     receipt = relationship("Receipt", back_populates="products")
@@ -53,4 +63,11 @@ class Product(Base):
     __table_args__ = (
         CheckConstraint('price >= 0', name='constraint_check_product_price_negative'),
         CheckConstraint('quantity > 0', name='constraint_check_product_quantity_zero'),
+        # Receipt totals become index-only scans over (receipt_id) INCLUDE (line_total, ...)
+        Index('idx_product_receipt_id_covering', 'receipt_id', postgresql_include=['line_total', 'product_list_id']),
+        # Category aggregates: product_list -> items -> receipts
+        Index('idx_product_product_list_receipt', 'product_list_id', 'receipt_id'),
+        # Date-filtered reports read items by their own purchase_date (index-only).
+        # Can be swapped for a BRIN index, see index_services
+        Index('idx_product_purchase_date', 'purchase_date', postgresql_include=['receipt_id', 'product_list_id', 'line_total']),
     )
\ No newline at end of file
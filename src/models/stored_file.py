@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, DateTime, CheckConstraint
+from sqlalchemy.sql import func
+from src.database import Base
+
+
+class StoredFile(Base):
+    """
+    This class represents an uploaded file stored by content (see storage_services).
+    The file lives at `path` (e.g. /uploads/blobs/ab/ab12...ef.jpg), named after
+    the SHA-256 of its bytes, so identical uploads share one file.
+    `ref_count` is the number of product/receipt photos pointing at it; the file
+    is deleted when it drops to zero.
+    """
+
+    __tablename__ = "stored_file"
+
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String(64), nullable=False, index=True)
+    path = Column(String(500), nullable=False, unique=True)
+    content_type = Column(String(100), nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        CheckConstraint('ref_count >= 0', name='constraint_check_stored_file_ref_count_negative'),
+    )
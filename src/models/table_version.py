@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, DateTime, event, insert
+from sqlalchemy.sql import func
+from src.database import Base
+
+
+# Tables whose changes are counted (see src/services/table_versions.py)
+TRACKED_TABLES = ("receipts", "product", "product_list", "merchants", "category", "measurement_unit")
+
+
+class TableVersion(Base):
+    """
+    This class represents a change counter for one table. `version` goes up
+    in every transaction that writes to `table_name`, as part of its commit, and `updated_at` holds
+    the time of the last one. Read endpoints build their ETags from these
+    counters, so they can answer 304 Not Modified without loading any row.
+    """
+
+    __tablename__ = "table_versions"
+
+    table_name = Column(String(63), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+@event.listens_for(TableVersion.__table__, "after_create")
+def _seed_versions(target, connection, **kw):
+    # One row per tracked table: the counters are only ever updated (the migration does the same)
+    connection.execute(insert(target), [{"table_name": name, "version": 0} for name in TRACKED_TABLES])
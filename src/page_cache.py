@@ -0,0 +1,130 @@
+# src/page_cache.py
+
+"""
+In-memory cache of the frontend HTML pages and templates.
+
+At startup every `static/**/*.html` file is read once and kept with its
+ETag and gzip/brotli encodings, so serving a page is a dictionary lookup:
+no path checks, no open/stat/read per navigation and no compression work.
+Unchanged pages are revalidated with a 304.
+
+With PAGE_CACHE_RELOAD=true (development) a background task polls the
+directory and rebuilds the cache when an HTML file is added, removed or
+modified.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import logging
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+
+from src.static_files import REVALIDATE, negotiate_encoding
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 1.0  # seconds
+
+
+@dataclass(frozen=True)
+class Page:
+    body: bytes
+    etag: str
+    # Content-Encoding -> compressed body, in order of preference
+    encoded: Dict[str, bytes] = field(default_factory=dict)
+
+
+def _build_page(body: bytes) -> Page:
+    encoded = {}
+    if brotli is not None:
+        encoded["br"] = brotli.compress(body, quality=11)
+    encoded["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+    # Keep only the encodings that actually save bytes
+    encoded = {encoding: data for encoding, data in encoded.items() if len(data) < len(body)}
+    return Page(body=body, etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"', encoded=encoded)
+
+
+class PageCache:
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self._pages: Optional[Dict[str, Page]] = None
+        self._signature: Tuple = ()
+
+    def _scan(self) -> Tuple:
+        """(relative path, mtime, size) of every HTML file, sorted."""
+        found = []
+        pending = [self.directory]
+        while pending:
+            directory = pending.pop()
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        pending.append(entry.path)
+                    elif entry.name.endswith(".html") and entry.is_file():
+                        stat = entry.stat()
+                        relative = Path(entry.path).relative_to(self.directory).as_posix()
+                        found.append((relative, stat.st_mtime_ns, stat.st_size))
+        return tuple(sorted(found))
+
+    def build(self) -> int:
+        """(Re)load every page; the new dict replaces the old one in a single assignment."""
+        signature = self._scan()
+        pages = {
+            relative: _build_page((self.directory / relative).read_bytes())
+            for relative, _, _ in signature
+        }
+        self._pages, self._signature = pages, signature
+        logger.info(f"Page cache: {len(pages)} HTML files loaded from {self.directory}")
+        return len(pages)
+
+    def refresh_if_changed(self) -> bool:
+        if self._pages is not None and self._scan() == self._signature:
+            return False
+        self.build()
+        return True
+
+    async def watch(self, interval: float = POLL_INTERVAL) -> None:
+        """Development: rebuild whenever an HTML file changes."""
+        while True:
+            try:
+                await asyncio.to_thread(self.refresh_if_changed)
+            except Exception as e:
+                logger.error(f"Page cache refresh failed: {str(e)}", exc_info=True)
+            await asyncio.sleep(interval)
+
+    def get(self, relative: str) -> Optional[Page]:
+        if self._pages is None:
+            self.build()
+        return self._pages.get(relative)
+
+    def response(self, relative: str, request_headers: Headers) -> Response:
+        page = self.get(relative)
+        if page is None:
+            return JSONResponse({"error": f"{relative} not found"}, status_code=404)
+
+        body, etag = page.body, page.etag
+        headers = {"Cache-Control": REVALIDATE}
+        if page.encoded:
+            headers["Vary"] = "Accept-Encoding"
+            encoding = negotiate_encoding(request_headers.get("accept-encoding"), list(page.encoded))
+            if encoding is not None:
+                body, etag = page.encoded[encoding], f'{etag[:-1]}-{encoding}"'
+                headers["Content-Encoding"] = encoding
+        headers["ETag"] = etag
+
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match and etag in [tag.strip(" W/") for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type="text/html", headers=headers)
@@ -0,0 +1,84 @@
+# src/responses.py
+
+"""
+Fast JSON responses.
+
+FastAPI's default path for an endpoint returning ORM objects is:
+validate them against `response_model` -> serialize the models to Python
+dicts/lists (mode="json") -> encode those with the stdlib `json` module.
+
+`fast_response(schema, content)` does it in one step: the ORM objects are
+read into the schema (`from_attributes`) and written straight to JSON bytes
+by pydantic-core (Rust), skipping FastAPI's second validation and the
+intermediate Python objects. The schema's field serializers still apply,
+so the output is the same as the default path. Endpoints keep their
+`response_model` for the OpenAPI docs.
+
+`FastJSONResponse` renders plain dicts/lists with orjson when the optional
+package is installed (stdlib json otherwise).
+
+Set FAST_JSON_ENABLED=false to go back to the default path everywhere.
+"""
+
+import json
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any
+
+from pydantic import TypeAdapter
+from starlette.responses import JSONResponse, Response
+
+from src.settings import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    # Same conversion as FastAPI's jsonable_encoder
+    if isinstance(value, Decimal):
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when available."""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return json.dumps(
+                content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default
+            ).encode("utf-8")
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+@lru_cache(maxsize=None)
+def _adapter(schema: Any) -> TypeAdapter:
+    return TypeAdapter(schema)
+
+
+def dump_json(schema: Any, content: Any) -> bytes:
+    """ORM objects (or dicts) -> JSON bytes of `schema` (e.g. List[Receipt])."""
+    adapter = _adapter(schema)
+    return adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+
+
+def partial_response(schema: Any, models: Any) -> Response:
+    """
+    Response for schema instances that only hold some of their fields
+    (sparse fieldsets, see field_selection): only the fields that were set
+    are written.
+    """
+    return Response(_adapter(schema).dump_json(models, exclude_unset=True), media_type="application/json")
+
+
+def fast_response(schema: Any, content: Any, status_code: int = 200) -> Any:
+    """
+    Response for `content` serialized as `schema`. With FAST_JSON_ENABLED=false
+    the content is returned as is, for FastAPI to handle via response_model.
+    """
+    if not settings.fast_json_enabled:
+        return content
+    return Response(dump_json(schema, content), status_code=status_code, media_type="application/json")
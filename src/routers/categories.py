@@ -9,13 +9,15 @@ import logging
 from src.database import get_db
 from src.schemas.category import CategoryCreate, CategoryUpdate, Category as CategorySchema
 from src.services.crud_category import CategoryService
+from src.conditional import ConditionalRoute, versioned
 
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/categories",
-    tags=["Categories"]
+    tags=["Categories"],
+    route_class=ConditionalRoute
 )
 
 
@@ -43,7 +45,9 @@ def create_category(category: CategoryCreate, db: Session = Depends(get_db)):
 @router.get(
     "/", 
     response_model=List[CategorySchema], 
-    summary="Retrieve all categories"
+    summary="Retrieve all categories",
+    # Counts and totals come from the product lists and receipt items
+    dependencies=[Depends(versioned("category", "product_list", "product"))]
 )
 def get_categories(
     skip: int = Query(0, ge=0, description="Number of records to skip"),
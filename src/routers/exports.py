@@ -0,0 +1,83 @@
+# src/routers/exports.py
+
+from datetime import date
+from typing import Optional
+import logging
+import tempfile
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+from starlette.background import BackgroundTask
+
+from src.database import get_db
+from src.services import export_services
+
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/exports",
+    tags=["Exports"]
+)
+
+MEDIA_TYPES = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+}
+
+
+@router.get(
+    "/line-items",
+    summary="Export receipt line items as Parquet or Arrow IPC",
+    response_class=FileResponse
+)
+def export_line_items(
+    format: str = Query("parquet", pattern="^(parquet|arrow)$", description="Output format: parquet or arrow"),
+    start_date: Optional[date] = Query(None, description="Export items purchased from this date (inclusive)"),
+    end_date: Optional[date] = Query(None, description="Export items purchased up to this date (inclusive)"),
+    db: Session = Depends(get_db)
+):
+    """
+    Export the product ⋈ receipts ⋈ product_list ⋈ category ⋈ merchants join
+    as a columnar file for analytics notebooks.
+
+    - **format**: `parquet` (zstd, one row group per batch) or `arrow` (IPC file)
+    - **start_date** and **end_date**: Restrict the export to a purchase date range
+
+    Merchant and category names are dictionary-encoded.
+    """
+    if not export_services.is_available():
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Columnar export is not available: 'pyarrow' is not installed"
+        )
+
+    tmp = tempfile.NamedTemporaryFile(suffix=f".{format}", delete=False)
+    tmp.close()
+    try:
+        export_services.write_line_items(
+            db,
+            tmp.name,
+            export_format=format,
+            start_date=start_date,
+            end_date=end_date
+        )
+    except Exception as e:
+        export_services.remove_file(tmp.name)
+        logger.error(f"Error exporting line items: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error exporting line items"
+        )
+
+    filename = "line_items"
+    if start_date or end_date:
+        filename += f"_{start_date or 'start'}_{end_date or 'end'}"
+
+    return FileResponse(
+        tmp.name,
+        media_type=MEDIA_TYPES[format],
+        filename=f"{filename}.{format}",
+        background=BackgroundTask(export_services.remove_file, tmp.name)
+    )
@@ -12,13 +12,15 @@ from src.schemas.measurement_unit import (
     MeasurementUnit as MeasurementUnitSchema
 )
 from src.services.crud_measurement_unit import MeasurementUnitService
+from src.conditional import ConditionalRoute, versioned
 
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/measurement-units",
-    tags=["Measurement Units"]
+    tags=["Measurement Units"],
+    route_class=ConditionalRoute
 )
 
 
@@ -37,7 +39,7 @@ def create_measurement_unit(unit: MeasurementUnitCreate, db: Session = Depends(g
         )
 
 
-@router.get("/", response_model=List[MeasurementUnitSchema])
+@router.get("/", response_model=List[MeasurementUnitSchema], dependencies=[Depends(versioned("measurement_unit"))])
 def get_all_measurement_units(skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
     try:
         return MeasurementUnitService.get_measurement_units(db, skip=skip, limit=limit)
@@ -1,6 +1,6 @@
 # src/routers/merchants.py
 
-from typing import List
+from typing import Dict, List, Optional, Union
 from fastapi import APIRouter, Depends, status, Path, Query, HTTPException
 from sqlalchemy.orm import Session
 import logging
@@ -8,6 +8,9 @@ import logging
 from src.database import get_db
 from src.schemas.merchant import MerchantCreate, MerchantUpdate, Merchant as MerchantSchema
 from src.services.crud_merchant import MerchantService
+from src.services import field_selection
+from src.responses import fast_response
+from src.conditional import ConditionalRoute, versioned
 
 
 logger = logging.getLogger(__name__)
@@ -15,7 +18,8 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/merchants",
-    tags=["Merchants"]
+    tags=["Merchants"],
+    route_class=ConditionalRoute
 )
 
 
@@ -39,15 +43,27 @@ def create_merchant(
 
 @router.get(
     "/",
-    response_model=List[MerchantSchema],
-    summary="Retrieve all merchants"
+    response_model=Union[List[MerchantSchema], Dict[int, MerchantSchema]],
+    summary="Retrieve all merchants",
+    dependencies=[Depends(versioned("merchants"))]
 )
 def get_merchants(
     skip: int = Query(0, ge=0, description="Number of records to skip for pagination"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
+    ids: Optional[str] = Query(
+        None,
+        description=f"Comma-separated IDs (at most {field_selection.MAX_IDS}): returns {{id: merchant}} "
+                    "for the ones that exist, in one query; pagination is ignored"
+    ),
     db: Session = Depends(get_db)
 ):
     try:
+        merchant_ids = field_selection.parse_ids(ids)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    try:
+        if merchant_ids is not None:
+            return fast_response(Dict[int, MerchantSchema], MerchantService.get_merchants_by_ids(db, merchant_ids))
         return MerchantService.get_merchants(db, skip=skip, limit=limit)
     except Exception as e:
         logger.error(f"Error in get_merchants endpoint: {str(e)}", exc_info=True)
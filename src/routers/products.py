@@ -1,6 +1,6 @@
 # src/routers/products.py
 
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
 from fastapi import APIRouter, Depends, status, Query, Path, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
@@ -13,13 +13,18 @@ from src.schemas.product import (
     ProductList as ProductListSchema
 )
 from src.services.crud_product_list import ProductListService 
+from src.services import field_selection
+from src.services import product_search
+from src.responses import fast_response, partial_response
+from src.conditional import ConditionalRoute, versioned
 
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/products",
-    tags=["Products"]
+    tags=["Products"],
+    route_class=ConditionalRoute
 )
 
 
@@ -53,8 +58,9 @@ def create_product(
 
 @router.get(
     "/",
-    response_model=List[ProductListSchema],
-    summary="Retrieve all products"
+    response_model=Union[List[ProductListSchema], Dict[int, ProductListSchema]],
+    summary="Retrieve all products",
+    dependencies=[Depends(versioned("product_list", "category", "measurement_unit"))]
 )
 def get_all_products(
     skip: int = Query(0, ge=0, description="Number of records to skip for pagination"),
@@ -62,13 +68,45 @@ def get_all_products(
     barcode: Optional[str] = Query(None, description="Filter by product barcode"),
     measurement_unit_id: Optional[int] = Query(None, description="Filter by measurement unit ID"),
     category_id: Optional[int] = Query(None, description="Filter by category ID"),
+    fields: Optional[str] = Query(
+        None, description="Comma-separated fields to return, e.g. `id,name` or `category.name`"
+    ),
+    expand: Optional[str] = Query(
+        None, description="Comma-separated relations to include: `category`, `measurement_unit`"
+    ),
+    ids: Optional[str] = Query(
+        None,
+        description=f"Comma-separated IDs (at most {field_selection.MAX_IDS}): returns {{id: product}} "
+                    "for the ones that exist, in one query; the filters and pagination are ignored"
+    ),
     db: Session = Depends(get_db)
 ):
     """
     Retrieve all products with optional filters and pagination.
+    With **fields** / **expand** only the requested fields and relations are returned.
+    With **ids** the given products are returned instead, keyed by ID.
+    Supports conditional requests (`If-None-Match` -> 304).
     """
     try:
-        return ProductListService.get_product_lists(db, skip=skip, limit=limit)
+        selection = field_selection.parse(field_selection.PRODUCT_LIST, fields, expand)
+        product_ids = field_selection.parse_ids(ids)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    try:
+        if product_ids is not None:
+            products = ProductListService.get_product_lists_by_ids(db, product_ids, selection=selection)
+            if selection is None:
+                return fast_response(Dict[int, ProductListSchema], products)
+            return partial_response(
+                Dict[int, ProductListSchema],
+                {id_: field_selection.build(field_selection.PRODUCT_LIST, selection, p) for id_, p in products.items()},
+            )
+        products = ProductListService.get_product_lists(db, skip=skip, limit=limit, selection=selection)
+        if selection is None:
+            return fast_response(List[ProductListSchema], products)
+        return partial_response(
+            List[ProductListSchema], [field_selection.build(field_selection.PRODUCT_LIST, selection, p) for p in products]
+        )
     except Exception as e:
         logger.error(f"Error in get_all_products endpoint: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -77,6 +115,36 @@ def get_all_products(
         )
 
 
+@router.get(
+    "/search",
+    response_model=List[ProductListSchema],
+    summary="Search products by name or barcode",
+    dependencies=[Depends(versioned("product_list", "category", "measurement_unit"))]
+)
+def search_products(
+    q: str = Query(..., min_length=1, max_length=255, description="Part of the product name, or the start of its barcode"),
+    limit: int = Query(20, ge=1, le=product_search.MAX_RESULTS, description="Maximum number of results"),
+    db: Session = Depends(get_db)
+):
+    """
+    Search products for autocomplete: exact barcode and name matches first,
+    then barcode and name prefixes, then names with a word starting with (or,
+    on PostgreSQL, similar to) **q**.
+    Supports conditional requests (`If-None-Match` -> 304).
+    """
+    try:
+        products = ProductListService.search_product_lists(db, q, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in search_products endpoint: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error searching products"
+        )
+    return fast_response(List[ProductListSchema], products)
+
+
 @router.get(
     "/{product_id}",
     response_model=ProductListSchema,
@@ -94,7 +162,7 @@ def get_product_by_id(
         if not product:
             logger.warning(f"Product not found: {product_id}")
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
-        return product
+        return fast_response(ProductListSchema, product)
     except HTTPException:
         raise
     except Exception as e:
@@ -1,6 +1,6 @@
 # src/routers/receipts.py
 
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
 from datetime import date
 from fastapi import APIRouter, Depends, status, Query, Path, HTTPException
 from sqlalchemy.orm import Session
@@ -8,20 +8,74 @@ from fastapi import Body
 import logging
 
 from src.database import get_db
+from src.models.receipt import Receipt
 from src.schemas.receipt import (
     ReceiptCreate, 
     ReceiptUpdate, 
+    ReceiptProductsUpdate,
+    ReceiptBulkRequest,
+    ReceiptBulkResponse,
+    ReceiptWithChanges,
     Receipt as ReceiptSchema
 )
 from src.services.crud_receipt import ReceiptService
+from src.services import field_selection
+from src.responses import fast_response, partial_response
+from src.conditional import ConditionalRoute, versioned
+from src.idempotency import Idempotency, idempotency_key
 
 
 logger = logging.getLogger(__name__)
 
+FIELDS_DESCRIPTION = (
+    "Comma-separated fields to return, e.g. `id,purchase_date,total_price` or `merchant.name` "
+    "(returns everything when fields and expand are omitted)"
+)
+EXPAND_DESCRIPTION = "Comma-separated relations to include, e.g. `merchant,products.product_list.category`"
+IDS_DESCRIPTION = (
+    f"Comma-separated IDs (at most {field_selection.MAX_IDS}): returns {{id: receipt}} for the ones "
+    "that exist, in one query; the filters and pagination are ignored"
+)
+
+
+def _parse_selection(fields: Optional[str], expand: Optional[str]):
+    try:
+        return field_selection.parse(field_selection.RECEIPT, fields, expand)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+def _parse_ids(ids: Optional[str]):
+    try:
+        return field_selection.parse_ids(ids)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+def _receipts_response(receipts, selection):
+    if selection is None:
+        return fast_response(List[ReceiptSchema], receipts)
+    return partial_response(
+        List[ReceiptSchema], [field_selection.build(field_selection.RECEIPT, selection, r) for r in receipts]
+    )
+
+
+def _receipts_by_id_response(receipts, selection):
+    if selection is None:
+        return fast_response(Dict[int, ReceiptSchema], receipts)
+    return partial_response(
+        Dict[int, ReceiptSchema],
+        {id_: field_selection.build(field_selection.RECEIPT, selection, r) for id_, r in receipts.items()},
+    )
+
+
+# Tables a full receipt is read from (merchant, items, their products, categories and units)
+RECEIPT_TABLES = ("receipts", "merchants", "product", "product_list", "category", "measurement_unit")
 
 router = APIRouter(
     prefix="/receipts",
-    tags=["Receipts"]
+    tags=["Receipts"],
+    route_class=ConditionalRoute
 )
 
 
@@ -33,11 +87,23 @@ router = APIRouter(
 )
 def create_receipt(
     receipt: ReceiptCreate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    idempotency: Idempotency = Depends(idempotency_key)
 ):
-    """Create a new receipt."""
+    """
+    Create a new receipt. Its line items can be sent in the same request
+    (`products`); the receipt and all items are created in one transaction,
+    or none of them if any item is invalid.
+
+    Send an `Idempotency-Key` header to make retries safe: a retry with the
+    same key returns the first response instead of creating another receipt.
+    """
+    if idempotency.replay is not None:
+        return idempotency.replay
     try:
-        return ReceiptService.create_receipt(db, receipt)
+        db_receipt = ReceiptService.create_receipt(
+            db, receipt, before_commit=idempotency.before_commit(db, ReceiptSchema, status_code=status.HTTP_201_CREATED)
+        )
     except ValueError as e:
         logger.warning(f"Validation error creating receipt: {str(e)}")
         raise HTTPException(
@@ -50,14 +116,55 @@ def create_receipt(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error creating receipt"
         )
+    return idempotency.respond(ReceiptSchema, db_receipt, status_code=status.HTTP_201_CREATED)
  
     
 
 
 
+@router.post(
+    "/bulk",
+    response_model=ReceiptBulkResponse,
+    summary="Update or delete many receipts in one request"
+)
+def bulk_receipts(
+    request: ReceiptBulkRequest,
+    db: Session = Depends(get_db),
+    idempotency: Idempotency = Depends(idempotency_key)
+):
+    """
+    Apply a list of operations in one transaction:
+
+    - `{"action": "update", "receipt_ids": [1, 2], "values": {"purchase_date": "2025-01-31"}}`
+      (re-date and/or `merchant_id` to re-assign)
+    - `{"action": "delete", "receipt_ids": [3, 4]}` (their products are deleted too)
+
+    Each operation runs as one set-based statement. The response has one
+    result per receipt ID (`updated`, `deleted` or `not_found`).
+    An invalid operation rejects the whole request with 400.
+    Supports `Idempotency-Key` (a retry returns the first results).
+    """
+    if idempotency.replay is not None:
+        return idempotency.replay
+    try:
+        result = ReceiptService.bulk_operations(
+            db, request.operations, before_commit=idempotency.before_commit(db, ReceiptBulkResponse)
+        )
+    except ValueError as e:
+        logger.warning(f"Validation error in bulk receipt operation: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in bulk_receipts endpoint: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error applying bulk receipt operations"
+        )
+    return idempotency.respond(ReceiptBulkResponse, result)
+
+
 @router.get(
     "/",
-    response_model=List[ReceiptSchema],
+    response_model=Union[List[ReceiptSchema], Dict[int, ReceiptSchema]],
     summary="Retrieve all receipts with optional filtering"
 )
 def get_receipt_by_filter(
@@ -67,6 +174,9 @@ def get_receipt_by_filter(
     barcode: Optional[str] = Query(None, description="Filter by receipt barcode"),
     start_date: Optional[date] = Query(None, description="Filter receipts from this date (inclusive)"),
     end_date: Optional[date] = Query(None, description="Filter receipts up to this date (inclusive)"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    expand: Optional[str] = Query(None, description=EXPAND_DESCRIPTION),
+    ids: Optional[str] = Query(None, description=IDS_DESCRIPTION),
     db: Session = Depends(get_db),
 ):
     """
@@ -77,19 +187,28 @@ def get_receipt_by_filter(
     - **barcode**: Filter receipts by barcode
     - **start_date** and **end_date**: Filter receipts within a date range
     - **end_date**: Filter receipts up to this date (inclusive)
+    - **fields** / **expand**: Return only some fields / relations (sparse fieldsets)
+    - **ids**: Fetch these receipts instead, keyed by ID
 
     Returns a list of receipts matching the criteria.
     """
+    selection = _parse_selection(fields, expand)
+    receipt_ids = _parse_ids(ids)
     try:
-        return ReceiptService.get_receipts(
+        if receipt_ids is not None:
+            receipts = ReceiptService.get_receipts_by_ids(db, receipt_ids, selection=selection)
+            return _receipts_by_id_response(receipts, selection)
+        receipts = ReceiptService.get_receipts(
             db=db, 
             skip=skip, 
             limit=limit, 
             merchant_id=merchant_id, 
             barcode=barcode, 
             start_date=start_date, 
-            end_date=end_date
+            end_date=end_date,
+            selection=selection
         )
+        return _receipts_response(receipts, selection)
     except Exception as e:
         logger.error(f"Error in get_receipt_by_filter endpoint: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -100,15 +219,19 @@ def get_receipt_by_filter(
 @router.get(
     "/{receipt_id}",
     response_model=ReceiptSchema,
-    summary="Retrieve a receipt by its ID"
+    summary="Retrieve a receipt by its ID",
+    dependencies=[Depends(versioned(*RECEIPT_TABLES, model=Receipt, id_param="receipt_id"))]
 )
 def get_receipt_by_id(
     receipt_id: int = Path(..., gt=0, description="The ID of the receipt to retrieve"),
     db: Session = Depends(get_db)
 ):
-    """Get a single receipt by ID."""
+    """
+    Get a single receipt by ID.
+    Supports conditional requests: `If-None-Match` with the last ETag returns 304.
+    """
     try:
-        return ReceiptService.get_receipt_by_id(db, receipt_id)
+        receipt = ReceiptService.get_receipt_by_id(db, receipt_id)
     except ValueError as e:
         logger.warning(f"Receipt not found: {receipt_id}")
         raise HTTPException(
@@ -121,6 +244,8 @@ def get_receipt_by_id(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error fetching receipt"
         )
+    # Outside the try: a serialization error is not a "not found"
+    return fast_response(ReceiptSchema, receipt)
 
 
 @router.get(
@@ -198,17 +323,24 @@ def get_receipts_by_merchant(
     merchant_id: int = Path(..., gt=0, description="The ID of the merchant to retrieve receipts for"),
     skip: int = Query(0, ge=0, description="Number of records to skip for pagination"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    expand: Optional[str] = Query(None, description=EXPAND_DESCRIPTION),
     db: Session = Depends(get_db)
 ):
     """
     Retrieve all receipts associated with a specific merchant.
 
     - **merchant_id**: The unique identifier of the merchant
+    - **fields** / **expand**: Return only some fields / relations (sparse fieldsets)
 
     Returns a list of receipts linked to the specified merchant.
     """
+    selection = _parse_selection(fields, expand)
     try:
-        return ReceiptService.get_receipts_by_merchant(db, merchant_id)
+        receipts = ReceiptService.get_receipts_by_merchant(
+            db, merchant_id, skip=skip, limit=limit, selection=selection
+        )
+        return _receipts_response(receipts, selection)
     except Exception as e:
         logger.error(f"Error fetching receipts for merchant {merchant_id}: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -255,19 +387,24 @@ def update_receipt(
 
 @router.put(
     "/{receipt_id}/products",
-    response_model=ReceiptSchema,
+    response_model=ReceiptWithChanges,
     summary="Update products for a receipt"
 )
 def update_receipt_products(
     receipt_id: int = Path(..., gt=0),
-    products_data: dict = Body(...),
+    products_data: ReceiptProductsUpdate = Body(...),
     db: Session = Depends(get_db)
 ):
     """
-    Update all products for a receipt.
+    Replace the products of a receipt with the given list.
+
+    Items are matched to the existing ones by `id`, or else by product and
+    position, and only the differences are written: unchanged items are not
+    touched and keep their IDs. The response includes the change set
+    (`changes`: inserted / updated / deleted / unchanged item IDs).
     """
     try:
-        return ReceiptService.update_receipt_products(db, receipt_id, products_data.get("products", []))
+        db_receipt = ReceiptService.update_receipt_products(db, receipt_id, products_data.products)
     except ValueError as e:
         logger.warning(f"Validation error updating products for receipt {receipt_id}: {str(e)}")
         raise HTTPException(
@@ -280,6 +417,7 @@ def update_receipt_products(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error updating receipt products"
         )
+    return fast_response(ReceiptWithChanges, db_receipt)
     
 
 @router.delete(
@@ -1,6 +1,7 @@
 # src/routers/uploads.py
 
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 import logging 
 
@@ -17,26 +18,49 @@ router = APIRouter(
     tags=["Uploads"]
 )
 
+# The body is streamed by file_services (not parsed by FastAPI), so the
+# multipart schema is documented by hand for Swagger UI.
+IMAGE_UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {
+                        "file": {"type": "string", "format": "binary", "description": "Image file (JPG, PNG, GIF, WEBP)."}
+                    },
+                }
+            }
+        },
+    }
+}
+
 
 @router.post(
     "/product-list/{product_list_id}/photo",
     response_model=schema_product.ProductList,
-    status_code=status.HTTP_200_OK 
+    status_code=status.HTTP_200_OK,
+    openapi_extra=IMAGE_UPLOAD_BODY
 )
-def upload_product_list_photo(
+async def upload_product_list_photo(
     product_list_id: int,
-    file: UploadFile = File(..., description="Image file (JPG, PNG)."),
+    request: Request,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
-    """Upload a photo for a product in the master list."""
+    """Upload a photo for a product in the master list (streamed to disk)."""
     try:
-        updated_product = file_services.save_product_photo(
+        updated_product = await file_services.save_product_photo(
             db=db,
             product_list_id=product_list_id,
-            file=file
+            request=request,
+            background_tasks=background_tasks
         )
 
-        return updated_product
+        # Serialize in the threadpool: building the response may lazy-load relationships
+        return await run_in_threadpool(schema_product.ProductList.model_validate, updated_product)
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -50,22 +74,25 @@ def upload_product_list_photo(
 @router.post(
     "/receipt/{receipt_id}/photo",
     response_model=schema_receipt.Receipt,
-    status_code=status.HTTP_200_OK
+    status_code=status.HTTP_200_OK,
+    openapi_extra=IMAGE_UPLOAD_BODY
 )
-def upload_receipt_photo(
+async def upload_receipt_photo(
     receipt_id: int,
-    file: UploadFile = File(..., description="Image file (JPG, PNG)."),
+    request: Request,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
-    """Upload a photo for a receipt."""
+    """Upload a photo for a receipt (streamed to disk)."""
     try:
-        updated_receipt = file_services.save_receipt_photo(
+        updated_receipt = await file_services.save_receipt_photo(
             db=db,
             receipt_id=receipt_id,
-            file=file
+            request=request,
+            background_tasks=background_tasks
         )
 
-        return updated_receipt
+        return await run_in_threadpool(schema_receipt.Receipt.model_validate, updated_receipt)
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -1,7 +1,7 @@
 from pydantic import BaseModel, ConfigDict, Field
 from .category import Category
 from .measurement_unit import MeasurementUnit
-from typing import List, Optional
+from typing import Dict, List, Optional
 from decimal import Decimal
 
 class ProductListBase(BaseModel):
@@ -52,6 +52,10 @@ class ProductList(ProductListBase):
     id: int
     category: Category
     product_list_photo: Optional[str] = None
+    product_list_photo_variants: Optional[Dict[str, str]] = Field(
+        default=None,
+        description="Resized copies of the photo: thumb, thumb_webp, medium, medium_webp"
+    )
     measurement_unit: MeasurementUnit 
     model_config = ConfigDict(from_attributes=True)
 
@@ -77,6 +81,13 @@ class ProductBase(BaseModel):
 class ProductCreate(ProductBase):
     pass
 
+class ProductUpsert(ProductBase):
+    """Item in the full list sent to PUT /receipts/{id}/products"""
+    id: Optional[int] = Field(
+        default=None,
+        description="ID of an existing item of the receipt; without it the item is matched by product and position"
+    )
+
 class ProductUpdate(BaseModel):
     """Schema for updating an existing product item"""
     price: Optional[Decimal] = Field(default=None, max_digits=12, decimal_places=4)
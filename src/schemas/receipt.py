@@ -1,7 +1,7 @@
 from pydantic import BaseModel, ConfigDict, Field, field_serializer
 from .merchant import Merchant
-from .product import Product
-from typing import List
+from .product import Product, ProductCreate, ProductUpsert
+from typing import Dict, List, Literal
 from datetime import date, datetime
 from decimal import Decimal
 
@@ -15,8 +15,13 @@ class ReceiptBase(BaseModel):
     notes: str | None = Field(default=None, max_length=1000)
 
 
+# Line items accepted in one POST /receipts
+MAX_RECEIPT_ITEMS = 1000
+
+
 class ReceiptCreate(ReceiptBase):
-    pass
+    """Receipt with, optionally, its line items (created in the same transaction)"""
+    products: List[ProductCreate] = Field(default_factory=list, max_length=MAX_RECEIPT_ITEMS)
 
 
 class ReceiptUpdate(BaseModel):
@@ -34,6 +39,10 @@ class Receipt(ReceiptBase):
     total_price: Decimal
     merchant: Merchant
     products: List[Product] = Field(default_factory=list)
+    receipt_photo_variants: Dict[str, str] | None = Field(
+        default=None,
+        description="Resized copies of the photo: thumb, thumb_webp, medium, medium_webp"
+    )
     notes: str | None = Field(default=None, max_length=1000)
     created_at: datetime
     updated_at: datetime | None = None
@@ -48,3 +57,54 @@ class Receipt(ReceiptBase):
     @field_serializer("total_price")
     def serialize_decimal(self, value: Decimal, _info):
         return float(value) if value is not None else None
+
+
+class ReceiptProductsUpdate(BaseModel):
+    """Full list of items for PUT /receipts/{id}/products"""
+    products: List[ProductUpsert] = Field(default_factory=list, max_length=MAX_RECEIPT_ITEMS)
+
+
+class ReceiptItemChanges(BaseModel):
+    """Item IDs written by PUT /receipts/{id}/products"""
+    inserted: List[int] = Field(default_factory=list)
+    updated: List[int] = Field(default_factory=list)
+    deleted: List[int] = Field(default_factory=list)
+    unchanged: List[int] = Field(default_factory=list)
+
+
+class ReceiptWithChanges(Receipt):
+    """Receipt after an items update, with the change set"""
+    changes: ReceiptItemChanges
+
+
+# Receipts per bulk operation
+MAX_BULK_RECEIPTS = 1000
+
+
+class ReceiptBulkValues(BaseModel):
+    """Values set by a bulk update (only the ones given)"""
+    merchant_id: int | None = None
+    purchase_date: date | None = None
+
+
+class ReceiptBulkOperation(BaseModel):
+    """One operation of POST /receipts/bulk"""
+    action: Literal["update", "delete"]
+    receipt_ids: List[int] = Field(min_length=1, max_length=MAX_BULK_RECEIPTS)
+    values: ReceiptBulkValues | None = Field(default=None, description="Required for 'update'")
+
+
+class ReceiptBulkRequest(BaseModel):
+    operations: List[ReceiptBulkOperation] = Field(min_length=1, max_length=100)
+
+
+class ReceiptBulkResult(BaseModel):
+    operation: int = Field(description="Index of the operation in the request")
+    receipt_id: int
+    status: Literal["updated", "deleted", "not_found"]
+
+
+class ReceiptBulkResponse(BaseModel):
+    results: List[ReceiptBulkResult]
+    updated: int
+    deleted: int
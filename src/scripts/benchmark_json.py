@@ -0,0 +1,96 @@
+"""
+python -m src.scripts.benchmark_json
+python -m src.scripts.benchmark_json --limit 1000 --repeat 20
+
+Script: benchmark_json.py
+Purpose:
+  Micro-benchmark of response serialization per endpoint: FastAPI's default
+  path (validate against response_model, serialize to Python objects,
+  render with JSONResponse/stdlib json) against the fast path of
+  src/responses.py (one validation from the ORM objects, JSON bytes written
+  by pydantic-core).
+
+  The rows are loaded once from the configured database with the same
+  service calls as the endpoints; only serialization is timed. Reports the
+  median time per endpoint, the speed-up and the response size, and checks
+  that both paths produce the same JSON.
+
+Notes:
+- Works with any database; load data first (e.g.
+  `python -m src.scripts.load_json_to_db --generate big.json --receipts 5000`).
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from typing import List
+
+from fastapi.utils import create_model_field
+from starlette.responses import JSONResponse
+
+from src.database import SessionLocal
+from src.responses import dump_json
+from src.schemas.product import ProductList as ProductListSchema
+from src.schemas.receipt import Receipt as ReceiptSchema
+from src.services.crud_product_list import ProductListService
+from src.services.crud_receipt import ReceiptService
+
+
+def _endpoints(db, limit: int) -> dict:
+    receipts = ReceiptService.get_receipts(db, skip=0, limit=limit)
+    products = ProductListService.get_product_lists(db, skip=0, limit=limit)
+    endpoints = {
+        f"GET /receipts?limit={limit}": (List[ReceiptSchema], receipts),
+        f"GET /products?limit={limit}": (List[ProductListSchema], products),
+    }
+    if receipts:
+        endpoints[f"GET /receipts/{receipts[0].id}"] = (ReceiptSchema, receipts[0])
+    if products:
+        endpoints[f"GET /products/{products[0].id}"] = (ProductListSchema, products[0])
+    return endpoints
+
+
+def _default_path(field, content) -> bytes:
+    # What fastapi.routing.serialize_response does, then the response render
+    value, errors = field.validate(content, {}, loc=("response",))
+    if errors:
+        raise SystemExit(f"Response validation failed: {errors}")
+    return JSONResponse(field.serialize(value)).body
+
+
+def _time(run, repeat: int) -> float:
+    times = []
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(description="Default vs fast JSON serialization per endpoint")
+    parser.add_argument("--limit", type=int, default=100, help="Rows per list endpoint")
+    parser.add_argument("--repeat", type=int, default=10, help="Runs per measurement (median is reported)")
+    args = parser.parse_args(argv[1:])
+
+    with SessionLocal() as db:
+        endpoints = _endpoints(db, args.limit)
+        print(f"{'endpoint':<28} {'default ms':>11} {'fast ms':>9} {'speed-up':>9} {'size':>10}")
+        for name, (schema, content) in endpoints.items():
+            field = create_model_field(name="Response", type_=schema, mode="serialization")
+            default = _default_path(field, content)  # also loads lazy relationships once
+            fast = dump_json(schema, content)
+            if json.loads(default) != json.loads(fast):
+                raise SystemExit(f"{name}: the fast path output differs from the default path")
+
+            default_ms = _time(lambda: _default_path(field, content), args.repeat)
+            fast_ms = _time(lambda: dump_json(schema, content), args.repeat)
+            print(
+                f"{name:<28} {default_ms:>11.2f} {fast_ms:>9.2f} "
+                f"{default_ms / fast_ms if fast_ms else float('inf'):>8.1f}x {len(fast) / 1024:>7.0f} kB"
+            )
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,117 @@
+"""
+python -m src.scripts.compress_static
+python -m src.scripts.compress_static --directory static --force
+python -m src.scripts.compress_static --clean
+
+Script: compress_static.py
+Purpose:
+  Write a gzip (`.gz`) and a brotli (`.br`) sibling next to every text asset
+  under static/ (css, js, html, svg, json, md...). The static mounts
+  (src/static_files.py, precompressed=True) serve them to clients that
+  accept the encoding, so no compression happens per request.
+
+  Files are only rebuilt when the source is newer than the sibling (or with
+  --force). Siblings that would not be smaller than the source are not
+  written, and tiny files are skipped.
+
+Notes:
+- Brotli requires the optional 'brotli' package; without it only .gz files
+  are written.
+- Run it after changing the frontend (`make static`); the Docker entrypoint
+  runs it on start. Stale siblings are ignored by the server, never served.
+"""
+import argparse
+import gzip
+import os
+import sys
+from pathlib import Path
+from typing import Callable, Dict, Iterator
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+STATIC_DIR = BASE_DIR / "static"
+
+TEXT_EXTENSIONS = {".css", ".js", ".mjs", ".html", ".htm", ".svg", ".json", ".map", ".md", ".txt", ".xml", ".ico"}
+MIN_SIZE = 256  # bytes; smaller files gain nothing
+
+
+def _compressors() -> Dict[str, Callable[[bytes], bytes]]:
+    compressors = {".gz": lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compressors[".br"] = lambda data: brotli.compress(data, quality=11)
+    return compressors
+
+
+def _assets(directory: Path) -> Iterator[Path]:
+    for path in sorted(directory.rglob("*")):
+        if path.is_file() and path.suffix.lower() in TEXT_EXTENSIONS:
+            yield path
+
+
+def compress_directory(directory: Path, force: bool = False) -> Dict[str, int]:
+    """Write the missing/stale siblings; returns counters for the summary."""
+    stats = {"assets": 0, "written": 0, "up_to_date": 0, "original_bytes": 0, "compressed_bytes": 0}
+    compressors = _compressors()
+    for path in _assets(directory):
+        source = path.stat()
+        if source.st_size < MIN_SIZE:
+            continue
+        stats["assets"] += 1
+        data = None
+        for suffix, compress in compressors.items():
+            target = path.with_name(path.name + suffix)
+            if not force and target.exists() and target.stat().st_mtime_ns >= source.st_mtime_ns:
+                stats["up_to_date"] += 1
+                continue
+            data = data if data is not None else path.read_bytes()
+            compressed = compress(data)
+            if len(compressed) >= len(data):
+                target.unlink(missing_ok=True)
+                continue
+            temp = target.with_name(f".{target.name}.part")
+            temp.write_bytes(compressed)
+            os.replace(temp, target)
+            stats["written"] += 1
+            stats["original_bytes"] += len(data)
+            stats["compressed_bytes"] += len(compressed)
+    return stats
+
+
+def clean_directory(directory: Path) -> int:
+    """Remove the siblings written by compress_directory."""
+    removed = 0
+    for suffix in (".gz", ".br"):
+        for path in directory.rglob(f"*{suffix}"):
+            if path.with_suffix("").suffix.lower() in TEXT_EXTENSIONS:
+                path.unlink()
+                removed += 1
+    return removed
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(description="Precompress static assets (gzip/brotli)")
+    parser.add_argument("--directory", type=Path, default=STATIC_DIR)
+    parser.add_argument("--force", action="store_true", help="Rebuild every sibling")
+    parser.add_argument("--clean", action="store_true", help="Remove the .gz/.br siblings instead")
+    args = parser.parse_args(argv[1:])
+
+    if args.clean:
+        print(f"Removed {clean_directory(args.directory)} precompressed files")
+        return
+
+    if brotli is None:
+        print("brotli is not installed: writing .gz files only")
+    stats = compress_directory(args.directory, args.force)
+    saved = stats["original_bytes"] - stats["compressed_bytes"]
+    print(
+        f"{stats['assets']} assets: {stats['written']} files written, {stats['up_to_date']} up to date"
+        + (f", {saved / 1024:.0f} kB saved on the rewritten files" if stats["written"] else "")
+    )
+
+
+if __name__ == "__main__":
+    main(sys.argv)
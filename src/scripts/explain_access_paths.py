@@ -0,0 +1,179 @@
+"""
+python -m src.scripts.explain_access_paths
+python -m src.scripts.explain_access_paths --repeat 20 --show-plans
+
+Script: explain_access_paths.py
+Purpose:
+  Verify with EXPLAIN (ANALYZE, BUFFERS) that the main receipt/report access
+  paths use the designed indexes, and time them (median of --repeat runs).
+
+  | access path                 | expected index                    |
+  |-----------------------------|-----------------------------------|
+  | receipts of a merchant      | idx_receipts_merchant_date_id     |
+  | receipt by barcode          | idx_receipts_barcode              |
+  | receipts in a date range    | idx_receipts_purchase_date_id     |
+  | items of a product_list     | idx_product_product_list_receipt  |
+  | totals of a page of receipts| idx_product_receipt_id_covering   |
+  | product search: barcode     | idx_product_list_barcode_prefix   |
+  | product search: name prefix | idx_product_list_name_prefix      |
+  | product search: similar name| idx_product_list_name_trgm        |
+
+  Exits with status 1 if an access path does not use its expected index.
+
+Notes:
+- PostgreSQL only.
+- Run it against a realistically sized database (e.g. generated with
+  `python -m src.scripts.load_json_to_db --generate big.json --receipts 100000`).
+  On tiny tables the planner rightly prefers sequential scans.
+"""
+import argparse
+import json
+import statistics
+import sys
+from datetime import timedelta
+
+from sqlalchemy import select, func, text
+from sqlalchemy.orm import Session
+
+from src.database import SessionLocal
+from src.models.receipt import Receipt
+from src.models.receipt_product import Product
+from src.models.product import ProductList
+from src.services import product_search
+
+
+def _pick_parameters(db: Session) -> dict:
+    """Pick realistic parameters from the data itself."""
+    merchant_id = db.execute(
+        select(Receipt.merchant_id).group_by(Receipt.merchant_id).order_by(func.count().desc()).limit(1)
+    ).scalar()
+    barcode = db.execute(select(Receipt.barcode).where(Receipt.barcode.isnot(None)).limit(1)).scalar()
+    max_date = db.execute(select(func.max(Receipt.purchase_date))).scalar()
+    product_list_id = db.execute(
+        select(Product.product_list_id).group_by(Product.product_list_id).order_by(func.count().desc()).limit(1)
+    ).scalar()
+    product_name, product_barcode = db.execute(
+        select(ProductList.name, ProductList.barcode).where(ProductList.barcode.isnot(None)).limit(1)
+    ).first() or (None, None)
+    receipt_ids = db.execute(
+        select(Receipt.id).order_by(Receipt.purchase_date.desc(), Receipt.id).limit(100)
+    ).scalars().all()
+
+    if merchant_id is None or max_date is None:
+        raise SystemExit("The database has no receipts; load some data first")
+
+    return {
+        "merchant_id": merchant_id,
+        "barcode": barcode or "",
+        "start_date": max_date - timedelta(days=90),
+        "end_date": max_date,
+        "product_list_id": product_list_id or 0,
+        "receipt_ids": receipt_ids or [0],
+        # Autocomplete-style queries: the first letters of a name / barcode
+        "search_name": (product_name or "product")[:4],
+        "search_barcode": (product_barcode or "0")[:4],
+    }
+
+
+def _access_paths(p: dict) -> list:
+    """(name, statement, expected index) for every access path."""
+    return [
+        (
+            "receipts of a merchant",
+            select(Receipt)
+            .where(Receipt.merchant_id == p["merchant_id"])
+            .order_by(Receipt.purchase_date.desc(), Receipt.id)
+            .limit(100),
+            "idx_receipts_merchant_date_id",
+        ),
+        (
+            "receipt by barcode",
+            select(Receipt).where(Receipt.barcode == p["barcode"]),
+            "idx_receipts_barcode",
+        ),
+        (
+            "receipts in a date range",
+            select(Receipt.id, Receipt.merchant_id)
+            .where(Receipt.purchase_date >= p["start_date"], Receipt.purchase_date <= p["end_date"]),
+            "idx_receipts_purchase_date_id",
+        ),
+        (
+            "items of a product_list",
+            select(Product.receipt_id).where(Product.product_list_id == p["product_list_id"]),
+            "idx_product_product_list_receipt",
+        ),
+        (
+            "totals of a page of receipts",
+            select(Product.receipt_id, func.sum(Product.line_total))
+            .where(Product.receipt_id.in_(p["receipt_ids"]))
+            .group_by(Product.receipt_id),
+            "idx_product_receipt_id_covering",
+        ),
+        (
+            "product search: barcode",
+            product_search.barcode_prefix_statement(p["search_barcode"], 20),
+            "idx_product_list_barcode_prefix",
+        ),
+        (
+            "product search: name prefix",
+            product_search.name_prefix_statement(p["search_name"], 20),
+            "idx_product_list_name_prefix",
+        ),
+        (
+            "product search: similar name",
+            product_search.similar_name_statement(p["search_name"], 20),
+            "idx_product_list_name_trgm",
+        ),
+    ]
+
+
+def _walk(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _walk(child)
+
+
+def explain(db: Session, stmt) -> dict:
+    sql = str(stmt.compile(db.get_bind(), compile_kwargs={"literal_binds": True}))
+    raw = db.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}")).scalar()
+    result = (json.loads(raw) if isinstance(raw, str) else raw)[0]
+    nodes = list(_walk(result["Plan"]))
+    return {
+        "execution_ms": result["Execution Time"],
+        "indexes": sorted({n["Index Name"] for n in nodes if "Index Name" in n}),
+        "scans": sorted({n["Node Type"] for n in nodes if "Scan" in n["Node Type"]}),
+        "plan": result["Plan"],
+    }
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(description="EXPLAIN-verify the receipt/report access paths")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per access path (median is reported)")
+    parser.add_argument("--show-plans", action="store_true", help="Print the full JSON plans")
+    args = parser.parse_args(argv[1:])
+
+    failures = 0
+    with SessionLocal() as db:
+        if db.get_bind().dialect.name != "postgresql":
+            raise SystemExit("This script requires PostgreSQL")
+
+        params = _pick_parameters(db)
+        print(f"{'access path':<30} {'median ms':>10}  {'index used':<36} scans")
+        for name, stmt, expected in _access_paths(params):
+            runs = [explain(db, stmt) for _ in range(max(1, args.repeat))]
+            last = runs[-1]
+            ok = expected in last["indexes"]
+            failures += not ok
+            print(
+                f"{name:<30} {statistics.median(r['execution_ms'] for r in runs):>10.3f}  "
+                f"{', '.join(last['indexes']) or '-':<36} {', '.join(last['scans'])}"
+                f"{'' if ok else f'  <-- expected {expected}'}"
+            )
+            if args.show_plans:
+                print(json.dumps(last["plan"], indent=2, default=str))
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
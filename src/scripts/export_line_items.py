@@ -0,0 +1,77 @@
+"""
+python -m src.scripts.export_line_items exports/ --partition month
+python -m src.scripts.export_line_items exports/ --format arrow --start 2025-01-01 --end 2025-12-31
+
+Script: export_line_items.py
+Purpose:
+  Write receipt line items (product ⋈ receipts ⋈ product_list ⋈ category ⋈ merchants)
+  as a Hive-style partitioned Parquet / Arrow IPC dataset for notebooks:
+
+    exports/purchase_year=2025/purchase_month=11/part-0.parquet
+
+  Read back with e.g. `pyarrow.dataset.dataset("exports/", partitioning="hive")`.
+
+Notes:
+- Requires the optional 'pyarrow' package.
+- Rows are streamed from a server-side cursor in row-group-sized batches.
+"""
+import argparse
+import sys
+from datetime import date
+from pathlib import Path
+
+from src.database import SessionLocal
+from src.services import export_services
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        description="Export receipt line items as a partitioned Parquet/Arrow dataset"
+    )
+    parser.add_argument("out_dir", help="Output directory for the dataset")
+    parser.add_argument(
+        "--format",
+        choices=sorted(export_services.EXPORT_FORMATS),
+        default="parquet",
+        help="Output file format",
+    )
+    parser.add_argument(
+        "--partition",
+        choices=sorted(export_services.PARTITION_MODES),
+        default="month",
+        help="Partition the dataset by purchase year or month",
+    )
+    parser.add_argument("--start", type=date.fromisoformat, default=None, help="Start date (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, default=None, help="End date (YYYY-MM-DD)")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=export_services.DEFAULT_BATCH_SIZE,
+        help="Rows per fetch / row group",
+    )
+    args = parser.parse_args(argv[1:])
+
+    if not export_services.is_available():
+        print("Error: 'pyarrow' is not installed", file=sys.stderr)
+        sys.exit(1)
+
+    out_dir = Path(args.out_dir).expanduser().resolve()
+
+    with SessionLocal() as db:
+        files = export_services.write_partitioned_line_items(
+            db,
+            out_dir,
+            export_format=args.format,
+            partition_by=args.partition,
+            start_date=args.start,
+            end_date=args.end,
+            batch_size=args.batch_size,
+        )
+
+    print(f"Wrote {len(files)} file(s) to {out_dir}")
+    for path in files:
+        print(f"  {path.relative_to(out_dir)}")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,53 @@
+"""
+python -m src.scripts.gc_uploads --dry-run
+python -m src.scripts.gc_uploads --quarantine --grace-hours 48
+python -m src.scripts.gc_uploads
+
+Script: gc_uploads.py
+Purpose:
+  Remove the files under uploads/ that no product or receipt references any
+  more (see src/services/upload_gc_services.py) and report the space
+  reclaimed.
+
+  --dry-run     only list the orphaned files (in the log) and their total size
+  --quarantine  move them to uploads-quarantine/ (same layout, not served)
+                instead of deleting them
+  --grace-hours files modified more recently are left alone (uploads in
+                progress, variants being generated)
+
+Notes:
+- The API does the same periodically when UPLOAD_GC_ENABLED=true.
+- Works with any database; the query is plain SQL.
+"""
+import argparse
+import sys
+
+from src.database import SessionLocal
+from src.services import upload_gc_services
+from src.settings import settings
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(description="Delete or quarantine orphaned uploads")
+    parser.add_argument("--dry-run", action="store_true", help="Report orphans without touching them")
+    parser.add_argument("--quarantine", action="store_true", help="Move orphans to uploads-quarantine/")
+    parser.add_argument(
+        "--grace-hours", type=float, default=settings.upload_gc_grace_hours,
+        help="Skip files modified within this many hours"
+    )
+    parser.add_argument("--batch-size", type=int, default=upload_gc_services.DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv[1:])
+
+    with SessionLocal() as db:
+        report = upload_gc_services.collect_orphans(
+            db,
+            grace_seconds=args.grace_hours * 60 * 60,
+            quarantine=args.quarantine,
+            dry_run=args.dry_run,
+            batch_size=args.batch_size,
+        )
+    print(report)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
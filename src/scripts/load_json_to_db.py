@@ -398,6 +398,7 @@ def load_receipts(db: Session, cache: Cache, items: Iterable[Dict[str, Any]]) ->
                 quantity=quantity,
                 description=description,
                 receipt=receipt,
+                purchase_date=r_date,
                 product_list=pl,
             )
             db.add(product)
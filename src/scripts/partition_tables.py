@@ -0,0 +1,169 @@
+"""
+python -m src.scripts.partition_tables status
+python -m src.scripts.partition_tables convert --months-ahead 3
+python -m src.scripts.partition_tables ensure
+python -m src.scripts.partition_tables detach --before 2023-01-01 [--drop]
+python -m src.scripts.partition_tables verify --start 2025-01-01 --end 2025-01-31
+python -m src.scripts.partition_tables revert
+
+Script: partition_tables.py
+Purpose:
+  Manage the optional monthly range partitioning of `receipts` and `product`
+  by purchase_date (see src/services/partition_services.py).
+
+  convert  rebuild both tables as partitioned tables (maintenance window:
+           takes ACCESS EXCLUSIVE locks while copying the rows)
+  revert   rebuild them as plain tables
+  ensure   create the partitions of the next --months-ahead months
+           (the API does this daily when PARTITION_MAINTENANCE_ENABLED=true)
+  detach   detach (or --drop) the partitions of months before --before
+  verify   run the date-filtered report queries with EXPLAIN and check that
+           only the partitions of the requested window are scanned.
+           Exits with status 1 if a query scans partitions outside it.
+
+Notes:
+- PostgreSQL only.
+- `alembic -x partition=true upgrade head` does the same as `convert`.
+"""
+import argparse
+import json
+import sys
+from datetime import date
+
+from sqlalchemy import event, text
+
+from src.database import SessionLocal, engine
+from src.services import partition_services, report_services
+from src.services.crud_category import CategoryService
+from src.services.crud_receipt import ReceiptService
+
+
+def _status() -> None:
+    with engine.connect() as conn:
+        for table in partition_services.PARTITIONED_TABLES:
+            if not partition_services.is_partitioned(conn, table):
+                print(f"{table}: not partitioned")
+                continue
+            partitions = partition_services.list_partitions(conn, table)
+            print(f"{table}: {len(partitions)} partitions")
+            for name, bound in partitions:
+                rows = conn.execute(text(f"SELECT count(*) FROM {name}")).scalar()
+                print(f"  {name:<24} {rows:>10}  {bound}")
+
+
+def _capture_statements(db, run) -> list:
+    """Run `run()` and return the (statement, parameters) of every SELECT it executes."""
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    # On the engine: some services commit, which hands the session a new connection
+    bind = db.get_bind()
+    event.listen(bind, "before_cursor_execute", before_cursor_execute)
+    try:
+        run()
+    finally:
+        event.remove(bind, "before_cursor_execute", before_cursor_execute)
+    return captured
+
+
+def _scanned_relations(plan: dict) -> set:
+    relations = {plan["Relation Name"]} if "Relation Name" in plan else set()
+    for child in plan.get("Plans", []):
+        relations |= _scanned_relations(child)
+    return relations
+
+
+def _outside_window(relations: set, tables: tuple, start: date, end: date) -> list:
+    first = partition_services.month_start(start)
+    last = partition_services.month_start(end)
+    outside = []
+    for name in sorted(relations):
+        table = next((t for t in tables if name.startswith(f"{t}_")), None)
+        month = partition_services.partition_month(name)
+        if table and month is not None and not first <= month <= last:
+            outside.append(name)
+    return outside
+
+
+def _verify(start: date, end: date, show_plans: bool) -> int:
+    # (name, callable, tables whose partitions must be pruned)
+    both = partition_services.PARTITIONED_TABLES
+    checks = [
+        ("spending by category", lambda db: report_services.get_spending_by_category(db, start, end, use_snapshot=False), both),
+        ("merchant report", lambda db: report_services.get_enriched_merchant_report(db, start, end, use_snapshot=False), both),
+        ("dashboard kpis", lambda db: report_services.get_dashboard_kpis(db, start, end, use_snapshot=False), both),
+        ("categories list", lambda db: CategoryService.get_categories(db, start_date=start, end_date=end), ("product",)),
+        # Items are eager-loaded by receipt id only: only receipts is pruned
+        ("receipts list", lambda db: ReceiptService.get_receipts(db, start_date=start, end_date=end), ("receipts",)),
+    ]
+
+    failures = 0
+    with SessionLocal() as db:
+        if not partition_services.is_partitioned(db.connection(), "receipts"):
+            raise SystemExit("The tables are not partitioned; run 'convert' first")
+
+        print(f"{'query':<22} {'partitions scanned':<60} result")
+        for name, run, tables in checks:
+            for statement, parameters in _capture_statements(db, lambda: run(db)):
+                raw = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+                plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+                relations = _scanned_relations(plan)
+                scanned = sorted(r for r in relations if any(r.startswith(f"{t}_") for t in tables))
+                outside = _outside_window(relations, tables, start, end)
+                failures += bool(outside)
+                print(f"{name:<22} {', '.join(scanned) or '-':<60} {'ok' if not outside else 'NOT PRUNED: ' + ', '.join(outside)}")
+                if show_plans:
+                    print(json.dumps(plan, indent=2, default=str))
+        db.rollback()
+
+    return failures
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(description="Manage the receipts/product range partitions")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="List partitions and their row counts")
+    convert = commands.add_parser("convert", help="Convert receipts/product to partitioned tables")
+    convert.add_argument("--months-ahead", type=int, default=partition_services.DEFAULT_MONTHS_AHEAD)
+    commands.add_parser("revert", help="Convert receipts/product back to plain tables")
+    ensure = commands.add_parser("ensure", help="Create the upcoming monthly partitions")
+    ensure.add_argument("--months-ahead", type=int, default=partition_services.DEFAULT_MONTHS_AHEAD)
+    detach = commands.add_parser("detach", help="Detach the partitions of months before a date")
+    detach.add_argument("--before", type=date.fromisoformat, required=True, help="Date (YYYY-MM-DD)")
+    detach.add_argument("--drop", action="store_true", help="Drop the detached partitions")
+    verify = commands.add_parser("verify", help="EXPLAIN the report queries and check partition pruning")
+    verify.add_argument("--start", type=date.fromisoformat, required=True, help="Start date (YYYY-MM-DD)")
+    verify.add_argument("--end", type=date.fromisoformat, required=True, help="End date (YYYY-MM-DD)")
+    verify.add_argument("--show-plans", action="store_true", help="Print the full JSON plans")
+    args = parser.parse_args(argv[1:])
+
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("This script requires PostgreSQL")
+
+    if args.command == "status":
+        _status()
+    elif args.command == "convert":
+        with engine.begin() as conn:
+            done = partition_services.convert_to_partitioned(conn, args.months_ahead)
+        print("Converted" if done else "Already partitioned")
+    elif args.command == "revert":
+        with engine.begin() as conn:
+            done = partition_services.convert_to_plain(conn)
+        print("Reverted" if done else "Not partitioned")
+    elif args.command == "ensure":
+        with engine.begin() as conn:
+            created = partition_services.ensure_future_partitions(conn, args.months_ahead)
+        print(f"Created: {', '.join(created) or 'nothing'}")
+    elif args.command == "detach":
+        with engine.begin() as conn:
+            detached = partition_services.detach_partitions_before(conn, args.before, args.drop)
+        print(f"{'Dropped' if args.drop else 'Detached'}: {', '.join(detached) or 'nothing'}")
+    elif args.command == "verify":
+        sys.exit(1 if _verify(args.start, args.end, args.show_plans) else 0)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,172 @@
+"""
+python -m src.scripts.purchase_date_index status
+python -m src.scripts.purchase_date_index set brin --pages-per-range 32
+python -m src.scripts.purchase_date_index benchmark --repeat 5
+
+Script: purchase_date_index.py
+Purpose:
+  Choose between B-tree and BRIN indexes on purchase_date for `receipts` and
+  `product` (see src/services/index_services.py), and benchmark both.
+
+  benchmark  builds whichever indexes are missing, then for each mode hides
+             the other kind (DROP INDEX inside a transaction that is rolled
+             back) and runs date-range scans over 1, 3 and 12 month windows
+             ending at the newest receipt with EXPLAIN (ANALYZE, BUFFERS).
+             Reports index sizes, median latency, buffers and plan shape.
+             Indexes built for the benchmark are dropped afterwards (--keep).
+
+Notes:
+- PostgreSQL only. The benchmark takes ACCESS EXCLUSIVE locks on both tables
+  while a mode is measured: run it on a copy or a staging database.
+- BRIN pays off when physical order follows purchase_date (see the
+  correlation printed by `status`; close to 1.0 is ideal).
+"""
+import argparse
+import json
+import statistics
+import sys
+from datetime import timedelta
+
+from sqlalchemy import text
+
+from src.database import engine
+from src.services import index_services, partition_services
+
+WINDOWS = (1, 3, 12)  # months
+DAYS_PER_MONTH = 30.44
+
+QUERIES = {
+    "receipts": "SELECT count(*), count(DISTINCT merchant_id) FROM receipts "
+                "WHERE purchase_date >= :start AND purchase_date <= :end",
+    "product": "SELECT count(*), sum(line_total) FROM product "
+               "WHERE purchase_date >= :start AND purchase_date <= :end",
+}
+
+
+def _autocommit():
+    return engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+
+
+def _index_size(conn, name: str) -> int:
+    """Size in bytes, summed over the partitions of a partitioned index."""
+    return conn.execute(
+        text("SELECT coalesce(sum(pg_relation_size(relid)), 0) FROM pg_partition_tree(to_regclass(:n))"),
+        {"n": name},
+    ).scalar() or 0
+
+
+def _status() -> None:
+    with engine.connect() as conn:
+        print(f"mode: {index_services.purchase_date_index_mode(conn)}")
+        for mode in index_services.PURCHASE_DATE_INDEX_MODES:
+            for table, (name, _) in index_services.index_definitions(mode).items():
+                present = conn.execute(text("SELECT to_regclass(:n) IS NOT NULL"), {"n": name}).scalar()
+                size = f"{_index_size(conn, name) / 1024:.0f} kB" if present else "-"
+                print(f"  {mode:<6} {table:<9} {name:<32} {size}")
+        for table in partition_services.PARTITIONED_TABLES:
+            correlation = conn.execute(
+                text("SELECT correlation FROM pg_stats WHERE tablename = :t AND attname = 'purchase_date'"),
+                {"t": table},
+            ).scalar()
+            print(f"  {table} purchase_date correlation: {correlation if correlation is not None else 'unknown (ANALYZE)'}")
+
+
+def _measure(conn, table: str, start, end, repeat: int) -> dict:
+    runs = []
+    for _ in range(max(1, repeat)):
+        raw = conn.execute(
+            text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {QUERIES[table]}"), {"start": start, "end": end}
+        ).scalar()
+        runs.append((json.loads(raw) if isinstance(raw, str) else raw)[0])
+
+    def walk(plan):
+        yield plan
+        for child in plan.get("Plans", []):
+            yield from walk(child)
+
+    plan = runs[-1]["Plan"]
+    nodes = list(walk(plan))
+    return {
+        "ms": statistics.median(r["Execution Time"] for r in runs),
+        # Buffer counts of the top node include its children
+        "buffers": plan.get("Shared Hit Blocks", 0) + plan.get("Shared Read Blocks", 0),
+        "scans": ", ".join(sorted({n["Node Type"] for n in nodes if "Scan" in n["Node Type"]})),
+    }
+
+
+def _benchmark(repeat: int, pages_per_range: int, keep: bool) -> None:
+    with _autocommit() as conn:
+        created = []
+        for mode in index_services.PURCHASE_DATE_INDEX_MODES:
+            created += index_services.create_indexes(conn, mode, pages_per_range)
+        for table in partition_services.PARTITIONED_TABLES:
+            conn.execute(text(f"ANALYZE {table}"))
+        newest = conn.execute(text("SELECT max(purchase_date) FROM receipts")).scalar()
+
+    if newest is None:
+        raise SystemExit("The database has no receipts; load some data first")
+
+    try:
+        with engine.connect() as conn:
+            print(f"{'mode':<6} {'table':<9} {'index size':>11}")
+            for mode in index_services.PURCHASE_DATE_INDEX_MODES:
+                for table, (name, _) in index_services.index_definitions(mode).items():
+                    print(f"{mode:<6} {table:<9} {_index_size(conn, name) / 1024:>8.0f} kB")
+            print()
+
+            print(f"{'mode':<6} {'table':<9} {'window':>7} {'median ms':>10} {'buffers':>8}  scans")
+            for mode in index_services.PURCHASE_DATE_INDEX_MODES:
+                other = "brin" if mode == "btree" else "btree"
+                transaction = conn.begin()
+                try:
+                    # Hide the other kind for this transaction only
+                    for _, (name, _) in index_services.index_definitions(other).items():
+                        conn.execute(text(f"DROP INDEX {name}"))
+                    for table in partition_services.PARTITIONED_TABLES:
+                        for months in WINDOWS:
+                            start = newest - timedelta(days=round(DAYS_PER_MONTH * months))
+                            result = _measure(conn, table, start, newest, repeat)
+                            print(
+                                f"{mode:<6} {table:<9} {months:>5}mo {result['ms']:>10.3f} "
+                                f"{result['buffers']:>8}  {result['scans']}"
+                            )
+                finally:
+                    transaction.rollback()
+    finally:
+        if not keep:
+            with _autocommit() as conn:
+                for name in created:
+                    concurrently = "" if conn.execute(
+                        text("SELECT relkind = 'I' FROM pg_class WHERE oid = to_regclass(:n)"), {"n": name}
+                    ).scalar() else " CONCURRENTLY"
+                    conn.execute(text(f"DROP INDEX{concurrently} IF EXISTS {name}"))
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(description="B-tree vs BRIN indexes on purchase_date")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="Show the current mode, index sizes and correlation")
+    set_mode = commands.add_parser("set", help="Switch the purchase_date indexes to a mode")
+    set_mode.add_argument("mode", choices=index_services.PURCHASE_DATE_INDEX_MODES)
+    set_mode.add_argument("--pages-per-range", type=int, default=index_services.DEFAULT_PAGES_PER_RANGE)
+    benchmark = commands.add_parser("benchmark", help="Compare size and range-scan latency of both modes")
+    benchmark.add_argument("--repeat", type=int, default=5, help="Runs per query (median is reported)")
+    benchmark.add_argument("--pages-per-range", type=int, default=index_services.DEFAULT_PAGES_PER_RANGE)
+    benchmark.add_argument("--keep", action="store_true", help="Keep the indexes built for the benchmark")
+    args = parser.parse_args(argv[1:])
+
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("This script requires PostgreSQL")
+
+    if args.command == "status":
+        _status()
+    elif args.command == "set":
+        with _autocommit() as conn:
+            index_services.set_purchase_date_index_mode(conn, args.mode, args.pages_per_range)
+        print(f"purchase_date indexes: {args.mode}")
+    elif args.command == "benchmark":
+        _benchmark(args.repeat, args.pages_per_range, args.keep)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,332 @@
+# src/services/analytics_snapshot.py
+
+from dataclasses import dataclass, fields, replace
+from datetime import date
+from typing import Iterable, List, Optional
+import logging
+import threading
+
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from src.models import (
+    merchant as model_merchant,
+    receipt as model_receipt,
+    product as model_product_list,
+    receipt_product as model_receipt_product,
+    category as model_category
+)
+from src.schemas import reports as schema_reports
+from src.services import money
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Columns:
+    """
+    Immutable set of NumPy columns of the same length, sorted by `date_ord`
+    so that a date window is a contiguous slice (two binary searches).
+    Subclasses declare the columns as dataclass fields, in query column order.
+    """
+
+    @classmethod
+    def from_rows(cls, rows: list) -> "_Columns":
+        names = [f.name for f in fields(cls)]
+        cols = list(zip(*rows)) if rows else [()] * len(names)
+        arrays = {}
+        for name, values in zip(names, cols):
+            if name == "date_ord":
+                arrays[name] = np.array([d.toordinal() for d in values], dtype=np.int32)
+            else:
+                arrays[name] = np.array([int(v) for v in values], dtype=np.int64)
+        built = cls(**arrays)
+        return built.take(np.argsort(built.date_ord, kind="stable"))
+
+    def take(self, index) -> "_Columns":
+        return type(self)(**{f.name: getattr(self, f.name)[index] for f in fields(self)})
+
+    def merge(self, other: "_Columns") -> "_Columns":
+        """Insert `other` (already date-sorted) keeping the date order."""
+        if other.date_ord.size == 0:
+            return self
+        positions = np.searchsorted(self.date_ord, other.date_ord, side="right")
+        return type(self)(**{
+            f.name: np.insert(getattr(self, f.name), positions, getattr(other, f.name))
+            for f in fields(self)
+        })
+
+    def window(self, start_date: Optional[date], end_date: Optional[date]) -> slice:
+        lo = 0 if start_date is None else int(np.searchsorted(self.date_ord, start_date.toordinal(), side="left"))
+        hi = self.date_ord.size if end_date is None else int(np.searchsorted(self.date_ord, end_date.toordinal(), side="right"))
+        return slice(lo, max(lo, hi))
+
+
+@dataclass(frozen=True)
+class _ItemColumns(_Columns):
+    """One row per line item."""
+    receipt_id: "np.ndarray"
+    date_ord: "np.ndarray"
+    merchant_id: "np.ndarray"
+    category_id: "np.ndarray"
+    product_list_id: "np.ndarray"
+    amount_cents: "np.ndarray"
+
+
+@dataclass(frozen=True)
+class _ReceiptColumns(_Columns):
+    """
+    One row per receipt, so that receipts without items are still counted
+    like the LEFT JOINs of the SQL merchant report do.
+    """
+    receipt_id: "np.ndarray"
+    date_ord: "np.ndarray"
+    merchant_id: "np.ndarray"
+
+
+@dataclass(frozen=True)
+class _State:
+    items: _ItemColumns
+    receipts: _ReceiptColumns
+
+
+def _group_sum(keys, weights) -> "np.ndarray":
+    if keys.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.rint(np.bincount(keys, weights=weights)).astype(np.int64)
+
+
+def _group_count(keys) -> "np.ndarray":
+    if keys.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.bincount(keys)
+
+
+def _at(array, idx: int) -> int:
+    return int(array[idx]) if idx < array.size else 0
+
+
+def _items_query(receipt_ids: Optional[Iterable[int]] = None):
+    Product = model_receipt_product.Product
+    Receipt = model_receipt.Receipt
+    ProductList = model_product_list.ProductList
+
+    stmt = (
+        select(
+            Product.receipt_id,
+            Receipt.purchase_date,
+            Receipt.merchant_id,
+            ProductList.category_id,
+            Product.product_list_id,
+            # line_total is already rounded to the cent; round() only guards
+            # against binary floats on SQLite
+            func.round(Product.line_total * money.CENTS_SCALE),
+        )
+        .join(Receipt, Product.receipt_id == Receipt.id)
+        .join(ProductList, Product.product_list_id == ProductList.id)
+    )
+    if receipt_ids is not None:
+        stmt = stmt.where(Product.receipt_id.in_(list(receipt_ids)))
+    return stmt
+
+
+def _receipts_query(receipt_ids: Optional[Iterable[int]] = None):
+    Receipt = model_receipt.Receipt
+    stmt = select(Receipt.id, Receipt.purchase_date, Receipt.merchant_id)
+    if receipt_ids is not None:
+        stmt = stmt.where(Receipt.id.in_(list(receipt_ids)))
+    return stmt
+
+
+class LineItemSnapshot:
+    """
+    Optional in-process columnar copy of receipt line items used to answer
+    the dashboard reports with vectorized group-bys instead of SQL.
+
+    Built once at startup from a single bulk query and kept current by the
+    write paths in the services (`notify_receipts_changed`,
+    `notify_product_lists_changed`). The state is replaced atomically, so
+    readers never take the lock. The SQL implementations in `report_services`
+    stay the fallback and the correctness oracle.
+
+    The snapshot is per process: with several workers, writes made by one
+    worker are not seen by the others until they rebuild.
+    """
+
+    def __init__(self):
+        self._state: Optional[_State] = None
+        self._lock = threading.Lock()
+
+    def is_ready(self) -> bool:
+        return self._state is not None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = None
+
+    # Build / incremental updates
+
+    def build(self, db: Session) -> None:
+        if np is None:
+            raise RuntimeError("The analytics snapshot requires the 'numpy' package to be installed")
+
+        items = _ItemColumns.from_rows(db.execute(_items_query()).all())
+        receipts = _ReceiptColumns.from_rows(db.execute(_receipts_query()).all())
+        with self._lock:
+            self._state = _State(items=items, receipts=receipts)
+        logger.info(f"Analytics snapshot built: {items.date_ord.size} items, {receipts.date_ord.size} receipts")
+
+    def refresh_receipts(self, db: Session, receipt_ids: Iterable[int]) -> None:
+        """Replace every row of the given receipts with their current DB state (deleted receipts just drop out)."""
+        receipt_ids = sorted(set(receipt_ids))
+        if not receipt_ids:
+            return
+
+        ids = np.array(receipt_ids, dtype=np.int64)
+
+        # Read under the lock so that concurrent refreshes of the same receipt
+        # are applied in order and the last one sees the latest committed state
+        with self._lock:
+            state = self._state
+            if state is None:
+                return
+            new_items = _ItemColumns.from_rows(db.execute(_items_query(receipt_ids)).all())
+            new_receipts = _ReceiptColumns.from_rows(db.execute(_receipts_query(receipt_ids)).all())
+            items = state.items.take(~np.isin(state.items.receipt_id, ids)).merge(new_items)
+            receipts = state.receipts.take(~np.isin(state.receipts.receipt_id, ids)).merge(new_receipts)
+            self._state = _State(items=items, receipts=receipts)
+
+    def refresh_product_lists(self, db: Session, product_list_ids: Iterable[int]) -> None:
+        """Re-read the category of the given product lists (the only denormalized product_list column)."""
+        product_list_ids = sorted(set(product_list_ids))
+        if not product_list_ids:
+            return
+
+        ProductList = model_product_list.ProductList
+
+        with self._lock:
+            state = self._state
+            if state is None:
+                return
+            rows = db.execute(
+                select(ProductList.id, ProductList.category_id).where(ProductList.id.in_(product_list_ids))
+            ).all()
+            category_id = state.items.category_id.copy()
+            for product_list_id, new_category_id in rows:
+                category_id[state.items.product_list_id == product_list_id] = new_category_id
+            items = replace(state.items, category_id=category_id)
+            self._state = _State(items=items, receipts=state.receipts)
+
+    # Reports: each reads the state once, and returns None when there is none
+    # (not built, or reset by a failed refresh meanwhile): the caller uses SQL
+
+    def spending_by_category(
+        self,
+        db: Session,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> Optional[List[schema_reports.ReportSpendingByEntity]]:
+        state = self._state
+        if state is None:
+            return None
+        items = state.items
+        window = items.window(start_date, end_date)
+        keys = items.category_id[window]
+        totals = _group_sum(keys, items.amount_cents[window])
+        counts = _group_count(keys)
+
+        categories = db.execute(
+            select(model_category.Category.id, model_category.Category.name)
+        ).all()
+
+        result = []
+        for category_id, name in categories:
+            # Same semantics as the SQL report: with a date filter only
+            # categories with items in the window are returned
+            if (start_date or end_date) and _at(counts, category_id) == 0:
+                continue
+            result.append(schema_reports.ReportSpendingByEntity(
+                entity_id=category_id,
+                name=name,
+                total_spent=money.cents_to_decimal(_at(totals, category_id))
+            ))
+
+        result.sort(key=lambda r: r.total_spent, reverse=True)
+        return result
+
+    def enriched_merchant_report(
+        self,
+        db: Session,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> Optional[List[schema_reports.MerchantReportData]]:
+        state = self._state
+        if state is None:
+            return None
+        window = state.items.window(start_date, end_date)
+        totals = _group_sum(state.items.merchant_id[window], state.items.amount_cents[window])
+        receipt_window = state.receipts.window(start_date, end_date)
+        receipt_counts = _group_count(state.receipts.merchant_id[receipt_window])
+
+        Merchant = model_merchant.Merchant
+        merchants = db.execute(select(Merchant.id, Merchant.name, Merchant.location)).all()
+
+        result = [
+            schema_reports.MerchantReportData(
+                id=merchant_id,
+                name=name,
+                location=location,
+                total_spent=money.cents_to_decimal(_at(totals, merchant_id)),
+                receipt_count=_at(receipt_counts, merchant_id)
+            )
+            for merchant_id, name, location in merchants
+        ]
+        result.sort(key=lambda r: r.total_spent, reverse=True)
+        return result
+
+    def dashboard_kpis(
+        self,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> Optional[dict]:
+        state = self._state
+        if state is None:
+            return None
+        items = state.items
+        window = items.window(start_date, end_date)
+        return {
+            "total_spent": money.cents_to_decimal(items.amount_cents[window].sum()),
+            "receipt_count": int(np.unique(items.receipt_id[window]).size),
+            "product_item_count": int(window.stop - window.start)
+        }
+
+
+snapshot = LineItemSnapshot()
+
+
+def notify_receipts_changed(db: Session, receipt_ids: Iterable[int]) -> None:
+    """Called by the write paths after commit. No-op when the snapshot is disabled."""
+    if not snapshot.is_ready():
+        return
+    try:
+        snapshot.refresh_receipts(db, receipt_ids)
+    except Exception as e:
+        # Never fail a write because of the cache: drop it and fall back to SQL
+        logger.error(f"Error refreshing analytics snapshot, disabling it: {str(e)}", exc_info=True)
+        snapshot.reset()
+
+
+def notify_product_lists_changed(db: Session, product_list_ids: Iterable[int]) -> None:
+    """Called by the write paths after commit. No-op when the snapshot is disabled."""
+    if not snapshot.is_ready():
+        return
+    try:
+        snapshot.refresh_product_lists(db, product_list_ids)
+    except Exception as e:
+        logger.error(f"Error refreshing analytics snapshot, disabling it: {str(e)}", exc_info=True)
+        snapshot.reset()
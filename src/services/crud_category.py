@@ -8,8 +8,8 @@ import logging
 from src.models.receipt_product import Product
 from src.models.product import ProductList
 from src.models.category import Category
-from src.models.receipt import Receipt
 from src.schemas import category as category_schema
+from src.services import master_data
 
 logger = logging.getLogger(__name__)
 
@@ -23,8 +23,8 @@ AVAILABLE_COLORS = [
 class CategoryService:
     @staticmethod
     def get_category(db: Session, category_id: int) -> Optional[Category]:
-        """Get a category by ID."""
-        return db.query(Category).filter(Category.id == category_id).first()
+        """Get a category by ID (from the master data cache)."""
+        return master_data.get(db, Category, category_id)
 
     @staticmethod
     def get_categories(db: Session, skip: int = 0, limit: int = 100, start_date: date = None, end_date: date = None) -> List[dict]:
@@ -48,15 +48,13 @@ class CategoryService:
             # Get total item count across ALL categories
             total_query = db.query(func.count(Product.id)).join(
                 ProductList, Product.product_list_id == ProductList.id
-            ).join(
-                Receipt, Product.receipt_id == Receipt.id
             )
             
-            # Apply date filter if provided
+            # Apply date filter if provided (items carry the receipt date, no join needed)
             if start_date:
-                total_query = total_query.filter(Receipt.purchase_date >= start_date)
+                total_query = total_query.filter(Product.purchase_date >= start_date)
             if end_date:
-                total_query = total_query.filter(Receipt.purchase_date <= end_date)
+                total_query = total_query.filter(Product.purchase_date <= end_date)
             
             total_items = total_query.scalar() or 1
             
@@ -65,30 +63,26 @@ class CategoryService:
                 # Build query for item count in this category
                 item_query = db.query(func.count(Product.id)).join(
                     ProductList, Product.product_list_id == ProductList.id
-                ).join(
-                    Receipt, Product.receipt_id == Receipt.id
                 ).filter(ProductList.category_id == category.id)
                 
                 # Apply date filter
                 if start_date:
-                    item_query = item_query.filter(Receipt.purchase_date >= start_date)
+                    item_query = item_query.filter(Product.purchase_date >= start_date)
                 if end_date:
-                    item_query = item_query.filter(Receipt.purchase_date <= end_date)
+                    item_query = item_query.filter(Product.purchase_date <= end_date)
                 
                 item_count = item_query.scalar() or 0
                 
                 # Build query for total spent in this category
-                spent_query = db.query(func.sum(Product.price)).join(
+                spent_query = db.query(func.sum(Product.line_total)).join(
                     ProductList, Product.product_list_id == ProductList.id
-                ).join(
-                    Receipt, Product.receipt_id == Receipt.id
                 ).filter(ProductList.category_id == category.id)
                 
                 # Apply date filter
                 if start_date:
-                    spent_query = spent_query.filter(Receipt.purchase_date >= start_date)
+                    spent_query = spent_query.filter(Product.purchase_date >= start_date)
                 if end_date:
-                    spent_query = spent_query.filter(Receipt.purchase_date <= end_date)
+                    spent_query = spent_query.filter(Product.purchase_date <= end_date)
                 
                 total_spent = spent_query.scalar() or 0.0
                 
@@ -122,14 +116,13 @@ class CategoryService:
         logger.info(f"Creating category: {category_data.name}")
         
         # Verificar se existem duplicados
-        existing = db.query(Category).filter_by(name=category_data.name).first()
-        if existing:
+        existing_categories = master_data.rows(db, Category)
+        if any(category.name == category_data.name for category in existing_categories):
             raise ValueError("Category with this name already exists")
 
         db_category = Category(**category_data.model_dump())
         
         # Get the next available color
-        existing_categories = db.query(Category).all()
         color_index = len(existing_categories) % len(AVAILABLE_COLORS)
         assigned_color = AVAILABLE_COLORS[color_index]
         
@@ -152,11 +145,10 @@ class CategoryService:
         """Update a category."""
         update_dict = update_data.model_dump(exclude_unset=True)
         if 'name' in update_dict:
-            existing = db.query(Category).filter(
-                Category.name == update_dict['name'],
-                Category.id != db_category.id
-            ).first()
-            if existing:
+            if any(
+                category.name == update_dict['name'] and category.id != db_category.id
+                for category in master_data.rows(db, Category)
+            ):
                 raise ValueError("Category with this name already exists")
 
         for key, value in update_dict.items():
@@ -5,6 +5,7 @@ import logging
 
 from src.models import measurement_unit as measurement_unit_model
 from src.schemas import measurement_unit as measurement_unit_schema
+from src.services import master_data
 
 
 logger = logging.getLogger(__name__)
@@ -12,9 +13,8 @@ logger = logging.getLogger(__name__)
 class MeasurementUnitService:
     @staticmethod
     def get_measurement_unit(db: Session, measurement_unit_id: int) -> Optional[measurement_unit_model.MeasurementUnit]:
-        """Get a measurement unit by ID."""
-        return db.query(measurement_unit_model.MeasurementUnit).filter(
-            measurement_unit_model.MeasurementUnit.id == measurement_unit_id).first()
+        """Get a measurement unit by ID (from the master data cache)."""
+        return master_data.get(db, measurement_unit_model.MeasurementUnit, measurement_unit_id)
 
     @staticmethod
     def get_measurement_units(db: Session, skip: int = 0, limit: int = 100) -> List[measurement_unit_model.MeasurementUnit]:
@@ -44,8 +44,8 @@ class MeasurementUnitService:
         logger.info(f"Creating measurement unit: {measurement_unit_data.name}")
 
         # Verificar se existem duplicados
-        existing = db.query(measurement_unit_model.MeasurementUnit).filter_by(name=measurement_unit_data.name).first()
-        if existing:
+        units = master_data.rows(db, measurement_unit_model.MeasurementUnit)
+        if any(unit.name == measurement_unit_data.name for unit in units):
             logger.warning(f"Duplicate measurement unit name: {measurement_unit_data.name}")
             raise ValueError(f"Measurement Unit '{measurement_unit_data.name}' already exists.")
 
@@ -72,8 +72,8 @@ class MeasurementUnitService:
         logger.info(f"Updating measurement unit: id={db_measurement_unit.id}")
         update_dict = update_data.model_dump(exclude_unset=True)
         if 'name' in update_dict:
-            existing = db.query(measurement_unit_model.MeasurementUnit).filter_by(name=update_dict['name']).first()
-            if existing and existing.id != db_measurement_unit.id:
+            units = master_data.rows(db, measurement_unit_model.MeasurementUnit)
+            if any(unit.name == update_dict['name'] and unit.id != db_measurement_unit.id for unit in units):
                 logger.warning(f"Duplicate measurement unit name during update: {update_dict['name']}")
                 raise ValueError(f"Measurement Unit '{update_dict['name']}' already exists.")
 
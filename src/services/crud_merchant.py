@@ -1,10 +1,12 @@
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Optional
 import logging
 
 from src.models import merchant as merchant_model
 from src.models.receipt import Receipt
 from src.schemas import merchant as merchant_schema
+from src.services import field_selection
+from src.services import master_data
 
 
 logger = logging.getLogger(__name__)
@@ -12,10 +14,8 @@ logger = logging.getLogger(__name__)
 class MerchantService:
     @staticmethod
     def get_merchant(db: Session, merchant_id: int) -> Optional[merchant_model.Merchant]:
-        """Get a merchant by ID."""
-        return db.query(merchant_model.Merchant).filter(
-            merchant_model.Merchant.id == merchant_id
-        ).first()
+        """Get a merchant by ID (from the master data cache)."""
+        return master_data.get(db, merchant_model.Merchant, merchant_id)
 
     @staticmethod
     def get_merchants(db: Session, skip: int = 0, limit: int = 100) -> List[merchant_model.Merchant]:
@@ -30,6 +30,14 @@ class MerchantService:
             logger.error(f"Error fetching merchants: {str(e)}", exc_info=True)
             raise
 
+    @staticmethod
+    def get_merchants_by_ids(db: Session, ids: List[int]) -> Dict[int, merchant_model.Merchant]:
+        """Get the merchants with these IDs in one query. Missing IDs are left out."""
+        if not ids:
+            return {}
+        merchants = db.query(merchant_model.Merchant).filter(merchant_model.Merchant.id.in_(ids)).all()
+        return field_selection.keyed(ids, merchants)
+
     @staticmethod
     def create_merchant(db: Session, merchant: merchant_schema.MerchantCreate) -> merchant_model.Merchant:
         logger.info(f"Creating merchant: {merchant.name}")
@@ -1,6 +1,6 @@
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from typing import List, Optional
+from typing import Dict, List, Optional
 from fastapi import HTTPException, status
 import logging
 
@@ -10,6 +10,11 @@ from src.schemas import product as product_list_schema
 
 from . import crud_measurement_unit
 from . import crud_category
+from . import analytics_snapshot
+from . import storage_services
+from . import field_selection
+from . import master_data
+from . import product_search
 
 
 logger = logging.getLogger(__name__)
@@ -17,37 +22,89 @@ logger = logging.getLogger(__name__)
 class ProductListService:
     @staticmethod
     def get_product_list(db: Session, product_list_id: int) -> Optional[product_list_model.ProductList]:
-        """Get a product by ID."""
-        return db.query(product_list_model.ProductList).filter(
+        """Get a product by ID, with its category and unit from the master data cache."""
+        db_product = db.query(product_list_model.ProductList).filter(
             product_list_model.ProductList.id == product_list_id
         ).first()
+        master_data.attach_product_lists(db, [db_product])
+        return db_product
 
     @staticmethod
-    def get_product_lists(db: Session, skip: int = 0, limit: int = 100) -> List[product_list_model.ProductList]:
-        """Get all product lists with pagination"""
+    def get_product_lists(
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        selection: Optional[field_selection.Selection] = None,
+    ) -> List[product_list_model.ProductList]:
+        """
+        Get all product lists with pagination.
+        Categories and units come from the master data cache.
+        With a `selection` (fields=/expand=) only the selected columns and relations are loaded.
+        """
         logger.info(f"Fetching product lists (skip={skip}, limit={limit})")
         
         try:
-            products = db.query(product_list_model.ProductList).offset(skip).limit(limit).all()
+            query = db.query(product_list_model.ProductList)
+            if selection is not None:
+                query = query.options(*field_selection.loader_options(field_selection.PRODUCT_LIST, selection))
+            products = query.offset(skip).limit(limit).all()
+            if selection is None:
+                master_data.attach_product_lists(db, products)
             logger.info(f"Returning {len(products)} product lists")
             return products
         except Exception as e:
             logger.error(f"Error fetching product lists: {str(e)}", exc_info=True)
             raise
 
+    @staticmethod
+    def get_product_lists_by_ids(
+        db: Session,
+        ids: List[int],
+        selection: Optional[field_selection.Selection] = None,
+    ) -> Dict[int, product_list_model.ProductList]:
+        """
+        Get the product lists with these IDs in one query, with their category
+        and measurement unit from the master data cache. Missing IDs are left out.
+        """
+        if not ids:
+            return {}
+        query = db.query(product_list_model.ProductList).filter(product_list_model.ProductList.id.in_(ids))
+        if selection is not None:
+            query = query.options(*field_selection.loader_options(field_selection.PRODUCT_LIST, selection))
+        products = field_selection.keyed(ids, query.all())
+        if selection is None:
+            master_data.attach_product_lists(db, products.values())
+        logger.info(f"Returning {len(products)} of {len(ids)} requested product lists")
+        return products
+
+    @staticmethod
+    def search_product_lists(db: Session, q: str, limit: int = 20) -> List[product_list_model.ProductList]:
+        """
+        Product lists matching `q` by name or barcode, best matches first
+        (see `product_search`). Raises ValueError for an empty query.
+        """
+        ids = product_search.search(db, q, limit)
+        products = ProductListService.get_product_lists_by_ids(db, ids)
+        logger.info(f"Product search {q!r}: {len(products)} results")
+        return list(products.values())
+
     @staticmethod
     def get_product_by_barcode(db: Session, barcode: str) -> Optional[product_list_model.ProductList]:
         """Get a product by barcode."""
-        return db.query(product_list_model.ProductList).filter(
+        db_product = db.query(product_list_model.ProductList).filter(
             product_list_model.ProductList.barcode == barcode
         ).first()
+        master_data.attach_product_lists(db, [db_product])
+        return db_product
 
     @staticmethod
     def get_product_by_name(db: Session, name: str) -> Optional[product_list_model.ProductList]:
         """Get a product by name."""
-        return db.query(product_list_model.ProductList).filter(
+        db_product = db.query(product_list_model.ProductList).filter(
             product_list_model.ProductList.name == name
         ).first()
+        master_data.attach_product_lists(db, [db_product])
+        return db_product
 
     @staticmethod
     def create_product_list(db: Session, product: product_list_schema.ProductListCreate):  # CORRIGE AQUI
@@ -59,6 +116,7 @@ class ProductListService:
         try:
             db.commit()
             db.refresh(db_product)
+            master_data.attach_product_lists(db, [db_product])
             logger.info(f"Product list created successfully: {db_product.name} (id={db_product.id})")
             return db_product
         except IntegrityError as e:
@@ -79,13 +137,26 @@ class ProductListService:
         
         if db_product:
             update_data = product_update.model_dump(exclude_unset=True)
+            old_photo = db_product.product_list_photo
             
             for key, value in update_data.items():
                 setattr(db_product, key, value)
 
+            # Photo replaced/removed: move the file references; resized copies belong to the previous photo
+            release_old_photo = False
+            if "product_list_photo" in update_data and update_data["product_list_photo"] != old_photo:
+                db_product.product_list_photo_variants = None
+                storage_services.acquire(db, db_product.product_list_photo)
+                release_old_photo = storage_services.release(db, old_photo)
+
             try:
                 db.commit()
                 db.refresh(db_product)
+                master_data.attach_product_lists(db, [db_product])
+                if release_old_photo:
+                    storage_services.delete_unreferenced(db, [old_photo])
+                if "category_id" in update_data:
+                    analytics_snapshot.notify_product_lists_changed(db, [product_id])
                 logger.info(f"Product list updated successfully: id={product_id}")
                 return db_product
             except Exception as e:
@@ -119,9 +190,13 @@ class ProductListService:
                 logger.warning(f"Cannot delete product list {product_id}: associated with {associated_products} receipt(s)")
                 raise Exception(f"Cannot delete product. It is associated with {associated_products} receipt(s).")
             
-            # Delete the product_list
+            # Delete the product_list (and its reference to the photo file)
+            photo = db_product_list.product_list_photo
+            release_photo = storage_services.release(db, photo)
             db.delete(db_product_list)
             db.commit()
+            if release_photo:
+                storage_services.delete_unreferenced(db, [photo])
             logger.info(f"Product list deleted successfully: id={product_id}")
             return True
             
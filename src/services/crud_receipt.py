@@ -1,6 +1,8 @@
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.exc import IntegrityError
-from typing import List, Optional
+from typing import Any, Callable, Dict, List, Optional, Set
 from decimal import Decimal
 from datetime import date
 from pydantic import BaseModel, Field
@@ -8,8 +10,16 @@ from pydantic import BaseModel, Field
 from src.models import receipt as model_receipt
 from src.models import receipt_product as model_receipt_product
 from src.models import merchant as model_merchant
+from src.models import product as model_product_list
+from src.schemas import product as schema_product
 from src.schemas import receipt as schema_receipt
 from src.services.crud_merchant import MerchantService
+from src.services import analytics_snapshot
+from src.services import money
+from src.services import storage_services
+from src.services import field_selection
+from src.services import item_diff
+from src.services import master_data
 
 
 class ReceiptBase(BaseModel):
@@ -20,17 +30,52 @@ class ReceiptBase(BaseModel):
 
 
 class ReceiptService:
+    # Full receipts: items and their products in one query each; merchants,
+    # categories and units come from the master data cache (master_data.attach_receipts)
+    FULL_LOAD = (
+        selectinload(model_receipt.Receipt.products)
+        .selectinload(model_receipt_product.Product.product_list),
+    )
+
     @staticmethod
     def _calculate_receipt_total(receipt: model_receipt.Receipt) -> Decimal:
-        """Calculate receipt total by summing price * quantity for all products."""
+        """
+        Calculate receipt total by summing price * quantity for all products.
+        Done in integer cents (see `money`): each line is rounded half-up to the cent.
+        """
         if not receipt.products:
             return Decimal("0.00")
-        
-        total = sum(
-            Decimal(str(product.price)) * Decimal(str(product.quantity))
-            for product in receipt.products
+
+        total_cents = money.sum_line_totals_cents(
+            (product.price, product.quantity) for product in receipt.products
+        )
+        return money.cents_to_decimal(total_cents)
+
+    @staticmethod
+    def _totals_by_receipt(db: Session, receipt_ids: List[int]) -> Dict[int, Decimal]:
+        """Receipt totals summed in SQL from the stored line totals (no items loaded)."""
+        if not receipt_ids:
+            return {}
+        Product = model_receipt_product.Product
+        rows = (
+            db.query(Product.receipt_id, func.sum(Product.line_total))
+            .filter(Product.receipt_id.in_(receipt_ids))
+            .group_by(Product.receipt_id)
+            .all()
         )
-        return total
+        return {receipt_id: money.cents_to_decimal(money.to_cents(total)) for receipt_id, total in rows}
+
+    @staticmethod
+    def _apply_selection(
+        db: Session, db_receipts: List[model_receipt.Receipt], selection: field_selection.Selection
+    ) -> List[model_receipt.Receipt]:
+        """Fill the computed fields a sparse fieldset asked for."""
+        if "total_price" in selection.fields:
+            totals = ReceiptService._totals_by_receipt(db, [r.id for r in db_receipts])
+            for db_receipt in db_receipts:
+                # Not a change to persist: the column itself is not maintained
+                set_committed_value(db_receipt, "total_price", totals.get(db_receipt.id, Decimal("0.00")))
+        return db_receipts
 
     @staticmethod
     def get_receipts(
@@ -41,15 +86,18 @@ class ReceiptService:
         barcode: Optional[str] = None,
         start_date: Optional[date] = None,
         end_date: Optional[date] = None,
+        selection: Optional[field_selection.Selection] = None,
     ) -> List[model_receipt.Receipt]:
-        """Get all receipts with optional filters and pagination."""
-        query = (
-            db.query(model_receipt.Receipt)
-            .options(
-                joinedload(model_receipt.Receipt.products),
-                joinedload(model_receipt.Receipt.merchant),
-            )
-        )
+        """
+        Get all receipts with optional filters and pagination.
+        With a `selection` (fields=/expand=) only the selected columns and
+        relations are loaded.
+        """
+        query = db.query(model_receipt.Receipt)
+        if selection is None:
+            query = query.options(*ReceiptService.FULL_LOAD)
+        else:
+            query = query.options(*field_selection.loader_options(field_selection.RECEIPT, selection))
 
         # Filtros opcionais
         if merchant_id is not None:
@@ -62,12 +110,15 @@ class ReceiptService:
             query = query.filter(model_receipt.Receipt.purchase_date <= end_date)
 
         db_receipts = (
-            query.order_by(model_receipt.Receipt.purchase_date.desc())
+            query.order_by(model_receipt.Receipt.purchase_date.desc(), model_receipt.Receipt.id)
             .offset(skip)
             .limit(limit)
             .all()
         )
+        if selection is not None:
+            return ReceiptService._apply_selection(db, db_receipts, selection)
 
+        master_data.attach_receipts(db, db_receipts)
         for db_receipt in db_receipts:
             if db_receipt.products is None:
                 db_receipt.products = []
@@ -75,6 +126,35 @@ class ReceiptService:
 
         return db_receipts
 
+    @staticmethod
+    def get_receipts_by_ids(
+        db: Session,
+        ids: List[int],
+        selection: Optional[field_selection.Selection] = None,
+    ) -> Dict[int, model_receipt.Receipt]:
+        """
+        Get the receipts with these IDs in one query. Their items and the items'
+        products are loaded in one query per relation (selectinload), whatever
+        the number of receipts, and merchants, categories and units come from
+        the master data cache. Missing IDs are left out.
+        """
+        if not ids:
+            return {}
+        query = db.query(model_receipt.Receipt).filter(model_receipt.Receipt.id.in_(ids))
+        if selection is None:
+            query = query.options(*ReceiptService.FULL_LOAD)
+        else:
+            query = query.options(*field_selection.loader_options(field_selection.RECEIPT, selection))
+
+        db_receipts = query.all()
+        if selection is not None:
+            ReceiptService._apply_selection(db, db_receipts, selection)
+        else:
+            master_data.attach_receipts(db, db_receipts)
+            for db_receipt in db_receipts:
+                db_receipt.total_price = ReceiptService._calculate_receipt_total(db_receipt)
+        return field_selection.keyed(ids, db_receipts)
+
     # Read - Get receipt by ID
     @staticmethod
     def get_receipt_by_id(db: Session, receipt_id: int) -> model_receipt.Receipt:
@@ -83,10 +163,7 @@ class ReceiptService:
         """
         db_receipt = (
             db.query(model_receipt.Receipt)
-            .options(
-                joinedload(model_receipt.Receipt.products),
-                joinedload(model_receipt.Receipt.merchant),
-            )
+            .options(*ReceiptService.FULL_LOAD)
             .filter(model_receipt.Receipt.id == receipt_id)
             .first()
         )
@@ -97,6 +174,7 @@ class ReceiptService:
         # Garante que os produtos estão carregados
         if db_receipt.products is None:
             db_receipt.products = []
+        master_data.attach_receipts(db, [db_receipt])
 
         db_receipt.total_price = ReceiptService._calculate_receipt_total(db_receipt)
         return db_receipt
@@ -127,11 +205,7 @@ class ReceiptService:
         """
         db_receipt = (
             db.query(model_receipt.Receipt)
-            .options(
-                joinedload(model_receipt.Receipt.products)
-                .joinedload(model_receipt_product.Product.product_list),
-                joinedload(model_receipt.Receipt.merchant),
-            )
+            .options(*ReceiptService.FULL_LOAD)
             .filter(model_receipt.Receipt.barcode == barcode)
             .first()
         )
@@ -139,62 +213,122 @@ class ReceiptService:
         if not db_receipt:
             raise ValueError(f"Receipt with barcode '{barcode}' not found")
 
+        master_data.attach_receipts(db, [db_receipt])
         db_receipt.total_price = ReceiptService._calculate_receipt_total(db_receipt)
         return db_receipt
 
     # Read - Get receipts by merchant
     @staticmethod
     def get_receipts_by_merchant(
-        db: Session, merchant_id: int, skip: int = 0, limit: int = 100
+        db: Session,
+        merchant_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        selection: Optional[field_selection.Selection] = None,
     ) -> List[model_receipt.Receipt]:
         """
         Obtém todos os recibos de um comerciante específico.
         """
+        query = db.query(model_receipt.Receipt)
+        if selection is None:
+            query = query.options(*ReceiptService.FULL_LOAD)
+        else:
+            query = query.options(*field_selection.loader_options(field_selection.RECEIPT, selection))
+
         db_receipts = (
-            db.query(model_receipt.Receipt)
-            .options(
-                joinedload(model_receipt.Receipt.products)
-                .joinedload(model_receipt_product.Product.product_list),
-                joinedload(model_receipt.Receipt.merchant),
-            )
-            .filter(model_receipt.Receipt.merchant_id == merchant_id)
-            .order_by(model_receipt.Receipt.purchase_date.desc())
+            query.filter(model_receipt.Receipt.merchant_id == merchant_id)
+            .order_by(model_receipt.Receipt.purchase_date.desc(), model_receipt.Receipt.id)
             .offset(skip)
             .limit(limit)
             .all()
         )
+        if selection is not None:
+            return ReceiptService._apply_selection(db, db_receipts, selection)
 
+        master_data.attach_receipts(db, db_receipts)
         for db_receipt in db_receipts:
             db_receipt.total_price = ReceiptService._calculate_receipt_total(db_receipt)
 
         return db_receipts
 
+    @staticmethod
+    def _check_product_lists(db: Session, product_list_ids: Set[int]) -> None:
+        """Raise ValueError unless every product list exists (one IN query)."""
+        if not product_list_ids:
+            return
+        found_ids = set(db.scalars(
+            select(model_product_list.ProductList.id)
+            .where(model_product_list.ProductList.id.in_(product_list_ids))
+        ))
+        missing = sorted(product_list_ids - found_ids)
+        if missing:
+            raise ValueError(f"ProductList ID(s) not found: {', '.join(map(str, missing))}")
+
     # Create
     @staticmethod
     def create_receipt(
-        db: Session, receipt_data: schema_receipt.ReceiptCreate
+        db: Session,
+        receipt_data: schema_receipt.ReceiptCreate,
+        before_commit: Optional[Callable[[Any], None]] = None,
     ) -> model_receipt.Receipt:
         """
-        Cria um novo recibo.
+        Cria um novo recibo, com os seus itens (`products`) se vierem no pedido.
+
+        Everything is written in one transaction with a constant number of
+        queries: the product lists are checked with one IN query, the items
+        are bulk-inserted in one statement and the stored total is set from
+        them. Nothing is written if any item is invalid.
+
+        `before_commit` is called with the created receipt inside the
+        transaction, before it is committed (see src/idempotency.py).
         """
         merchant = MerchantService.get_merchant(db, receipt_data.merchant_id)
         if not merchant:
             raise ValueError(f"Merchant ID '{receipt_data.merchant_id}' not found")
 
-        db_receipt = model_receipt.Receipt(**receipt_data.model_dump())
+        items = receipt_data.products
+        ReceiptService._check_product_lists(db, {item.product_list_id for item in items})
+
+        db_receipt = model_receipt.Receipt(**receipt_data.model_dump(exclude={"products"}))
+        db_receipt.total_price = money.cents_to_decimal(
+            money.sum_line_totals_cents((item.price, item.quantity) for item in items)
+        )
         db.add(db_receipt)
 
         try:
+            db.flush()
+            if items:
+                db.execute(insert(model_receipt_product.Product), [
+                    {
+                        **item.model_dump(),
+                        "receipt_id": db_receipt.id,
+                        "purchase_date": db_receipt.purchase_date,
+                    }
+                    for item in items
+                ])
+            if before_commit is not None:
+                before_commit(ReceiptService._load_created(db, db_receipt, merchant, bool(items)))
             db.commit()
         except IntegrityError:
             db.rollback()
             raise ValueError("Database constraint violation while creating receipt")
+        except Exception:
+            db.rollback()
+            raise
 
-        db.refresh(db_receipt)
+        analytics_snapshot.notify_receipts_changed(db, [db_receipt.id])
+        return ReceiptService._load_created(db, db_receipt, merchant, bool(items))
 
-        db_receipt.total_price = Decimal("0.00")
-        db_receipt.merchant = merchant
-        return db_receipt
+    @staticmethod
+    def _load_created(
+        db: Session, db_receipt: model_receipt.Receipt, merchant: model_merchant.Merchant, has_items: bool
+    ) -> model_receipt.Receipt:
+        if not has_items:
+            db.refresh(db_receipt)
+            db_receipt.merchant = merchant
+            return db_receipt
+        # Items with their products, categories and units: one query per relation
+        return ReceiptService.get_receipts_by_ids(db, [db_receipt.id])[db_receipt.id]
 
     # Update
     @staticmethod
@@ -220,17 +354,40 @@ class ReceiptService:
             if not merchant:
                 raise ValueError(f"Merchant ID '{update_dict['merchant_id']}' not found")
 
+        old_photo = db_receipt.receipt_photo
         for key, value in update_dict.items():
             setattr(db_receipt, key, value)
 
+        # Photo replaced/removed: move the file references; resized copies belong to the previous photo
+        release_old_photo = False
+        if "receipt_photo" in update_dict and update_dict["receipt_photo"] != old_photo:
+            db_receipt.receipt_photo_variants = None
+            storage_services.acquire(db, db_receipt.receipt_photo)
+            release_old_photo = storage_services.release(db, old_photo)
+
         try:
+            # Items carry a copy of the purchase date (partition key). The receipt
+            # row is flushed first: on partitioned tables the composite foreign key
+            # (receipt_id, purchase_date) must find the new date.
+            if "purchase_date" in update_dict:
+                db.flush()
+                db.query(model_receipt_product.Product).filter(
+                    model_receipt_product.Product.receipt_id == receipt_id
+                ).update(
+                    {model_receipt_product.Product.purchase_date: update_dict["purchase_date"]},
+                    synchronize_session=False
+                )
             db.commit()
         except IntegrityError:
             db.rollback()
             raise ValueError("Database constraint violation while updating receipt")
 
+        if release_old_photo:
+            storage_services.delete_unreferenced(db, [old_photo])
+
         db.refresh(db_receipt)
-        db.refresh(db_receipt.merchant)
+        master_data.attach_receipts(db, [db_receipt])
+        analytics_snapshot.notify_receipts_changed(db, [receipt_id])
 
         db_receipt.total_price = ReceiptService._calculate_receipt_total(db_receipt)
         return db_receipt
@@ -240,11 +397,13 @@ class ReceiptService:
     def update_receipt_products(
         db: Session,
         receipt_id: int,
-        products_data: List[dict]
+        products_data: List[schema_product.ProductUpsert]
     ) -> model_receipt.Receipt:
         """
-        Updates all products for a receipt.
-        Removes old products and creates new ones.
+        Replaces the items of a receipt with `products_data`, writing only the
+        difference (see `item_diff`): one bulk UPDATE, INSERT and DELETE at
+        most, and nothing at all when the list is unchanged. Items that are
+        kept keep their id. The change set is returned in `changes`.
         """
         db_receipt = db.query(model_receipt.Receipt).filter(
             model_receipt.Receipt.id == receipt_id
@@ -253,32 +412,51 @@ class ReceiptService:
         if not db_receipt:
             raise ValueError(f"Receipt with ID '{receipt_id}' not found")
 
-        try:
-            # Delete all existing products for this receipt
-            db.query(model_receipt_product.Product).filter(
-                model_receipt_product.Product.receipt_id == receipt_id
-            ).delete()
-
-            # Create new products
-            for product_data in products_data:
-                new_product = model_receipt_product.Product(
-                    receipt_id=receipt_id,
-                    product_list_id=product_data.get('product_list_id'),
-                    price=Decimal(str(product_data.get('price', 0))),
-                    quantity=Decimal(str(product_data.get('quantity', 1)))
+        Product = model_receipt_product.Product
+        stored = db.query(Product).filter(Product.receipt_id == receipt_id).order_by(Product.id).all()
+        diff = item_diff.diff_items(stored, products_data)
+        changes = schema_receipt.ReceiptItemChanges(
+            updated=[values["id"] for values in diff.updates],
+            deleted=diff.deletes,
+            unchanged=diff.unchanged,
+        )
+
+        if diff.has_changes:
+            ReceiptService._check_product_lists(db, {item.product_list_id for item in products_data})
+            try:
+                if diff.deletes:
+                    db.execute(
+                        delete(Product).where(Product.id.in_(diff.deletes)),
+                        execution_options={"synchronize_session": False},
+                    )
+                if diff.updates:
+                    # Bulk UPDATE by primary key, grouped by the set of changed columns
+                    db.execute(update(Product), diff.updates)
+                if diff.inserts:
+                    changes.inserted = list(db.scalars(
+                        insert(Product).returning(Product.id, sort_by_parameter_order=True),
+                        [
+                            {
+                                **item.model_dump(exclude={"id"}),
+                                "receipt_id": receipt_id,
+                                "purchase_date": db_receipt.purchase_date,
+                            }
+                            for item in diff.inserts
+                        ],
+                    ))
+                # Stored total (also moves updated_at, so the receipt shows as modified)
+                db_receipt.total_price = money.cents_to_decimal(
+                    money.sum_line_totals_cents((item.price, item.quantity) for item in products_data)
                 )
-                db.add(new_product)
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                raise ValueError("Database constraint violation while updating products")
 
-            db.commit()
-        except IntegrityError:
-            db.rollback()
-            raise ValueError("Database constraint violation while updating products")
+            analytics_snapshot.notify_receipts_changed(db, [receipt_id])
 
-        db.refresh(db_receipt)
-        
-        # Calculate and set total price
-        db_receipt.total_price = ReceiptService._calculate_receipt_total(db_receipt)
-        
+        db_receipt = ReceiptService.get_receipts_by_ids(db, [receipt_id])[receipt_id]
+        db_receipt.changes = changes
         return db_receipt
 
     # Delete
@@ -294,9 +472,119 @@ class ReceiptService:
         if not db_receipt:
             raise ValueError(f"Receipt with ID '{receipt_id}' not found")
 
+        photo = db_receipt.receipt_photo
+        release_photo = storage_services.release(db, photo)
         db.delete(db_receipt)
         try:
             db.commit()
         except IntegrityError:
             db.rollback()
             raise ValueError("Cannot delete receipt: integrity constraint violation")
+
+        if release_photo:
+            storage_services.delete_unreferenced(db, [photo])
+
+        analytics_snapshot.notify_receipts_changed(db, [receipt_id])
+
+    # Bulk
+    @staticmethod
+    def bulk_operations(
+        db: Session,
+        operations: List[schema_receipt.ReceiptBulkOperation],
+        before_commit: Optional[Callable[[Any], None]] = None,
+    ) -> schema_receipt.ReceiptBulkResponse:
+        """
+        Apply update/delete operations to many receipts in one transaction.
+
+        Each operation is one set-based statement over its receipt IDs
+        (`UPDATE ... WHERE id IN (...) RETURNING id`, same for DELETE), plus
+        one for the items' copy of purchase_date when it changes. Items are
+        deleted by the database (ON DELETE CASCADE). Operations run in order;
+        IDs that do not exist (or were deleted by an earlier operation) are
+        reported as not_found. Invalid operations reject the whole request.
+        `before_commit` is called with the response before the transaction
+        is committed (see src/idempotency.py).
+        """
+        Receipt = model_receipt.Receipt
+        Product = model_receipt_product.Product
+
+        for index, operation in enumerate(operations):
+            has_values = operation.values is not None and operation.values.model_fields_set
+            if operation.action == "update" and not has_values:
+                raise ValueError(f"Operation {index}: 'update' needs values to set")
+            if operation.action == "delete" and operation.values is not None:
+                raise ValueError(f"Operation {index}: 'delete' takes no values")
+            if has_values and None in operation.values.model_dump(exclude_unset=True).values():
+                raise ValueError(f"Operation {index}: merchant_id and purchase_date cannot be null")
+
+        merchant_ids = {
+            operation.values.merchant_id for operation in operations
+            if operation.action == "update" and operation.values.merchant_id is not None
+        }
+        if merchant_ids:
+            found = master_data.get_many(db, model_merchant.Merchant, merchant_ids)
+            missing = sorted(merchant_ids - found.keys())
+            if missing:
+                raise ValueError(f"Merchant ID(s) not found: {', '.join(map(str, missing))}")
+
+        results = []
+        touched = set()
+        released_photos = []
+        counts = {"updated": 0, "deleted": 0}
+        no_sync = {"synchronize_session": False}
+        try:
+            for index, operation in enumerate(operations):
+                receipt_ids = list(dict.fromkeys(operation.receipt_ids))
+                if operation.action == "delete":
+                    status = "deleted"
+                    for photo in db.scalars(
+                        select(Receipt.receipt_photo)
+                        .where(Receipt.id.in_(receipt_ids), Receipt.receipt_photo.is_not(None))
+                    ).all():
+                        if storage_services.release(db, photo):
+                            released_photos.append(photo)
+                    done = set(db.scalars(
+                        delete(Receipt).where(Receipt.id.in_(receipt_ids)).returning(Receipt.id),
+                        execution_options=no_sync,
+                    ))
+                else:
+                    status = "updated"
+                    values = operation.values.model_dump(exclude_unset=True)
+                    done = set(db.scalars(
+                        update(Receipt).where(Receipt.id.in_(receipt_ids)).values(**values).returning(Receipt.id),
+                        execution_options=no_sync,
+                    ))
+                    # Items carry a copy of the purchase date (partition key), see update_receipt
+                    if "purchase_date" in values and done:
+                        db.execute(
+                            update(Product).where(Product.receipt_id.in_(done))
+                            .values(purchase_date=values["purchase_date"]),
+                            execution_options=no_sync,
+                        )
+
+                counts[status] += len(done)
+                touched |= done
+                results += [
+                    schema_receipt.ReceiptBulkResult(
+                        operation=index, receipt_id=receipt_id, status=status if receipt_id in done else "not_found"
+                    )
+                    for receipt_id in receipt_ids
+                ]
+            response = schema_receipt.ReceiptBulkResponse(results=results, **counts)
+            if before_commit is not None:
+                before_commit(response)
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise ValueError("Database constraint violation in bulk operation")
+        except Exception:
+            db.rollback()
+            raise
+
+        # Rows changed behind the session's back
+        db.expire_all()
+        if released_photos:
+            storage_services.delete_unreferenced(db, released_photos)
+        analytics_snapshot.notify_receipts_changed(db, touched)
+
+        return response
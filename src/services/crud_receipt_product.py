@@ -9,6 +9,7 @@ from src.schemas import product as product_item_schema
 
 from .crud_receipt import ReceiptService
 from .crud_product_list import ProductListService
+from . import analytics_snapshot
 
 
 class ReceiptProductService:
@@ -47,7 +48,11 @@ class ReceiptProductService:
             )
 
         # Criar objeto Product (receipt_id vem da rota)
-        db_product_item = product_item_model.Product(**product_item_data.model_dump(), receipt_id=receipt_id)
+        db_product_item = product_item_model.Product(
+            **product_item_data.model_dump(),
+            receipt_id=receipt_id,
+            purchase_date=db_receipt.purchase_date
+        )
         db.add(db_product_item)
 
         try:
@@ -57,6 +62,7 @@ class ReceiptProductService:
             raise ValueError("Database constraint violation")
 
         db.refresh(db_product_item)
+        analytics_snapshot.notify_receipts_changed(db, [db_product_item.receipt_id])
         return db_product_item
 
 
@@ -82,12 +88,14 @@ class ReceiptProductService:
             raise ValueError("Database constraint violation")
 
         db.refresh(db_product_item)
+        analytics_snapshot.notify_receipts_changed(db, [db_product_item.receipt_id])
         return db_product_item
 
 
     @staticmethod
     def delete_product_item(db: Session, db_product_item: product_item_model.Product) -> product_item_model.Product:
         """Delete a product item."""
+        receipt_id = db_product_item.receipt_id
         db.delete(db_product_item)
 
         try:
@@ -96,4 +104,5 @@ class ReceiptProductService:
             db.rollback()
             raise ValueError("Cannot delete: Integrity constraint violation")
 
+        analytics_snapshot.notify_receipts_changed(db, [receipt_id])
         return db_product_item
\ No newline at end of file
@@ -0,0 +1,320 @@
+# src/services/export_services.py
+
+import os
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+from typing import Iterator, List, Optional
+import logging
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from src.models import (
+    merchant as model_merchant,
+    receipt as model_receipt,
+    product as model_product_list,
+    receipt_product as model_receipt_product,
+    category as model_category
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    pq = None
+
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per round trip from the server-side cursor.
+# Each batch becomes one Parquet row group / one Arrow record batch.
+DEFAULT_BATCH_SIZE = 65_536
+
+EXPORT_FORMATS = {"parquet", "arrow"}
+PARTITION_MODES = {"none", "year", "month"}
+
+
+def is_available() -> bool:
+    """True when the optional pyarrow dependency is installed."""
+    return pa is not None
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise RuntimeError("Columnar export requires the 'pyarrow' package to be installed")
+
+
+def _line_items_query(start_date: Optional[date] = None, end_date: Optional[date] = None):
+    """
+    product ⋈ receipts ⋈ product_list ⋈ category ⋈ merchants, one row per line item.
+    Ordered by purchase date so row-group statistics allow date pruning.
+    """
+    Product = model_receipt_product.Product
+    Receipt = model_receipt.Receipt
+    ProductList = model_product_list.ProductList
+
+    stmt = (
+        select(
+            Product.id.label("item_id"),
+            Product.receipt_id,
+            Receipt.purchase_date,
+            Receipt.merchant_id,
+            Product.product_list_id,
+            ProductList.name.label("product_name"),
+            ProductList.category_id,
+            Product.price,
+            Product.quantity,
+            Product.description,
+        )
+        .join(Receipt, Product.receipt_id == Receipt.id)
+        .join(ProductList, Product.product_list_id == ProductList.id)
+    )
+
+    if start_date:
+        stmt = stmt.where(Receipt.purchase_date >= start_date)
+    if end_date:
+        stmt = stmt.where(Receipt.purchase_date <= end_date)
+
+    return stmt.order_by(Receipt.purchase_date, Product.receipt_id, Product.id)
+
+
+def iter_line_item_batches(
+    db: Session,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> Iterator[list]:
+    """
+    Stream line items from a server-side cursor in lists of at most `batch_size` rows.
+    Merchant and category names are not joined per row; they are resolved from
+    the dictionaries built by `_load_dictionaries`.
+    """
+    stmt = _line_items_query(start_date, end_date).execution_options(yield_per=batch_size)
+    result = db.execute(stmt)
+    for partition in result.partitions():
+        yield partition
+
+
+@contextmanager
+def _snapshot(db: Session) -> Iterator[Session]:
+    """
+    A session reading one snapshot of the database for the whole export, so
+    every merchant and category ID in the streamed rows is in the dictionaries
+    loaded before them (a shared dictionary cannot be extended mid-file).
+
+    On PostgreSQL: one REPEATABLE READ transaction on a connection of its own
+    (the request's session may already be in a transaction). Other databases
+    (SQLite in development and tests) use the session as is.
+    """
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        yield db
+        return
+    with bind.connect() as connection:
+        connection = connection.execution_options(isolation_level="REPEATABLE READ")
+        with Session(bind=connection) as snapshot:
+            yield snapshot
+
+
+def _load_dictionaries(db: Session):
+    """
+    Load merchant and category names once.
+    Returns (names, index_by_id) pairs used to build dictionary-encoded columns
+    that share the same dictionary across every batch.
+    """
+    merchants = db.execute(
+        select(model_merchant.Merchant.id, model_merchant.Merchant.name).order_by(model_merchant.Merchant.id)
+    ).all()
+    categories = db.execute(
+        select(model_category.Category.id, model_category.Category.name).order_by(model_category.Category.id)
+    ).all()
+
+    merchant_names = pa.array([row.name for row in merchants], type=pa.string())
+    merchant_index = {row.id: idx for idx, row in enumerate(merchants)}
+    category_names = pa.array([row.name for row in categories], type=pa.string())
+    category_index = {row.id: idx for idx, row in enumerate(categories)}
+
+    return (merchant_names, merchant_index), (category_names, category_index)
+
+
+def line_item_schema():
+    """Arrow schema of the exported line items."""
+    _require_pyarrow()
+    names = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ("item_id", pa.int64()),
+        ("receipt_id", pa.int64()),
+        ("purchase_date", pa.date32()),
+        ("merchant_id", pa.int64()),
+        ("merchant_name", names),
+        ("product_list_id", pa.int64()),
+        ("product_name", pa.string()),
+        ("category_id", pa.int64()),
+        ("category_name", names),
+        ("price", pa.decimal128(12, 4)),
+        ("quantity", pa.decimal128(12, 4)),
+        ("description", pa.string()),
+    ])
+
+
+def _to_record_batch(rows: list, schema, merchants, categories):
+    merchant_names, merchant_index = merchants
+    category_names, category_index = categories
+
+    merchant_ids = [row.merchant_id for row in rows]
+    category_ids = [row.category_id for row in rows]
+
+    columns = [
+        pa.array([row.item_id for row in rows], type=pa.int64()),
+        pa.array([row.receipt_id for row in rows], type=pa.int64()),
+        pa.array([row.purchase_date for row in rows], type=pa.date32()),
+        pa.array(merchant_ids, type=pa.int64()),
+        pa.DictionaryArray.from_arrays(
+            pa.array([merchant_index[mid] for mid in merchant_ids], type=pa.int32()),
+            merchant_names
+        ),
+        pa.array([row.product_list_id for row in rows], type=pa.int64()),
+        pa.array([row.product_name for row in rows], type=pa.string()),
+        pa.array(category_ids, type=pa.int64()),
+        pa.DictionaryArray.from_arrays(
+            pa.array([category_index[cid] for cid in category_ids], type=pa.int32()),
+            category_names
+        ),
+        pa.array([row.price for row in rows], type=pa.decimal128(12, 4)),
+        pa.array([row.quantity for row in rows], type=pa.decimal128(12, 4)),
+        pa.array([row.description for row in rows], type=pa.string()),
+    ]
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+class _BatchWriter:
+    """Thin wrapper so Parquet and Arrow IPC files are written the same way."""
+
+    def __init__(self, sink, schema, export_format: str):
+        if export_format == "parquet":
+            self._writer = pq.ParquetWriter(sink, schema, compression="zstd")
+        else:
+            self._writer = pa.ipc.new_file(sink, schema)
+        self._format = export_format
+
+    def write(self, batch) -> None:
+        if self._format == "parquet":
+            # One batch == one row group
+            self._writer.write_batch(batch, row_group_size=batch.num_rows)
+        else:
+            self._writer.write_batch(batch)
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+def write_line_items(
+    db: Session,
+    sink,
+    export_format: str = "parquet",
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> int:
+    """
+    Write the line-item join to `sink` (path or binary file object) as Parquet or Arrow IPC.
+    Returns the number of rows written.
+    """
+    _require_pyarrow()
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format '{export_format}'")
+
+    schema = line_item_schema()
+    with _snapshot(db) as snapshot:
+        merchants, categories = _load_dictionaries(snapshot)
+
+        writer = _BatchWriter(sink, schema, export_format)
+        total_rows = 0
+        try:
+            for rows in iter_line_item_batches(snapshot, start_date, end_date, batch_size):
+                writer.write(_to_record_batch(rows, schema, merchants, categories))
+                total_rows += len(rows)
+        finally:
+            writer.close()
+
+    logger.info(f"Exported {total_rows} line items as {export_format} (dates={start_date} to {end_date})")
+    return total_rows
+
+
+def _partition_key(purchase_date: date, partition_by: str) -> str:
+    if partition_by == "year":
+        return f"purchase_year={purchase_date.year}"
+    return f"purchase_year={purchase_date.year}/purchase_month={purchase_date.month:02d}"
+
+
+def write_partitioned_line_items(
+    db: Session,
+    root_dir: Path,
+    export_format: str = "parquet",
+    partition_by: str = "month",
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> List[Path]:
+    """
+    Write a Hive-style partitioned dataset (purchase_year=YYYY/purchase_month=MM/part-0.parquet).
+    Rows arrive ordered by purchase date, so only one partition file is open at a time.
+    Returns the list of files written.
+    """
+    _require_pyarrow()
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format '{export_format}'")
+    if partition_by not in PARTITION_MODES:
+        raise ValueError(f"Unsupported partition mode '{partition_by}'")
+
+    if partition_by == "none":
+        root_dir.mkdir(parents=True, exist_ok=True)
+        path = root_dir / f"part-0.{export_format}"
+        write_line_items(db, str(path), export_format, start_date, end_date, batch_size)
+        return [path]
+
+    schema = line_item_schema()
+    with _snapshot(db) as snapshot:
+        merchants, categories = _load_dictionaries(snapshot)
+
+        written: List[Path] = []
+        current_key = None
+        writer = None
+        try:
+            for rows in iter_line_item_batches(snapshot, start_date, end_date, batch_size):
+                # Split the batch at partition boundaries (rows are date-ordered)
+                start = 0
+                while start < len(rows):
+                    key = _partition_key(rows[start].purchase_date, partition_by)
+                    end = start
+                    while end < len(rows) and _partition_key(rows[end].purchase_date, partition_by) == key:
+                        end += 1
+
+                    if key != current_key:
+                        if writer:
+                            writer.close()
+                        partition_dir = root_dir / key
+                        partition_dir.mkdir(parents=True, exist_ok=True)
+                        path = partition_dir / f"part-0.{export_format}"
+                        writer = _BatchWriter(str(path), schema, export_format)
+                        written.append(path)
+                        current_key = key
+
+                    writer.write(_to_record_batch(rows[start:end], schema, merchants, categories))
+                    start = end
+        finally:
+            if writer:
+                writer.close()
+
+    logger.info(f"Exported {len(written)} {partition_by} partitions to {root_dir}")
+    return written
+
+
+def remove_file(path: str) -> None:
+    """Background cleanup for temporary export files."""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,245 @@
+# src/services/field_selection.py
+
+"""
+Sparse fieldsets for list endpoints: `fields=` and `expand=`.
+
+    GET /receipts?fields=id,purchase_date,total_price
+    GET /receipts?fields=id,purchase_date,merchant.name
+    GET /receipts?expand=merchant,products.product_list.category
+    GET /products?fields=id,name&expand=category
+
+- `fields` lists the fields to return. A dotted name (`merchant.name`)
+  selects a field of a related object and includes that object; a bare
+  relation name (`merchant`) includes it with all its fields. `id` is
+  always returned.
+- `expand` lists relations (dotted for nested ones) to include with all
+  their fields, unless `fields` narrows them.
+- Relations that are neither listed nor expanded are left out, and so are
+  their joins: the query loads only the selected columns (`load_only`) and
+  the selected relations (`selectinload`).
+
+Without either parameter the endpoints return the full objects, as before.
+The response keeps the field names and formats of the full schema.
+
+The same endpoints fetch a batch of objects by id with `ids=`:
+
+    GET /products?ids=3,7,12
+    GET /receipts?ids=5,8&fields=id,total_price
+
+returning `{"3": {...}, "7": {...}}` (ids that do not exist are left out)
+from one `IN` query, with the relations loaded in batches too.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only, raiseload, selectinload
+
+from src.models import category as model_category
+from src.models import measurement_unit as model_measurement_unit
+from src.models import merchant as model_merchant
+from src.models import product as model_product_list
+from src.models import receipt as model_receipt
+from src.models import receipt_product as model_receipt_product
+from src.schemas import category as schema_category
+from src.schemas import measurement_unit as schema_measurement_unit
+from src.schemas import merchant as schema_merchant
+from src.schemas import product as schema_product
+from src.schemas import receipt as schema_receipt
+
+
+@dataclass(frozen=True)
+class Resource:
+    """How a schema maps onto an ORM model for field selection."""
+    name: str
+    model: Any
+    schema: type
+    # schema field -> related Resource
+    relations: Dict[str, "Resource"] = field(default_factory=dict)
+    # Fields computed by the service instead of read from a column
+    computed: Tuple[str, ...] = ()
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        """Schema fields stored in a column of the model."""
+        mapped = inspect(self.model).column_attrs.keys()
+        return tuple(
+            name for name in self.schema.model_fields
+            if name in mapped and name not in self.computed and name not in self.relations
+        )
+
+    @property
+    def defaulted(self) -> Tuple[str, ...]:
+        """Other schema fields (not stored): they keep their default value, as in the full response."""
+        return tuple(
+            name for name, info in self.schema.model_fields.items()
+            if name not in self.columns and name not in self.computed and name not in self.relations
+            and not info.is_required()
+        )
+
+    @property
+    def selectable(self) -> Tuple[str, ...]:
+        return self.columns + self.computed + self.defaulted
+
+
+@dataclass
+class Selection:
+    """Fields and nested relations requested for one level of the response."""
+    fields: List[str]
+    expand: Dict[str, "Selection"] = field(default_factory=dict)
+
+
+CATEGORY = Resource("category", model_category.Category, schema_category.Category)
+MEASUREMENT_UNIT = Resource(
+    "measurement_unit", model_measurement_unit.MeasurementUnit, schema_measurement_unit.MeasurementUnit
+)
+MERCHANT = Resource("merchant", model_merchant.Merchant, schema_merchant.Merchant)
+PRODUCT_LIST = Resource(
+    "product", model_product_list.ProductList, schema_product.ProductList,
+    relations={"category": CATEGORY, "measurement_unit": MEASUREMENT_UNIT},
+)
+RECEIPT_ITEM = Resource(
+    "item", model_receipt_product.Product, schema_product.Product,
+    relations={"product_list": PRODUCT_LIST},
+)
+RECEIPT = Resource(
+    "receipt", model_receipt.Receipt, schema_receipt.Receipt,
+    relations={"merchant": MERCHANT, "products": RECEIPT_ITEM},
+    # Not maintained in the table: summed from the items (see ReceiptService)
+    computed=("total_price",),
+)
+
+
+# Same bound as `limit` on the list endpoints
+MAX_IDS = 1000
+
+
+def _split(value: Optional[str]) -> List[str]:
+    return [part.strip() for part in (value or "").split(",") if part.strip()]
+
+
+def _selection_for(resource: Resource, paths: List[Tuple[str, ...]], expanded: List[Tuple[str, ...]]) -> Selection:
+    fields = []
+    children: Dict[str, Tuple[List, List]] = {}
+    for path in paths:
+        name = path[0]
+        if name in resource.relations:
+            child_paths, child_expanded = children.setdefault(name, ([], []))
+            if len(path) > 1:
+                child_paths.append(path[1:])
+        elif name in resource.selectable and len(path) == 1:
+            if name not in fields:
+                fields.append(name)
+        else:
+            raise ValueError(f"Unknown field '{'.'.join(path)}' for {resource.name}")
+    for path in expanded:
+        name = path[0]
+        if name not in resource.relations:
+            raise ValueError(f"Unknown relation '{'.'.join(path)}' for {resource.name}")
+        _, child_expanded = children.setdefault(name, ([], []))
+        if len(path) > 1:
+            child_expanded.append(path[1:])
+
+    if not paths:
+        # Nothing named at this level (bare relation or expand): all its fields
+        fields = list(resource.selectable)
+    if "id" not in fields:
+        fields.insert(0, "id")
+
+    return Selection(
+        fields=fields,
+        expand={
+            name: _selection_for(resource.relations[name], child_paths, child_expanded)
+            for name, (child_paths, child_expanded) in children.items()
+        },
+    )
+
+
+def parse_ids(value: Optional[str]) -> Optional[List[int]]:
+    """
+    `ids=3,1,3` -> [3, 1] (order kept, duplicates dropped); None when not
+    given. Raises ValueError for non-numeric ids or more than MAX_IDS.
+    """
+    if value is None:
+        return None
+    ids = []
+    for part in _split(value):
+        if not part.isdigit() or int(part) < 1:
+            raise ValueError(f"Invalid id '{part}'")
+        ids.append(int(part))
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > MAX_IDS:
+        raise ValueError(f"At most {MAX_IDS} ids per request")
+    return ids
+
+
+def keyed(ids: List[int], objects: List[Any]) -> Dict[int, Any]:
+    """{id: object} in the order of `ids`, for the ids that were found."""
+    found = {obj.id: obj for obj in objects}
+    return {id_: found[id_] for id_ in ids if id_ in found}
+
+
+def parse(resource: Resource, fields: Optional[str], expand: Optional[str]) -> Optional[Selection]:
+    """
+    Selection for the `fields` / `expand` query parameters; None when neither
+    is given (full response). Raises ValueError for unknown names.
+    """
+    field_paths = [tuple(name.split(".")) for name in _split(fields)]
+    expand_paths = [tuple(name.split(".")) for name in _split(expand)]
+    if not field_paths and not expand_paths:
+        return None
+
+    return _selection_for(resource, field_paths, expand_paths)
+
+
+def loader_options(resource: Resource, selection: Selection, extra_columns: Tuple[str, ...] = ()) -> list:
+    """
+    Query options loading only what `selection` needs: the selected columns,
+    the keys the relationships need, and the selected relations. Anything
+    else is never loaded (raiseload).
+    """
+    return _options(resource, selection, extra_columns, parent=None)
+
+
+def _options(resource: Resource, selection: Selection, extra_columns, parent) -> list:
+    mapper = inspect(resource.model)
+    columns = [name for name in selection.fields if name in resource.columns] + list(extra_columns)
+    relation_options = []
+    for name, child_selection in selection.expand.items():
+        prop = mapper.relationships[name]
+        # Foreign keys on this side (many-to-one) and on the child side (one-to-many)
+        columns += [column.key for column in prop.local_columns if column.key in mapper.column_attrs]
+        child_mapper = inspect(resource.relations[name].model)
+        child_keys = tuple(
+            column.key for column in prop.remote_side if column.key in child_mapper.column_attrs
+        )
+        loader = selectinload(getattr(resource.model, name)) if parent is None \
+            else parent.selectinload(getattr(resource.model, name))
+        relation_options += _options(resource.relations[name], child_selection, child_keys, loader)
+
+    load = load_only(*[getattr(resource.model, name) for name in dict.fromkeys(columns)])
+    if parent is None:
+        return [load, raiseload("*"), *relation_options]
+    return [parent.options(load, raiseload("*")), *relation_options]
+
+
+def build(resource: Resource, selection: Selection, obj: Any) -> BaseModel:
+    """
+    Schema instance holding only the selected values, without validation
+    (the values come from the database). Dump it with exclude_unset=True.
+    """
+    values = {
+        name: getattr(obj, name) for name in selection.fields
+        if name not in resource.defaulted or hasattr(obj, name)
+    }
+    fields_set = set(selection.fields) | set(selection.expand)
+    for name, child_selection in selection.expand.items():
+        child = resource.relations[name]
+        value = getattr(obj, name)
+        if isinstance(value, list):
+            values[name] = [build(child, child_selection, item) for item in value]
+        else:
+            values[name] = None if value is None else build(child, child_selection, value)
+    return resource.schema.model_construct(_fields_set=fields_set, **values)
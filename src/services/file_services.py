@@ -1,11 +1,13 @@
 # src/services/file_services.py
 
 import os
-import shutil
-import uuid
+import hashlib
 import logging
+import tempfile
 from pathlib import Path
-from fastapi import UploadFile, HTTPException, status
+from fastapi import BackgroundTasks, Request, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from python_multipart.multipart import MultipartParser, parse_options_header
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 
@@ -13,10 +15,7 @@ from src.models import product as model_product_list
 from src.models import receipt as model_receipt
 from .crud_product_list import ProductListService
 from .crud_receipt import ReceiptService
-
-BASE_DIR = Path(__file__).resolve().parent.parent.parent
-PRODUCT_UPLOAD_DIRECTORY = BASE_DIR / "uploads" / "products"
-RECEIPT_UPLOAD_DIRECTORY = BASE_DIR / "uploads" / "receipts"
+from . import image_services, storage_services
 
 logger = logging.getLogger(__name__)
 
@@ -25,103 +24,292 @@ ALLOWED_MIME_TYPES = {"image/jpeg", "image/png", "image/gif", "image/webp"}
 
 MAX_FILE_SIZE = 5 * 1024 * 1024
 
+# Room for the multipart boundaries and part headers around the file
+MAX_MULTIPART_OVERHEAD = 64 * 1024
 
-def save_product_photo(
-    db: Session,
-    product_list_id: int,
-    file: UploadFile
-) -> model_product_list.ProductList:
-    """Faz upload de uma foto para a ProductList com validações reforçadas."""
+UPLOAD_FIELD_NAME = "file"
 
-    logger.info(f"Uploading photo for product_list_id={product_list_id}, filename={file.filename}")
+# Body chunks are parsed (hashed and written to disk) in the threadpool, in
+# batches of about this size so small chunks do not cost a thread hop each
+PARSE_BATCH_SIZE = 256 * 1024
 
-    # 1. Validar produto
-    db_product = ProductListService.get_product_list(db, product_list_id)
-    if not db_product:
-        logger.warning(f"Product list not found: {product_list_id}")
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="ProductList not found"
-        )
 
-    # 2. Validar tipo de ficheiro
-    file_extension = Path(file.filename).suffix.lower()
-    if not file.content_type or file.content_type not in ALLOWED_MIME_TYPES or file_extension not in ALLOWED_EXTENSIONS:
-        logger.warning(f"Invalid file type: {file.content_type}, extension: {file_extension}")
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid file type. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
-        )
+def _file_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"File too large. Maximum allowed size is {MAX_FILE_SIZE // (1024*1024)} MB"
+    )
+
+
+def _invalid_file_type() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Invalid file type. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
+    )
+
+
+def _remove_quietly(path: Path) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Failed to delete file {path}: {e}")
+
+
+class _ImageUploadWriter:
+    """
+    python-multipart callbacks that write the image part of a multipart body
+    straight to a temporary file in the destination directory, hashing it
+    (SHA-256) on the way.
 
-    # 3. Validar tamanho máximo
-    file.file.seek(0, os.SEEK_END)
-    file_size = file.file.tell()
-    file.file.seek(0)
-    if file_size > MAX_FILE_SIZE:
-        logger.warning(f"File too large: {file_size} bytes (max: {MAX_FILE_SIZE})")
+    The part headers are validated before any byte is written, and the size
+    limit is enforced while the data arrives. Other form fields are ignored.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.filename = None
+        self.extension = None
+        self.content_type = None
+        self.temp_path = None
+        self.size = 0
+        self.complete = False
+        self._hash = hashlib.sha256()
+        self._file = None
+        self._headers = {}
+        self._header_field = bytearray()
+        self._header_value = bytearray()
+        self._in_file_part = False
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self) -> None:
+        self._headers = {}
+        self._in_file_part = False
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        self._headers[bytes(self._header_field).lower()] = bytes(self._header_value)
+        self._header_field.clear()
+        self._header_value.clear()
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if options.get(b"name", b"").decode("latin-1") != UPLOAD_FIELD_NAME or self._file is not None:
+            return
+
+        self.filename = options.get(b"filename", b"").decode("utf-8", errors="replace")
+        self.extension = Path(self.filename).suffix.lower()
+        self.content_type = self._headers.get(b"content-type", b"").decode("latin-1").strip().lower()
+        if self.content_type not in ALLOWED_MIME_TYPES or self.extension not in ALLOWED_EXTENSIONS:
+            logger.warning(f"Invalid file type: {self.content_type}, extension: {self.extension}")
+            raise _invalid_file_type()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix=".upload-", suffix=".part")
+        self.temp_path = Path(temp_path)
+        self._file = os.fdopen(fd, "wb")
+        self._in_file_part = True
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if not self._in_file_part:
+            return
+        self.size += end - start
+        if self.size > MAX_FILE_SIZE:
+            logger.warning(f"File too large: more than {MAX_FILE_SIZE} bytes received")
+            raise _file_too_large()
+        chunk = data[start:end]
+        self._hash.update(chunk)
+        self._file.write(chunk)
+
+    def on_part_end(self) -> None:
+        if self._in_file_part:
+            self._file.close()
+            self._in_file_part = False
+            self.complete = True
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+    def discard(self) -> None:
+        """Close and delete the temporary file (upload rejected or failed)."""
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+        if self.temp_path is not None:
+            _remove_quietly(self.temp_path)
+            self.temp_path = None
+
+
+async def receive_image(request: Request) -> storage_services.StoredUpload:
+    """
+    Stream the image of a multipart/form-data request (field 'file') into the
+    content-addressed blob directory (see storage_services).
+
+    The body is parsed chunk by chunk as it arrives: memory stays bounded,
+    the upload is aborted as soon as MAX_FILE_SIZE is exceeded, and the
+    file is written once, to a temporary file, hashed on the way; both run
+    in the threadpool, PARSE_BATCH_SIZE at a time, off the event loop.
+    `_set_photo` renames it atomically to its content address with
+    os.replace once the reference is committed (or discards it if the same
+    bytes are already stored).
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    boundary = options.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"File too large. Maximum allowed size is {MAX_FILE_SIZE // (1024*1024)} MB"
+            detail="Expected a multipart/form-data body with a 'file' field"
         )
 
-    # 4. Gerar nome seguro
-    safe_filename = f"product_{product_list_id}_{uuid.uuid4()}{file_extension}"
-    file_path_on_disk = PRODUCT_UPLOAD_DIRECTORY / safe_filename
-    file_path_in_db = f"/uploads/products/{safe_filename}"
+    # Reject before reading anything when the client announces a too large body
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_FILE_SIZE + MAX_MULTIPART_OVERHEAD:
+        logger.warning(f"File too large: Content-Length {content_length} bytes (max: {MAX_FILE_SIZE})")
+        raise _file_too_large()
 
-    # 5. Gravar no disco
+    writer = _ImageUploadWriter(storage_services.BLOB_DIRECTORY)
+    parser = MultipartParser(boundary, callbacks=writer.callbacks())
     try:
-        with open(file_path_on_disk, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        batch = bytearray()
+        async for chunk in request.stream():
+            batch += chunk
+            if len(batch) >= PARSE_BATCH_SIZE:
+                await run_in_threadpool(parser.write, bytes(batch))
+                batch.clear()
+        if batch:
+            await run_in_threadpool(parser.write, bytes(batch))
+        parser.finalize()
+
+        if not writer.complete:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No image received in the 'file' field"
+            )
+
+        upload = storage_services.stored_upload(writer.temp_path, writer.sha256, writer.content_type, writer.size)
+        writer.temp_path = None
+    except HTTPException:
+        writer.discard()
+        raise
     except Exception as e:
+        writer.discard()
         logger.error(f"Failed to save file to disk: {str(e)}", exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to save file to disk: {e}"
         )
-    finally:
-        file.file.close()
-
-    # 6. Apagar foto antiga
-    if db_product.product_list_photo:
-        try:
-            old_file_path = BASE_DIR / db_product.photo_url.lstrip('/')
-            if os.path.exists(old_file_path):
-                os.remove(old_file_path)
-                logger.info(f"Old photo deleted: {db_product.product_list_photo}")
-        except Exception as e:
-            logger.warning(f"Failed to delete old photo {db_product.product_list_photo}: {e}")
-
-    # 7. Atualizar Base de Dados
-    db_product.product_list_photo = file_path_in_db
-    db.add(db_product)
+
+    logger.info(f"File received: {upload.path} ({writer.size} bytes)")
+    return upload
+
+
+def _set_photo(db: Session, kind: str, db_entity, upload: storage_services.StoredUpload):
+    """
+    Point the entity at the uploaded blob and drop its reference to the
+    previous photo, then put the file in place (the reference is committed
+    first, see storage_services); the previous file (and its variants) is
+    deleted only if nothing else references it (runs in the threadpool).
+    """
+    _, attribute, variants_attribute = image_services.PHOTO_ATTRIBUTES[kind]
+    old_photo = getattr(db_entity, attribute)
+
     try:
+        storage_services.register(db, upload)
+        release_old = storage_services.release(db, old_photo)
+        setattr(db_entity, attribute, upload.path)
+        setattr(db_entity, variants_attribute, None)
+        db.add(db_entity)
         db.commit()
-        db.refresh(db_product)
-        logger.info(f"Product photo updated successfully for product_list_id={product_list_id}")
-        return db_product
     except IntegrityError as e:
         db.rollback()
-        logger.error(f"Database error updating product photo: {str(e)}", exc_info=True)
+        storage_services.discard(upload)
+        logger.error(f"Database error updating {attribute}: {str(e)}", exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Database error while updating photo URL"
         )
+    except Exception:
+        db.rollback()
+        storage_services.discard(upload)
+        raise
+    storage_services.place_blob(upload)
+    db.refresh(db_entity)
+
+    # Apagar foto antiga e as suas variantes, se já ninguém a usar
+    if release_old:
+        storage_services.delete_unreferenced(db, [old_photo])
+
+    return db_entity
+
+
+async def save_product_photo(
+    db: Session,
+    product_list_id: int,
+    request: Request,
+    background_tasks: BackgroundTasks
+) -> model_product_list.ProductList:
+    """
+    Faz upload (em streaming) de uma foto para a ProductList com validações reforçadas.
+    As variantes redimensionadas são geradas depois da resposta (image_services).
+    """
+
+    logger.info(f"Uploading photo for product_list_id={product_list_id}")
+
+    # 1. Validar produto (antes de ler o corpo do pedido)
+    db_product = await run_in_threadpool(ProductListService.get_product_list, db, product_list_id)
+    if not db_product:
+        logger.warning(f"Product list not found: {product_list_id}")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="ProductList not found"
+        )
 
+    # 2. Validar tipo e tamanho enquanto o ficheiro é gravado no disco
+    upload = await receive_image(request)
 
+    # 3. Atualizar Base de Dados e apagar foto antiga
+    db_product = await run_in_threadpool(_set_photo, db, "product_list", db_product, upload)
+    logger.info(f"Product photo updated successfully for product_list_id={product_list_id}")
 
+    # 4. Variantes (thumbnail, medium, WebP) fora do caminho do pedido
+    background_tasks.add_task(
+        image_services.generate_and_record_variants,
+        "product_list", product_list_id, upload.path, storage_services.disk_path(upload.path)
+    )
+    return db_product
 
-def save_receipt_photo(
+
+async def save_receipt_photo(
     db: Session,
     receipt_id: int,
-    file: UploadFile
+    request: Request,
+    background_tasks: BackgroundTasks
 ) -> model_receipt.Receipt:
-    """Faz upload de uma foto para o Receipt com validações reforçadas."""
-    logger.info(f"Uploading photo for receipt_id={receipt_id}, filename={file.filename}")
+    """
+    Faz upload (em streaming) de uma foto para o Receipt com validações reforçadas.
+    As variantes redimensionadas são geradas depois da resposta (image_services).
+    """
+    logger.info(f"Uploading photo for receipt_id={receipt_id}")
 
-    # 1. Validar receipt
+    # 1. Validar receipt (antes de ler o corpo do pedido)
     try:
-        db_receipt = ReceiptService.get_receipt_by_id(db, receipt_id)
+        db_receipt = await run_in_threadpool(ReceiptService.get_receipt_by_id, db, receipt_id)
     except ValueError:
         logger.warning(f"Receipt not found: {receipt_id}")
         raise HTTPException(
@@ -129,69 +317,16 @@ def save_receipt_photo(
             detail="Receipt not found"
         )
 
-    # 2. Validar tipo de ficheiro
-    file_extension = Path(file.filename).suffix.lower()
-    if not file.content_type or file.content_type not in ALLOWED_MIME_TYPES or file_extension not in ALLOWED_EXTENSIONS:
-        logger.warning(f"Invalid file type: {file.content_type}, extension: {file_extension}")
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid file type. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
-        )
-
-    # 3. Validar tamanho máximo
-    file.file.seek(0, os.SEEK_END)
-    file_size = file.file.tell()
-    file.file.seek(0)
-    if file_size > MAX_FILE_SIZE:
-        logger.warning(f"File too large: {file_size} bytes (max: {MAX_FILE_SIZE})")
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"File too large. Maximum allowed size is {MAX_FILE_SIZE // (1024*1024)} MB"
-        )
-
-    # 4. Gerar nome seguro
-    safe_filename = f"receipt_{receipt_id}_{uuid.uuid4()}{file_extension}"
-    file_path_on_disk = RECEIPT_UPLOAD_DIRECTORY / safe_filename
-    file_path_in_db = f"/uploads/receipts/{safe_filename}"
+    # 2. Validar tipo e tamanho enquanto o ficheiro é gravado no disco
+    upload = await receive_image(request)
 
-    logger.debug(f"Saving file to: {file_path_on_disk}")
+    # 3. Atualizar Base de Dados e apagar foto antiga
+    db_receipt = await run_in_threadpool(_set_photo, db, "receipt", db_receipt, upload)
+    logger.info(f"Receipt photo updated successfully for receipt_id={receipt_id}")
 
-    # 5. Gravar no disco
-    try:
-        with open(file_path_on_disk, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-            logger.info(f"File saved successfully: {safe_filename}")
-    except Exception as e:
-        logger.error(f"Failed to save file to disk: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to save file to disk: {e}"
-        )
-    finally:
-        file.file.close()
-
-    # 6. Apagar foto antiga
-    if db_receipt.receipt_photo:
-        try:
-            old_file_path = os.path.join("/app", db_receipt.receipt_photo.lstrip('/'))
-            if os.path.exists(old_file_path):
-                os.remove(old_file_path)
-                logger.info(f"Old receipt photo deleted: {db_receipt.receipt_photo}")
-        except Exception as e:
-            logger.warning(f"Failed to delete old receipt photo {db_receipt.receipt_photo}: {e}")
-
-    # 7. Atualizar Base de Dados
-    db_receipt.receipt_photo = file_path_in_db
-    db.add(db_receipt)
-    try:
-        db.commit()
-        db.refresh(db_receipt)
-        logger.info(f"Receipt photo updated successfully for receipt_id={receipt_id}")
-        return db_receipt
-    except IntegrityError as e:
-        db.rollback()
-        logger.error(f"Database error updating receipt photo: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Database error while updating receipt photo URL"
-        )
\ No newline at end of file
+    # 4. Variantes (thumbnail, medium, WebP) fora do caminho do pedido
+    background_tasks.add_task(
+        image_services.generate_and_record_variants,
+        "receipt", receipt_id, upload.path, storage_services.disk_path(upload.path)
+    )
+    return db_receipt
@@ -0,0 +1,161 @@
+# src/services/idempotency_services.py
+
+"""
+Storage of `Idempotency-Key` requests (see src/idempotency.py).
+
+The first request with a key reserves it (a row without response, committed
+before the endpoint runs, so a concurrent retry sees it). The endpoint
+stores its response on the row in the same transaction as its changes
+(`complete`), so either both are committed or neither; when it fails before
+that commit the row is removed and a retry runs again. Rows expire after
+IDEMPOTENCY_TTL_HOURS and are purged at most once per PURGE_INTERVAL by the
+requests themselves.
+
+A key is scoped to the method and path it was used with.
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from src.models.idempotency_key import IdempotencyKey
+from src.settings import settings
+
+logger = logging.getLogger(__name__)
+
+PURGE_INTERVAL = 60 * 60  # seconds
+
+_last_purge = 0.0
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    status_code: int
+    body: bytes
+    content_type: str
+
+
+@dataclass(frozen=True)
+class Reservation:
+    # "reserved": run the request; "replay": return `response`;
+    # "in_progress": the first request has not finished; "mismatch": key reused with another body
+    outcome: str
+    record_id: Optional[int] = None
+    response: Optional[StoredResponse] = None
+
+
+def _utc(value: datetime) -> datetime:
+    # SQLite returns naive datetimes (UTC)
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+def purge_expired(db: Session) -> int:
+    """Delete expired keys; returns how many. Commits."""
+    deleted = db.query(IdempotencyKey).filter(
+        IdempotencyKey.expires_at <= datetime.now(timezone.utc)
+    ).delete(synchronize_session=False)
+    db.commit()
+    if deleted:
+        logger.info(f"Purged {deleted} expired idempotency keys")
+    return deleted
+
+
+def _purge_if_due(db: Session) -> None:
+    global _last_purge
+    if time.monotonic() - _last_purge < PURGE_INTERVAL:
+        return
+    _last_purge = time.monotonic()
+    try:
+        purge_expired(db)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Could not purge idempotency keys: {str(e)}", exc_info=True)
+
+
+def _in_progress_timeout() -> timedelta:
+    # A reservation older than this without a response belongs to a request
+    # that died halfway: the key can be used again
+    return timedelta(minutes=settings.idempotency_in_progress_minutes)
+
+
+def reserve(db: Session, key: str, method: str, path: str, request_hash: str, ttl: timedelta) -> Reservation:
+    """Look up `key` for this method and path, reserving it if unused. Commits."""
+    _purge_if_due(db)
+    now = datetime.now(timezone.utc)
+
+    record = db.query(IdempotencyKey).filter(
+        IdempotencyKey.key == key,
+        IdempotencyKey.method == method,
+        IdempotencyKey.path == path,
+    ).first()
+    if record is not None and _utc(record.expires_at) <= now:
+        db.delete(record)
+        db.flush()
+        record = None
+    elif record is not None and record.status_code is None and _utc(record.created_at) <= now - _in_progress_timeout():
+        # Only while it has no response: the request may have completed since it was read
+        taken = db.query(IdempotencyKey).filter(
+            IdempotencyKey.id == record.id, IdempotencyKey.status_code.is_(None)
+        ).delete(synchronize_session=False)
+        db.expunge(record)
+        if not taken:
+            db.rollback()
+            return Reservation("in_progress")
+        record = None
+
+    if record is not None:
+        if record.request_hash != request_hash:
+            return Reservation("mismatch")
+        if record.status_code is None:
+            return Reservation("in_progress")
+        return Reservation("replay", response=StoredResponse(
+            status_code=record.status_code, body=record.response_body, content_type=record.content_type
+        ))
+
+    record = IdempotencyKey(
+        key=key, method=method, path=path, request_hash=request_hash, expires_at=now + ttl
+    )
+    db.add(record)
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent request with the same key reserved it first
+        db.rollback()
+        return Reservation("in_progress")
+    return Reservation("reserved", record_id=record.id)
+
+
+def complete(db: Session, record_id: int, response: StoredResponse) -> None:
+    """
+    Store the response of a reserved request in `db`'s transaction; the caller
+    commits it together with the changes the response reports.
+
+    Raises RuntimeError if the reservation is gone (it timed out and a retry
+    took the key over): the caller must roll back, or the retry would
+    duplicate its changes.
+    """
+    updated = db.query(IdempotencyKey).filter(
+        IdempotencyKey.id == record_id, IdempotencyKey.status_code.is_(None)
+    ).update({
+        IdempotencyKey.status_code: response.status_code,
+        IdempotencyKey.response_body: response.body,
+        IdempotencyKey.content_type: response.content_type,
+    }, synchronize_session=False)
+    if not updated:
+        raise RuntimeError(f"Idempotency key reservation {record_id} was taken over by a retry")
+
+
+def release(db: Session, record_id: int) -> None:
+    """
+    Drop the reservation of a request that failed, so it can be retried.
+    A stored response is kept: the request's changes were committed. Commits.
+    """
+    db.query(IdempotencyKey).filter(
+        IdempotencyKey.id == record_id, IdempotencyKey.status_code.is_(None)
+    ).delete(synchronize_session=False)
+    db.commit()
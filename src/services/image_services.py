@@ -0,0 +1,174 @@
+# src/services/image_services.py
+
+"""
+Resized variants of uploaded photos, generated off the request path.
+
+After an upload the route schedules `generate_and_record_variants` as a
+background task. The CPU-bound work (decode, resize, encode) runs in a
+process pool; the result is recorded on the entity as
+
+    {"thumb": "/uploads/blobs/ab/<sha256>_thumb.jpg",
+     "thumb_webp": "/uploads/blobs/ab/<sha256>_thumb_webp.webp",
+     "medium": "...", "medium_webp": "..."}
+
+in `ProductList.product_list_photo_variants` / `Receipt.receipt_photo_variants`.
+Variant files live next to the original and are named after it, so photos
+shared through content addressing (storage_services) share their variants.
+
+Requires the optional 'Pillow' package; without it no variants are made and
+pages keep using the original photo.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from src.database import SessionLocal
+from src.models import product as model_product_list
+from src.models import receipt as model_receipt
+from src.settings import settings
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - optional dependency
+    Image = None
+    ImageOps = None
+
+
+logger = logging.getLogger(__name__)
+
+# name -> (longest side in px, output format; None keeps the source format)
+VARIANTS = {
+    "thumb": (200, None),
+    "thumb_webp": (200, "WEBP"),
+    "medium": (800, None),
+    "medium_webp": (800, "WEBP"),
+}
+
+_EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "GIF": ".gif", "WEBP": ".webp"}
+_QUALITY = 82
+
+# entity kind -> (model, photo attribute, variants attribute)
+PHOTO_ATTRIBUTES = {
+    "product_list": (model_product_list.ProductList, "product_list_photo", "product_list_photo_variants"),
+    "receipt": (model_receipt.Receipt, "receipt_photo", "receipt_photo_variants"),
+}
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def is_available() -> bool:
+    """True when the optional Pillow dependency is installed."""
+    return Image is not None
+
+
+def variant_path(source: Path, name: str, image_format: str) -> Path:
+    """uploads/blobs/ab/<sha>.png + thumb_webp -> uploads/blobs/ab/<sha>_thumb_webp.webp"""
+    return source.with_name(f"{source.stem}_{name}{_EXTENSIONS[image_format]}")
+
+
+def generate_variants(source_path: str) -> Dict[str, str]:
+    """
+    Write every variant of the image at `source_path` next to it.
+    Returns {variant name: file path}. Runs in a worker process.
+    """
+    source = Path(source_path)
+    written = {}
+
+    with Image.open(source) as image:
+        source_format = image.format if image.format in _EXTENSIONS else "PNG"
+        # Phone photos are often stored sideways with an EXIF orientation tag
+        image = ImageOps.exif_transpose(image)
+
+        for name, (size, image_format) in VARIANTS.items():
+            image_format = image_format or source_format
+            target = variant_path(source, name, image_format)
+            # Content-addressed photos are shared: the variants may already exist
+            if target.exists():
+                written[name] = str(target)
+                continue
+
+            variant = image.copy()
+            variant.thumbnail((size, size), Image.Resampling.LANCZOS)
+
+            if image_format == "JPEG" and variant.mode not in ("RGB", "L"):
+                variant = variant.convert("RGB")
+            elif image_format == "GIF":
+                variant = variant.convert("P", palette=Image.Palette.ADAPTIVE)
+
+            temp = target.with_name(f".{target.name}.part")
+            options = {"quality": _QUALITY} if image_format in ("JPEG", "WEBP") else {}
+            variant.save(temp, format=image_format, optimize=image_format != "WEBP", **options)
+            os.replace(temp, target)
+            written[name] = str(target)
+
+    return written
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # Created lazily inside the running, multi-threaded server: "spawn" starts
+        # clean workers, where "fork" (the Linux default) could copy locks held by
+        # other threads (logging, the connection pool) and deadlock the child
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.image_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+def shutdown() -> None:
+    """Stop the worker processes (application shutdown)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _record_variants(kind: str, entity_id: int, photo: str, variants: Dict[str, str]) -> bool:
+    """Store the variant URLs if the entity still has the same photo. Runs in the threadpool."""
+    model, photo_attribute, variants_attribute = PHOTO_ATTRIBUTES[kind]
+    with SessionLocal() as db:
+        entity = db.get(model, entity_id)
+        # The photo may have been replaced or removed while the variants were made
+        if entity is None or getattr(entity, photo_attribute) != photo:
+            return False
+        setattr(entity, variants_attribute, variants)
+        db.commit()
+    return True
+
+
+async def generate_and_record_variants(kind: str, entity_id: int, photo: str, disk_path: Path) -> None:
+    """
+    Background task: build the variants of `photo` (URL path, file at `disk_path`)
+    in the process pool and record them on the entity.
+    """
+    if not is_available():
+        return
+
+    try:
+        loop = asyncio.get_running_loop()
+        written = await loop.run_in_executor(_get_executor(), generate_variants, str(disk_path))
+    except Exception as e:
+        logger.error(f"Could not generate variants for {photo}: {str(e)}", exc_info=True)
+        return
+
+    url_dir = photo.rsplit("/", 1)[0]
+    variants = {name: f"{url_dir}/{Path(path).name}" for name, path in written.items()}
+
+    try:
+        recorded = await run_in_threadpool(_record_variants, kind, entity_id, photo, variants)
+    except Exception as e:
+        logger.error(f"Could not record variants for {photo}: {str(e)}", exc_info=True)
+        recorded = False
+
+    # Not recorded: the files are shared with any other user of the photo and
+    # are deleted together with it (storage_services)
+    if recorded:
+        logger.info(f"Variants generated for {photo}: {', '.join(variants)}")
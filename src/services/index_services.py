@@ -0,0 +1,106 @@
+# src/services/index_services.py
+
+"""
+B-tree or BRIN indexing of `purchase_date` on `receipts` and `product` (PostgreSQL only).
+
+- "btree" (default, what the models declare): covering B-trees, good for
+  narrow windows and index-only scans.
+- "brin": block range indexes. Receipts arrive roughly in date order, so the
+  physical order follows purchase_date and a BRIN index (a min/max per block
+  range) is a few pages instead of a B-tree proportional to the row count.
+  Wide range scans read the matching block ranges with a bitmap heap scan.
+  `autosummarize` makes autovacuum summarize new block ranges as rows are appended.
+
+Switch with `alembic -x purchase_date_index=brin upgrade head` (when that
+migration runs) or `python -m src.scripts.purchase_date_index set brin`, and
+compare with `python -m src.scripts.purchase_date_index benchmark`.
+"""
+
+import logging
+from typing import Dict, List
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from src.services import partition_services
+
+logger = logging.getLogger(__name__)
+
+PURCHASE_DATE_INDEX_MODES = ("btree", "brin")
+DEFAULT_PAGES_PER_RANGE = 32
+
+# table -> (index name, columns and options)
+BTREE_INDEXES = {
+    "receipts": ("idx_receipts_purchase_date_id", "(purchase_date, id) INCLUDE (merchant_id)"),
+    "product": ("idx_product_purchase_date", "(purchase_date) INCLUDE (receipt_id, product_list_id, line_total)"),
+}
+BRIN_INDEXES = {
+    "receipts": "brin_receipts_purchase_date",
+    "product": "brin_product_purchase_date",
+}
+
+
+def _exists(conn: Connection, name: str) -> bool:
+    return bool(conn.execute(text("SELECT to_regclass(:n) IS NOT NULL"), {"n": name}).scalar())
+
+
+def index_definitions(mode: str, pages_per_range: int = DEFAULT_PAGES_PER_RANGE) -> Dict[str, tuple]:
+    """table -> (index name, CREATE INDEX tail) of one mode."""
+    if mode == "btree":
+        return {table: (name, f"USING btree {columns}") for table, (name, columns) in BTREE_INDEXES.items()}
+    if mode == "brin":
+        return {
+            table: (name, f"USING brin (purchase_date) WITH (pages_per_range = {int(pages_per_range)}, autosummarize = on)")
+            for table, name in BRIN_INDEXES.items()
+        }
+    raise ValueError(f"Unknown purchase_date index mode '{mode}'")
+
+
+def purchase_date_index_mode(conn: Connection) -> str:
+    """'btree', 'brin', 'both' or 'none', from the indexes present on receipts."""
+    btree = _exists(conn, BTREE_INDEXES["receipts"][0])
+    brin = _exists(conn, BRIN_INDEXES["receipts"])
+    if btree and brin:
+        return "both"
+    return "btree" if btree else "brin" if brin else "none"
+
+
+def create_indexes(conn: Connection, mode: str, pages_per_range: int = DEFAULT_PAGES_PER_RANGE) -> List[str]:
+    """
+    Create the indexes of `mode` where missing. Plain tables are indexed
+    CONCURRENTLY, which needs a connection in autocommit mode; partitioned
+    tables do not support CONCURRENTLY.
+    """
+    created = []
+    for table, (name, definition) in index_definitions(mode, pages_per_range).items():
+        if _exists(conn, name):
+            continue
+        concurrently = "" if partition_services.is_partitioned(conn, table) else " CONCURRENTLY"
+        conn.execute(text(f"CREATE INDEX{concurrently} {name} ON {table} {definition}"))
+        created.append(name)
+    return created
+
+
+def drop_indexes(conn: Connection, mode: str) -> List[str]:
+    """Drop the indexes of `mode` (same autocommit requirement as `create_indexes`)."""
+    dropped = []
+    for table, (name, _) in index_definitions(mode).items():
+        if not _exists(conn, name):
+            continue
+        concurrently = "" if partition_services.is_partitioned(conn, table) else " CONCURRENTLY"
+        conn.execute(text(f"DROP INDEX{concurrently} {name}"))
+        dropped.append(name)
+    return dropped
+
+
+def set_purchase_date_index_mode(
+    conn: Connection, mode: str, pages_per_range: int = DEFAULT_PAGES_PER_RANGE
+) -> None:
+    """Build the indexes of `mode` first, then drop the other kind, so a date index always exists."""
+    if conn.dialect.name != "postgresql":
+        raise RuntimeError("purchase_date index modes require PostgreSQL")
+
+    other = "brin" if mode == "btree" else "btree"
+    created = create_indexes(conn, mode, pages_per_range)
+    dropped = drop_indexes(conn, other)
+    logger.info(f"purchase_date indexes set to {mode} (created: {created}, dropped: {dropped})")
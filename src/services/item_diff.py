@@ -0,0 +1,94 @@
+# src/services/item_diff.py
+
+"""
+Diff between the items stored for a receipt and the full list sent by the
+client (PUT /receipts/{id}/products), so that only what changed is written.
+
+Incoming items are matched to stored ones
+  1. by `id`, when given (it must be an item of this receipt);
+  2. otherwise by product and position: the n-th incoming item of a product
+     without an id takes the n-th stored item of that product not matched
+     by id (stored items in id order).
+Matched items whose values differ become updates, unmatched incoming items
+inserts, and unmatched stored items deletes. Matched items keep their id.
+
+An incoming item that does not send `description` keeps the stored one.
+"""
+
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Sequence
+
+from src.schemas.product import ProductUpsert
+
+# Values compared and written for a matched item
+ITEM_FIELDS = ("product_list_id", "price", "quantity", "description")
+
+
+@dataclass
+class ItemDiff:
+    inserts: List[ProductUpsert] = field(default_factory=list)
+    # {"id": ..., changed field: new value}, ready for a bulk UPDATE by primary key
+    updates: List[Dict[str, Any]] = field(default_factory=list)
+    deletes: List[int] = field(default_factory=list)
+    unchanged: List[int] = field(default_factory=list)
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.inserts or self.updates or self.deletes)
+
+
+def _changes(stored: Any, incoming: ProductUpsert) -> Dict[str, Any]:
+    changes = {}
+    for name in ITEM_FIELDS:
+        if name == "description" and name not in incoming.model_fields_set:
+            continue
+        value = getattr(incoming, name)
+        # Decimal("1.2500") == Decimal("1.25"): scale differences are not changes
+        if getattr(stored, name) != value:
+            changes[name] = value
+    return changes
+
+
+def diff_items(stored: Sequence[Any], incoming: Sequence[ProductUpsert]) -> ItemDiff:
+    """
+    Compare the stored items (ORM objects, in id order) with the incoming list.
+    Raises ValueError for an id that is not one of the stored items or is sent twice.
+    """
+    by_id = {item.id: item for item in stored}
+    matched: Dict[int, ProductUpsert] = {}
+    for item in incoming:
+        if item.id is None:
+            continue
+        if item.id not in by_id:
+            raise ValueError(f"Item ID '{item.id}' does not belong to this receipt")
+        if item.id in matched:
+            raise ValueError(f"Item ID '{item.id}' is sent more than once")
+        matched[item.id] = item
+
+    free = defaultdict(deque)
+    for item in stored:
+        if item.id not in matched:
+            free[item.product_list_id].append(item)
+
+    diff = ItemDiff()
+    for item in incoming:
+        if item.id is not None:
+            continue
+        candidates = free[item.product_list_id]
+        if candidates:
+            matched[candidates.popleft().id] = item
+        else:
+            diff.inserts.append(item)
+
+    for stored_item in stored:
+        item = matched.get(stored_item.id)
+        if item is None:
+            diff.deletes.append(stored_item.id)
+            continue
+        changes = _changes(stored_item, item)
+        if changes:
+            diff.updates.append({"id": stored_item.id, **changes})
+        else:
+            diff.unchanged.append(stored_item.id)
+    return diff
@@ -0,0 +1,244 @@
+# src/services/master_data.py
+
+"""
+Process-local cache of the master data: categories, measurement units and merchants.
+
+These tables are small and rarely written, but nearly every response and
+validation touches them (a receipt's merchant, a product's category and
+unit). The cache keeps all their rows in memory so those lookups need no
+query:
+
+    merchant = master_data.get(db, Merchant, merchant_id)   # or None
+    master_data.attach_product_lists(db, product_lists)     # .category / .measurement_unit
+
+The cached rows are detached instances; `get` and the `attach_*` helpers
+hand the session its own copy (`Session.merge(load=False)`, no query), so
+callers can use and change the objects as if they had been loaded.
+
+Validity is tracked with the `table_versions` counters (services/table_versions):
+  - a commit that wrote one of the tables drops the cache in this process
+    (session events below);
+  - writes by other workers are noticed by comparing the counters, with one
+    small query at most every MASTER_DATA_CHECK_SECONDS (0: on every use).
+    Until then another worker's write may be missed for that long, except
+    for new rows: an ID missing from the cache is looked up in the database
+    (and, when found, the cache is reloaded on the next use).
+
+A session with uncommitted writes to these tables bypasses the cache and
+queries, so it sees its own changes and never caches them.
+MASTER_DATA_CACHE_ENABLED=false turns the cache off (every lookup queries).
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Type
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from src.models.category import Category
+from src.models.measurement_unit import MeasurementUnit
+from src.models.merchant import Merchant
+from src.services import table_versions
+from src.settings import settings
+
+logger = logging.getLogger(__name__)
+
+MASTER_MODELS = (Category, MeasurementUnit, Merchant)
+MASTER_TABLES = {model.__tablename__: model for model in MASTER_MODELS}
+
+# session.info key: master tables written by the session's open transaction
+_CHANGED_KEY = "master_data_changed"
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    versions: Dict[str, int]
+    rows: Dict[Type, Dict[int, Any]]  # model -> {id: detached instance}
+
+
+class MasterDataCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot: Optional[_Snapshot] = None
+        self._checked_at = 0.0
+        # Incremented by invalidate(): a load that started before is not stored
+        self._generation = 0
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._snapshot = None
+            self._generation += 1
+
+    def _versions(self, db: Session) -> Dict[str, int]:
+        return {
+            name: version
+            for name, (version, _) in table_versions.get_versions(db, MASTER_TABLES).items()
+        }
+
+    @staticmethod
+    def _load_rows(db: Session, model: Type) -> Dict[int, Any]:
+        attrs = inspect(model).column_attrs
+        rows = {}
+        for row in db.execute(select(*(getattr(model, attr.key) for attr in attrs))):
+            obj = model(**{attr.key: value for attr, value in zip(attrs, row)})
+            make_transient_to_detached(obj)
+            rows[obj.id] = obj
+        return rows
+
+    def snapshot(self, db: Session) -> _Snapshot:
+        """The cached rows, reloaded when the counters show a write since they were read."""
+        with self._lock:
+            snapshot, generation = self._snapshot, self._generation
+        now = time.monotonic()
+        if snapshot is not None and now - self._checked_at < settings.master_data_check_seconds:
+            return snapshot
+
+        # Counters before rows: a write in between makes the rows newer than
+        # their versions, which only causes one extra reload
+        versions = self._versions(db)
+        if snapshot is None or snapshot.versions != versions:
+            snapshot = _Snapshot(versions, {model: self._load_rows(db, model) for model in MASTER_MODELS})
+            logger.info(f"Loaded master data cache (versions {versions})")
+        with self._lock:
+            if self._generation == generation:
+                self._snapshot = snapshot
+                self._checked_at = now
+        return snapshot
+
+
+cache = MasterDataCache()
+
+
+def _cached(db: Session) -> bool:
+    return settings.master_data_cache_enabled and not db.info.get(_CHANGED_KEY)
+
+
+def _in_session(db: Session, obj: Any) -> Any:
+    """
+    The session's instance for a cached row: the one already loaded, or a
+    copy of the cached row (no query). An instance expired by a commit is
+    filled from the cache instead of being reloaded.
+    """
+    loaded = db.identity_map.get(inspect(obj).key)
+    if loaded is not None and not inspect(loaded).expired:
+        return loaded
+    return db.merge(obj, load=False)
+
+
+def rows(db: Session, model: Type) -> List[Any]:
+    """
+    All rows of a master table. Read-only: these may be the shared cached
+    instances, not objects of this session.
+    """
+    if not _cached(db):
+        return db.query(model).all()
+    return list(cache.snapshot(db).rows[model].values())
+
+
+def _query(db: Session, model: Type, ids: Iterable[int]) -> Dict[int, Any]:
+    return {obj.id: obj for obj in db.query(model).filter(model.id.in_(ids)).all()}
+
+
+def _query_missing(db: Session, model: Type, ids: Iterable[int]) -> Dict[int, Any]:
+    """
+    Rows the cache does not have: created since it was loaded (possibly by
+    another worker, before the counters are checked again) or not existing.
+    When any is found the cache is stale, so it is reloaded on the next use.
+    """
+    found = _query(db, model, ids)
+    if found:
+        cache.invalidate()
+    return found
+
+
+def get(db: Session, model: Type, row_id: Optional[int]) -> Optional[Any]:
+    """The row with this ID as an instance of this session, or None."""
+    if row_id is None:
+        return None
+    if not _cached(db):
+        return db.get(model, row_id)
+    obj = cache.snapshot(db).rows[model].get(row_id)
+    if obj is None:
+        return _query_missing(db, model, [row_id]).get(row_id)
+    return _in_session(db, obj)
+
+
+def get_many(db: Session, model: Type, ids: Iterable[int]) -> Dict[int, Any]:
+    """{id: instance of this session} for the IDs that exist."""
+    ids = {row_id for row_id in ids if row_id is not None}
+    if not ids:
+        return {}
+    if not _cached(db):
+        return _query(db, model, ids)
+    cached = cache.snapshot(db).rows[model]
+    found = {row_id: _in_session(db, cached[row_id]) for row_id in ids if row_id in cached}
+    missing = ids - found.keys()
+    if missing:
+        found.update(_query_missing(db, model, missing))
+    return found
+
+
+def _attach(db: Session, objects: List[Any], relation: str, model: Type, fk: str) -> None:
+    found = get_many(db, model, (getattr(obj, fk) for obj in objects))
+    for obj in objects:
+        # Loaded as if by the query: not a change to flush
+        set_committed_value(obj, relation, found.get(getattr(obj, fk)))
+
+
+def attach_product_lists(db: Session, product_lists: Iterable[Any]) -> None:
+    """Set `category` and `measurement_unit` on product lists from the cache."""
+    product_lists = [obj for obj in product_lists if obj is not None]
+    _attach(db, product_lists, "category", Category, "category_id")
+    _attach(db, product_lists, "measurement_unit", MeasurementUnit, "measurement_unit_id")
+
+
+def attach_receipts(db: Session, receipts: Iterable[Any]) -> None:
+    """
+    Set `merchant` on receipts, and the category and unit of their items'
+    products, from the cache. The items and products must be loaded.
+    """
+    receipts = [obj for obj in receipts if obj is not None]
+    _attach(db, receipts, "merchant", Merchant, "merchant_id")
+    attach_product_lists(db, {
+        item.product_list for receipt in receipts for item in receipt.products or []
+    })
+
+
+def _record(session: Session, tables: Iterable[Optional[str]]) -> None:
+    changed = set(tables) & set(MASTER_TABLES)
+    if changed:
+        session.info.setdefault(_CHANGED_KEY, set()).update(changed)
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session: Session, flush_context) -> None:
+    written = [*session.new, *session.deleted]
+    written += [obj for obj in session.dirty if session.is_modified(obj, include_collections=False)]
+    _record(session, (obj.__table__.name for obj in written if hasattr(obj, "__table__")))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _after_bulk_write(orm_execute_state) -> None:
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None:
+        _record(orm_execute_state.session, [mapper.local_table.name])
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    if session.info.pop(_CHANGED_KEY, None):
+        cache.invalidate()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _after_rollback(session: Session, previous_transaction) -> None:
+    # Nothing was written, and the session did not use the cache meanwhile;
+    # a rolled back savepoint keeps the outer transaction's writes
+    if not previous_transaction.nested:
+        session.info.pop(_CHANGED_KEY, None)
@@ -0,0 +1,58 @@
+# src/services/money.py
+
+"""
+Fixed-point money helpers used on the hot paths (receipt totals, reports).
+
+Line items store `price` and `quantity` as Numeric(12, 4), so internally
+both are handled as integers in units of 1/10_000 ("ten-thousandths"), which
+is exact for every value the column can hold. Totals are integer cents.
+
+Rounding rule: a line total is rounded to the cent once, half-up
+(price and quantity are never negative, so half-up == half away from zero,
+the same as PostgreSQL `round(numeric, 2)`). A receipt total is the sum of
+its rounded line totals.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Iterable, Tuple
+
+# Numeric(12, 4): 4 decimal places
+UNIT_SCALE = 10_000
+CENTS_SCALE = 100
+
+# price_units * quantity_units is scaled by UNIT_SCALE ** 2; dividing by this gives cents
+_LINE_DIVISOR = UNIT_SCALE * UNIT_SCALE // CENTS_SCALE
+
+
+def to_units(value) -> int:
+    """Convert a Numeric(12, 4) value (Decimal, int, float or str) to integer 1/10_000 units."""
+    if isinstance(value, int):
+        return value * UNIT_SCALE
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return int(value.scaleb(4).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def to_cents(value) -> int:
+    """Convert an amount (Decimal, int, float or str) to integer cents, rounding half-up."""
+    if isinstance(value, int):
+        return value * CENTS_SCALE
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return int(value.scaleb(2).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def line_total_cents(price, quantity) -> int:
+    """price * quantity in integer cents, computed exactly and rounded half-up once."""
+    product = to_units(price) * to_units(quantity)
+    return (product + _LINE_DIVISOR // 2) // _LINE_DIVISOR
+
+
+def sum_line_totals_cents(lines: Iterable[Tuple[object, object]]) -> int:
+    """Sum of the rounded line totals of (price, quantity) pairs, in cents."""
+    return sum(line_total_cents(price, quantity) for price, quantity in lines)
+
+
+def cents_to_decimal(cents: int) -> Decimal:
+    """Integer cents to a 2-decimal Decimal (e.g. 370 -> Decimal('3.70'))."""
+    return Decimal(int(cents)).scaleb(-2)
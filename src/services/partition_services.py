@@ -0,0 +1,362 @@
+# src/services/partition_services.py
+
+"""
+Optional declarative range partitioning of `receipts` and `product` by
+`purchase_date` (PostgreSQL only).
+
+Layout once converted:
+
+    receipts  PARTITION BY RANGE (purchase_date)
+      receipts_p2025_01   FOR VALUES FROM ('2025-01-01') TO ('2025-02-01')
+      ...
+      receipts_default    DEFAULT
+    product   PARTITION BY RANGE (purchase_date)    -- same monthly bounds
+      product_p2025_01 ...
+
+- `product.purchase_date` is a copy of its receipt's date (kept in sync by the
+  services), so a receipt and its items always live in the same month.
+- On a partitioned table every unique constraint must contain the partition
+  key: the primary keys become (id, purchase_date) and product references
+  receipts through (receipt_id, purchase_date) ON UPDATE/DELETE CASCADE.
+  `id` stays unique in practice because it still comes from the sequence.
+- Monthly partitions are created ahead of time (`ensure_future_partitions`);
+  rows outside the created months land in the DEFAULT partition, so inserts
+  never fail. A month whose rows already sit in DEFAULT is not split out
+  automatically (moving them would fire the ON DELETE CASCADE).
+- Old months can be detached (kept as plain tables, e.g. to pg_dump them)
+  or dropped with `detach_partitions_before`.
+
+The conversion rewrites both tables inside one transaction and holds
+ACCESS EXCLUSIVE locks while doing so: run it in a maintenance window,
+through `alembic -x partition=true upgrade head` or
+`python -m src.scripts.partition_tables convert`.
+
+The ORM models keep describing the plain layout (single-column primary keys);
+the application code is the same for both layouts.
+"""
+
+import logging
+import re
+from datetime import date
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+
+# Parent tables, in the order they are rebuilt
+PARTITIONED_TABLES = ("receipts", "product")
+PARTITION_KEY = "purchase_date"
+DEFAULT_MONTHS_AHEAD = 3
+
+_PARTITION_NAME = re.compile(r"_p(\d{4})_(\d{2})$")
+
+
+# ------------------ Month helpers ------------------
+
+def month_start(value: date) -> date:
+    """First day of the month of `value`."""
+    return value.replace(day=1)
+
+
+def add_months(value: date, months: int) -> date:
+    """First day of the month `months` after the month of `value`."""
+    index = value.year * 12 + (value.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    """e.g. ('receipts', 2025-01-xx) -> 'receipts_p2025_01'."""
+    return f"{table}_p{month.year:04d}_{month.month:02d}"
+
+
+def partition_month(name: str) -> Optional[date]:
+    """Inverse of `partition_name` (None for the DEFAULT partition)."""
+    match = _PARTITION_NAME.search(name)
+    if not match:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+# ------------------ Catalog ------------------
+
+def _require_postgresql(conn: Connection) -> None:
+    if conn.dialect.name != "postgresql":
+        raise RuntimeError("Table partitioning requires PostgreSQL")
+
+
+def is_partitioned(conn: Connection, table: str) -> bool:
+    """True if `table` is a partitioned (parent) table. Always False outside PostgreSQL."""
+    if conn.dialect.name != "postgresql":
+        return False
+    return bool(conn.execute(
+        text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:t))"),
+        {"t": table},
+    ).scalar())
+
+
+def list_partitions(conn: Connection, table: str) -> List[Tuple[str, str]]:
+    """(partition name, bound expression) of a partitioned table, ordered by name."""
+    rows = conn.execute(
+        text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:t) ORDER BY c.relname"
+        ),
+        {"t": table},
+    )
+    return [(name, bound) for name, bound in rows]
+
+
+def _insertable_columns(conn: Connection, table: str) -> List[str]:
+    """Columns in table order, without generated ones (they cannot be inserted)."""
+    return list(conn.execute(
+        text(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = :t AND is_generated = 'NEVER' "
+            "ORDER BY ordinal_position"
+        ),
+        {"t": table},
+    ).scalars())
+
+
+def _index_definitions(conn: Connection, table: str) -> List[str]:
+    """CREATE INDEX statements of the table's secondary indexes."""
+    definitions = conn.execute(
+        text(
+            "SELECT pg_get_indexdef(indexrelid) FROM pg_index "
+            "WHERE indrelid = to_regclass(:t) AND NOT indisprimary"
+        ),
+        {"t": table},
+    ).scalars()
+    # Indexes of a partitioned parent are reported as "ON ONLY <table>"
+    return [definition.replace(" ON ONLY ", " ON ") for definition in definitions]
+
+
+def _foreign_keys(conn: Connection, table: str) -> List[Tuple[str, str, str]]:
+    """(name, referenced table, definition) of the foreign keys declared on `table`."""
+    rows = conn.execute(
+        text(
+            "SELECT conname, confrelid::regclass::text, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE contype = 'f' AND conparentid = 0 AND conrelid = to_regclass(:t)"
+        ),
+        {"t": table},
+    )
+    return [tuple(row) for row in rows]
+
+
+def _incoming_foreign_keys(conn: Connection) -> List[Tuple[str, str, str]]:
+    """(table, name, referenced table) of foreign keys pointing at the partitioned tables."""
+    rows = conn.execute(
+        text(
+            "SELECT conrelid::regclass::text, conname, confrelid::regclass::text FROM pg_constraint "
+            "WHERE contype = 'f' AND conparentid = 0 "
+            "AND confrelid IN (to_regclass('receipts'), to_regclass('product'))"
+        )
+    )
+    return [tuple(row) for row in rows]
+
+
+# ------------------ Conversion ------------------
+
+def _create_month_partitions(conn: Connection, table: str, first: date, last: date) -> List[str]:
+    created = []
+    month = month_start(first)
+    while month <= last:
+        name = partition_name(table, month)
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        ))
+        created.append(name)
+        month = add_months(month, 1)
+    return created
+
+
+def _rebuild(conn: Connection, table: str, partitioned: bool, first: date, last: date) -> None:
+    """
+    Recreate `table` as a partitioned (or plain) table with the same columns,
+    defaults, CHECK constraints, generated columns, indexes and outgoing foreign
+    keys, and copy its rows. Foreign keys to `receipts` are handled by the caller.
+    """
+    legacy = f"{table}_legacy"
+    columns = ", ".join(_insertable_columns(conn, table))
+    indexes = _index_definitions(conn, table)
+    foreign_keys = [
+        (name, definition) for name, referenced, definition in _foreign_keys(conn, table)
+        if referenced != "receipts"
+    ]
+    sequence = conn.execute(text("SELECT pg_get_serial_sequence(:t, 'id')"), {"t": table}).scalar()
+
+    conn.execute(text(f"ALTER TABLE {table} RENAME TO {legacy}"))
+    conn.execute(text(
+        f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED)"
+        + (f" PARTITION BY RANGE ({PARTITION_KEY})" if partitioned else "")
+    ))
+    if partitioned:
+        _create_month_partitions(conn, table, first, last)
+        conn.execute(text(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT"))
+
+    conn.execute(text(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {legacy}"))
+
+    # The id sequence is owned by the old column: move it before dropping the old table
+    if sequence:
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id"))
+    conn.execute(text(f"DROP TABLE {legacy}"))
+
+    primary_key = f"id, {PARTITION_KEY}" if partitioned else "id"
+    conn.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY ({primary_key})"))
+    for definition in indexes:
+        conn.execute(text(definition))
+    for name, definition in foreign_keys:
+        conn.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}"))
+
+
+def _convert(conn: Connection, partitioned: bool, months_ahead: int) -> None:
+    unexpected = [
+        f"{source}.{name} -> {target}"
+        for source, name, target in _incoming_foreign_keys(conn)
+        if (source, target) != ("product", "receipts")
+    ]
+    if unexpected:
+        raise RuntimeError(f"Foreign keys would break; convert them first: {', '.join(unexpected)}")
+
+    for name, referenced, _ in _foreign_keys(conn, "product"):
+        if referenced == "receipts":
+            conn.execute(text(f"ALTER TABLE product DROP CONSTRAINT {name}"))
+
+    first_date = conn.execute(text(f"SELECT min({PARTITION_KEY}) FROM receipts")).scalar()
+    current = month_start(date.today())
+    first = month_start(first_date) if first_date else current
+    last = add_months(current, months_ahead)
+
+    for table in PARTITIONED_TABLES:
+        _rebuild(conn, table, partitioned, first, last)
+
+    if partitioned:
+        conn.execute(text(
+            "ALTER TABLE product ADD CONSTRAINT product_receipt_id_purchase_date_fkey "
+            "FOREIGN KEY (receipt_id, purchase_date) REFERENCES receipts (id, purchase_date) "
+            "ON UPDATE CASCADE ON DELETE CASCADE"
+        ))
+    else:
+        conn.execute(text(
+            "ALTER TABLE product ADD CONSTRAINT product_receipt_id_fkey "
+            "FOREIGN KEY (receipt_id) REFERENCES receipts (id) ON DELETE CASCADE"
+        ))
+
+
+def convert_to_partitioned(conn: Connection, months_ahead: int = DEFAULT_MONTHS_AHEAD) -> bool:
+    """
+    Convert `receipts` and `product` to monthly range-partitioned tables, with
+    partitions from the oldest receipt's month to `months_ahead` months from now.
+    Returns False if they are already partitioned. Runs in the caller's transaction.
+    """
+    _require_postgresql(conn)
+    if all(is_partitioned(conn, table) for table in PARTITIONED_TABLES):
+        return False
+
+    logger.info("Converting receipts/product to range-partitioned tables")
+    _convert(conn, partitioned=True, months_ahead=months_ahead)
+    analyze(conn)
+    return True
+
+
+def convert_to_plain(conn: Connection) -> bool:
+    """Inverse of `convert_to_partitioned`. Returns False if the tables are not partitioned."""
+    _require_postgresql(conn)
+    if not any(is_partitioned(conn, table) for table in PARTITIONED_TABLES):
+        return False
+
+    logger.info("Converting receipts/product back to plain tables")
+    _convert(conn, partitioned=False, months_ahead=0)
+    analyze(conn)
+    return True
+
+
+def analyze(conn: Connection) -> None:
+    """Refresh planner statistics (the parent tables are not auto-analyzed)."""
+    for table in PARTITIONED_TABLES:
+        conn.execute(text(f"ANALYZE {table}"))
+
+
+# ------------------ Maintenance ------------------
+
+def ensure_future_partitions(
+    conn: Connection,
+    months_ahead: int = DEFAULT_MONTHS_AHEAD,
+    today: Optional[date] = None,
+) -> List[str]:
+    """
+    Create the partitions for the current month and the next `months_ahead`
+    months where missing. No-op (returns []) if the tables are not partitioned.
+    Returns the names of the partitions created.
+    """
+    created = []
+    current = month_start(today or date.today())
+
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(conn, table):
+            continue
+
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            name = partition_name(table, month)
+            if conn.execute(text("SELECT to_regclass(:n) IS NOT NULL"), {"n": name}).scalar():
+                continue
+
+            # Creating the partition fails if DEFAULT already holds rows of that month
+            in_default = conn.execute(
+                text(
+                    f"SELECT EXISTS (SELECT 1 FROM {table}_default "
+                    f"WHERE {PARTITION_KEY} >= :start AND {PARTITION_KEY} < :end)"
+                ),
+                {"start": month, "end": add_months(month, 1)},
+            ).scalar()
+            if in_default:
+                logger.warning(f"Not creating {name}: {table}_default already has rows for that month")
+                continue
+
+            _create_month_partitions(conn, table, month, month)
+            created.append(name)
+
+    if created:
+        logger.info(f"Created partitions: {', '.join(created)}")
+    return created
+
+
+def detach_partitions_before(conn: Connection, before: date, drop: bool = False) -> List[str]:
+    """
+    Detach the monthly partitions that end on or before the month of `before`.
+
+    Detached partitions stay as ordinary tables (archive them with pg_dump,
+    move them to another tablespace...) unless `drop` is True.
+    Items are detached before their receipts, and lose their foreign key to
+    `receipts` so the receipt partition can be detached too.
+    """
+    _require_postgresql(conn)
+    cutoff = month_start(before)
+    detached = []
+
+    for table in reversed(PARTITIONED_TABLES):
+        if not is_partitioned(conn, table):
+            continue
+
+        for name, _ in list_partitions(conn, table):
+            month = partition_month(name)
+            if month is None or add_months(month, 1) > cutoff:
+                continue
+
+            conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            if drop:
+                conn.execute(text(f"DROP TABLE {name}"))
+            else:
+                for constraint, referenced, _ in _foreign_keys(conn, name):
+                    if referenced == "receipts":
+                        conn.execute(text(f"ALTER TABLE {name} DROP CONSTRAINT {constraint}"))
+            detached.append(name)
+
+    if detached:
+        logger.info(f"{'Dropped' if drop else 'Detached'} partitions: {', '.join(detached)}")
+    return detached
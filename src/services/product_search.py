@@ -0,0 +1,219 @@
+# src/services/product_search.py
+
+"""
+Product search for autocomplete (GET /products/search?q=).
+
+Results are ranked by kind of match, then alphabetically:
+
+  1. barcode equal to the query
+  2. name equal to the query (case-insensitive)
+  3. barcode starting with the query
+  4. name starting with the query
+  5. a word of the name starting with the query ("ban" -> "Madeira Banana");
+     on PostgreSQL, names similar to the query by pg_trgm word similarity
+     (which also covers typos), most similar first
+
+On PostgreSQL every kind is one `LIMIT` query answered from an index
+(see the ProductList model and `python -m src.scripts.explain_access_paths`):
+
+  | match                   | index                            |
+  |-------------------------|----------------------------------|
+  | barcode, barcode prefix | idx_product_list_barcode_prefix  |
+  | name, name prefix       | idx_product_list_name_prefix     |
+  | word similarity         | idx_product_list_name_trgm       |
+
+so a search reads at most `limit` rows per query, whatever the number of
+products. Other databases (SQLite in development and tests) use an
+in-memory prefix trie of names, name words and barcodes instead, rebuilt
+when the `product_list` change counter moves (services/table_versions).
+"""
+
+import logging
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, literal, select
+from sqlalchemy.orm import Session
+
+from src.models.product import ProductList
+from src.services import table_versions
+
+logger = logging.getLogger(__name__)
+
+MAX_RESULTS = 50
+
+_WORD = re.compile(r"\w+")
+_END = ""  # trie key of the values stored at a node (children are single characters)
+
+
+def _like_prefix(value: str) -> str:
+    """LIKE pattern matching strings that start with `value` (escape character: backslash)."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+# PostgreSQL statements, one per kind of match (also used by explain_access_paths)
+
+# The prefix indexes are in the "C" collation, where LIKE 'abc%' is a range
+# scan and the index order is the ORDER BY: the first `limit` rows are read
+
+def _barcode():
+    return ProductList.barcode.collate("C")
+
+
+def _lower_name():
+    return func.lower(ProductList.name).collate("C")
+
+
+def barcode_prefix_statement(q: str, limit: int):
+    return (
+        select(ProductList.id)
+        .where(_barcode().like(_like_prefix(q), escape="\\"))
+        .order_by(_barcode())
+        .limit(limit)
+    )
+
+
+def name_prefix_statement(q: str, limit: int):
+    lowered = _lower_name()
+    return (
+        select(ProductList.id)
+        .where(lowered.like(_like_prefix(q.lower()), escape="\\"))
+        .order_by(lowered)
+        .limit(limit)
+    )
+
+
+def similar_name_statement(q: str, limit: int):
+    # `q <% name`: word similarity above pg_trgm.word_similarity_threshold;
+    # `q <<-> name`: its distance, which the GiST index returns in order
+    return (
+        select(ProductList.id)
+        .where(literal(q).op("<%", is_comparison=True)(ProductList.name))
+        .order_by(literal(q).op("<<->")(ProductList.name), ProductList.name)
+        .limit(limit)
+    )
+
+
+def _search_postgresql(db: Session, q: str, limit: int) -> List[int]:
+    lowered = q.lower()
+    exact_barcode = db.scalars(select(ProductList.id).where(_barcode() == q)).all()
+    exact_name = db.scalars(select(ProductList.id).where(_lower_name() == lowered)).all()
+    barcodes = db.scalars(barcode_prefix_statement(q, limit)).all()
+    names = db.scalars(name_prefix_statement(q, limit)).all()
+    similar = db.scalars(similar_name_statement(q, limit)).all()
+    return _merge([exact_barcode, exact_name, barcodes, names, similar], limit)
+
+
+class PrefixTrie:
+    """Maps string keys to values; returns the values of every key starting with a prefix, in key order."""
+
+    def __init__(self):
+        self._root: Dict[str, dict] = {}
+
+    def add(self, key: str, value) -> None:
+        node = self._root
+        for char in key:
+            node = node.setdefault(char, {})
+        node.setdefault(_END, []).append(value)
+
+    def get(self, key: str) -> list:
+        """Values of exactly `key`."""
+        node = self._find(key)
+        return list(node.get(_END, ())) if node is not None else []
+
+    def search(self, prefix: str, limit: int) -> list:
+        """Values of the keys starting with `prefix`, in alphabetical order of key, at most `limit`."""
+        node = self._find(prefix)
+        if node is None:
+            return []
+        found = []
+        stack = [node]
+        while stack and len(found) < limit:
+            node = stack.pop()
+            found.extend(node.get(_END, ()))
+            # Reversed so the smallest character is popped first
+            stack.extend(node[char] for char in sorted((c for c in node if c != _END), reverse=True))
+        return found[:limit]
+
+    def _find(self, key: str) -> Optional[dict]:
+        node = self._root
+        for char in key:
+            node = node.get(char)
+            if node is None:
+                return None
+        return node
+
+
+class ProductIndex:
+    """In-memory search index of the product lists (the non-PostgreSQL fallback)."""
+
+    def __init__(self, rows: Iterable[Tuple[int, str, Optional[str]]]):
+        self.names = PrefixTrie()
+        self.words = PrefixTrie()
+        self.barcodes = PrefixTrie()
+        for product_id, name, barcode in rows:
+            lowered = name.lower()
+            self.names.add(lowered, product_id)
+            # The first word is already covered by the name itself
+            for word in {match.group() for match in _WORD.finditer(lowered) if match.start() > 0}:
+                self.words.add(word, product_id)
+            if barcode:
+                self.barcodes.add(barcode, product_id)
+
+    def search(self, q: str, limit: int) -> List[int]:
+        lowered = q.lower()
+        return _merge([
+            self.barcodes.get(q),
+            self.names.get(lowered),
+            self.barcodes.search(q, limit),
+            self.names.search(lowered, limit),
+            self.words.search(lowered, limit),
+        ], limit)
+
+
+_index_lock = threading.Lock()
+_index: Optional[Tuple[int, ProductIndex]] = None  # (product_list version, index)
+
+
+def invalidate() -> None:
+    """Drop the in-memory index (it is rebuilt on the next search)."""
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def _current_index(db: Session) -> ProductIndex:
+    global _index
+    version = table_versions.get_versions(db, ["product_list"]).get("product_list", (0, None))[0]
+    with _index_lock:
+        if _index is not None and _index[0] == version:
+            return _index[1]
+    rows = db.execute(select(ProductList.id, ProductList.name, ProductList.barcode)).all()
+    index = ProductIndex(rows)
+    logger.info(f"Built product search index ({len(rows)} products, version {version})")
+    with _index_lock:
+        _index = (version, index)
+    return index
+
+
+def _merge(groups: Iterable[Iterable[int]], limit: int) -> List[int]:
+    """Concatenate ranked groups of IDs, dropping repeats, up to `limit`."""
+    result: Dict[int, None] = {}
+    for group in groups:
+        for product_id in group:
+            result.setdefault(product_id)
+            if len(result) >= limit:
+                return list(result)
+    return list(result)
+
+
+def search(db: Session, q: str, limit: int = 20) -> List[int]:
+    """IDs of the product lists matching `q`, best matches first. Raises ValueError for an empty query."""
+    q = q.strip()
+    if not q:
+        raise ValueError("Search query cannot be empty")
+    limit = min(limit, MAX_RESULTS)
+    if db.get_bind().dialect.name == "postgresql":
+        return _search_postgresql(db, q, limit)
+    return _current_index(db).search(q, limit)
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, case, distinct
+from sqlalchemy import func, case, distinct, and_
 from decimal import Decimal
 from typing import List, Optional
 from datetime import date
@@ -12,15 +12,26 @@ from src.models import (
     category as model_category
 )
 from src.schemas import reports as schema_reports
+from src.services.analytics_snapshot import snapshot as analytics_snapshot
 
 
 def get_spending_by_category(
     db: Session,
     start_date: Optional[date] = None,
-    end_date: Optional[date] = None
+    end_date: Optional[date] = None,
+    use_snapshot: bool = True
 ) -> List[schema_reports.ReportSpendingByEntity]:
-    """Get total spending by category for the dashboard chart."""
-    total_item_spend = (model_receipt_product.Product.price * model_receipt_product.Product.quantity).label("total_item_spend") 
+    """
+    Get total spending by category for the dashboard chart.
+    Answered from the in-memory analytics snapshot when it is enabled;
+    `use_snapshot=False` forces the SQL path.
+    """
+    if use_snapshot:
+        result = analytics_snapshot.spending_by_category(db, start_date, end_date)
+        if result is not None:
+            return result
+
+    total_item_spend = model_receipt_product.Product.line_total.label("total_item_spend")
     query = db.query(
         model_category.Category.id.label("entity_id"),
         model_category.Category.name.label("name"),
@@ -37,16 +48,13 @@ def get_spending_by_category(
         model_product_list.ProductList.id == model_receipt_product.Product.product_list_id,
         isouter=True
     )
-    query = query.join(
-        model_receipt.Receipt,
-        model_receipt_product.Product.receipt_id == model_receipt.Receipt.id,
-        isouter=True
-    )
 
+    # Items carry their receipt's purchase_date: no join to receipts, and the
+    # filter prunes partitions when the tables are partitioned
     if start_date:
-        query = query.filter(model_receipt.Receipt.purchase_date >= start_date)
+        query = query.filter(model_receipt_product.Product.purchase_date >= start_date)
     if end_date:
-        query = query.filter(model_receipt.Receipt.purchase_date <= end_date)
+        query = query.filter(model_receipt_product.Product.purchase_date <= end_date)
 
     query = query.group_by(model_category.Category.id, model_category.Category.name)
     query = query.order_by(func.sum(total_item_spend).desc().nullslast())
@@ -57,7 +65,8 @@ def get_spending_by_category(
 def get_enriched_merchant_report(
     db: Session,
     start_date: Optional[date] = None,
-    end_date: Optional[date] = None
+    end_date: Optional[date] = None,
+    use_snapshot: bool = True
 ) -> List[schema_reports.MerchantReportData]:
     """
     Calcula o relatório de supermercados (Ecrã 4).
@@ -69,8 +78,14 @@ def get_enriched_merchant_report(
     3. Fazer LEFT JOIN para Itens (Products)
     4. Aplicar os filtros de data de forma segura (numa subquery)
     5. Agrupar (GROUP BY) por merchant.id
-    6. Calcular o COUNT(receipts) e o SUM(price * quantity)
+    6. Calcular o COUNT(receipts) e o SUM(line_total)
+
+    Usa o snapshot analítico em memória quando ativo (`use_snapshot=False` força SQL).
     """
+    if use_snapshot:
+        result = analytics_snapshot.enriched_merchant_report(db, start_date, end_date)
+        if result is not None:
+            return result
 
     # Criar uma SubQuery para os Recibos JÁ FILTRADOS por data
     # crucial para o LEFT JOIN funcionar
@@ -95,7 +110,7 @@ def get_enriched_merchant_report(
     # Definir os cálculos
     # Total Gasto (SUM)
     total_spent = func.coalesce(
-        func.sum(model_receipt_product.Product.price * model_receipt_product.Product.quantity),
+        func.sum(model_receipt_product.Product.line_total),
         Decimal("0.00")
     ).label("total_spent")
     
@@ -123,10 +138,15 @@ def get_enriched_merchant_report(
     )
     
     # LEFT JOIN 2: Recibos (Filtrados) -> Itens do Recibo
-    query = query.outerjoin(
-        model_receipt_product.Product,
-        filtered_receipts_subq.c.id == model_receipt_product.Product.receipt_id
-    )
+    # O mesmo filtro de datas sobre product.purchase_date (cópia da data do recibo)
+    # não muda o resultado, mas permite partition pruning na tabela product
+    product_join = [filtered_receipts_subq.c.id == model_receipt_product.Product.receipt_id]
+    if start_date:
+        product_join.append(model_receipt_product.Product.purchase_date >= start_date)
+    if end_date:
+        product_join.append(model_receipt_product.Product.purchase_date <= end_date)
+
+    query = query.outerjoin(model_receipt_product.Product, and_(*product_join))
     
     # Agrupamento (GROUP BY)
     # Agrupa pelo Supermercado
@@ -148,41 +168,44 @@ def get_enriched_merchant_report(
 def get_dashboard_kpis(
     db: Session,
     start_date: Optional[date] = None,
-    end_date: Optional[date] = None
+    end_date: Optional[date] = None,
+    use_snapshot: bool = True
 ) -> dict:
     """
     Calcula os 3 KPIs (Key Performance Indicators) para o ecrã principal.
     1. Total Gasto (Month)
     2. Total de Recibos
     3. Total de Produtos
+
+    Usa o snapshot analítico em memória quando ativo (`use_snapshot=False` força SQL).
     """
+    if use_snapshot:
+        result = analytics_snapshot.dashboard_kpis(start_date, end_date)
+        if result is not None:
+            return result
     
-    # 1. Define o cálculo do preço total por item (preço * quantidade)
-    total_item_spent = (model_receipt_product.Product.price * model_receipt_product.Product.quantity).label("total_item_spent")
+    # 1. Preço total por item (coluna gerada line_total = preço * quantidade, ao cêntimo)
+    total_item_spent = model_receipt_product.Product.line_total.label("total_item_spent")
     
     # 2. Inicia a query
     query = db.query(
         # Total gasto (soma de preço * quantidade de todos os produtos)
         func.coalesce(func.sum(total_item_spent), Decimal("0.00")).label("total_spent"),
         
-        # Contagem de recibos distintos
-        func.count(distinct(model_receipt.Receipt.id)).label("receipt_count"),
+        # Contagem de recibos distintos (com pelo menos um item)
+        func.count(distinct(model_receipt_product.Product.receipt_id)).label("receipt_count"),
         
         # Contagem de produtos distintos
         func.count(distinct(model_receipt_product.Product.id)).label("product_item_count")
     )
     
-    # 3.  JOINs necessários
-    query = query.join(
-        model_receipt_product.Product,
-        model_receipt_product.Product.receipt_id == model_receipt.Receipt.id
-    )
+    # 3. Sem JOIN: cada item tem a purchase_date do seu recibo
 
-    # 4. Filtros 
+    # 4. Filtros (fazem partition pruning quando as tabelas estão particionadas)
     if start_date:
-        query = query.filter(model_receipt.Receipt.purchase_date >= start_date)
+        query = query.filter(model_receipt_product.Product.purchase_date >= start_date)
     if end_date:
-        query = query.filter(model_receipt.Receipt.purchase_date <= end_date)
+        query = query.filter(model_receipt_product.Product.purchase_date <= end_date)
 
     # 5. Executa a query
     result = query.one()  
@@ -0,0 +1,230 @@
+# src/services/storage_services.py
+
+"""
+Content-addressed storage of uploaded photos.
+
+Uploads are stored as
+
+    uploads/blobs/<first 2 hex chars>/<sha256 of the bytes><ext>
+
+(URL path /uploads/blobs/...), so uploading the same image again - or using
+one image for several products/receipts - reuses the same file. Each file
+has a `StoredFile` row whose `ref_count` counts the photos pointing at it.
+
+Photo changes go through `acquire` / `release` in the same transaction as
+the entity update; files whose last reference went away are deleted after
+the commit with `delete_unreferenced`. Resized variants (image_services)
+are named after the file (`<sha256>_thumb.webp`...) and go with it.
+
+An upload takes its reference (`register`) and commits it before its file
+is put in place (`place_blob`), and `delete_unreferenced` moves a file
+aside before checking the rows a last time. So when an upload of the same
+bytes races with the deletion, either the deletion sees the new reference
+and puts the file back, or the upload finds the file gone and places its
+own copy.
+
+Photos stored before this scheme (/uploads/products/..., /uploads/receipts/...)
+are not reference counted: they are deleted as soon as they are replaced.
+"""
+
+import logging
+import os
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from src.models.stored_file import StoredFile
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+BLOB_DIRECTORY = BASE_DIR / "uploads" / "blobs"
+BLOB_URL_PREFIX = "/uploads/blobs/"
+# Photos written before content addressing
+LEGACY_URL_PREFIXES = ("/uploads/products/", "/uploads/receipts/")
+
+EXTENSIONS_BY_MIME_TYPE = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+}
+
+
+@dataclass(frozen=True)
+class StoredUpload:
+    """An uploaded file, written to `temp_path` until `place_blob` moves it to `path`."""
+    path: str
+    sha256: str
+    content_type: str
+    size_bytes: int
+    temp_path: Path
+
+
+def blob_url(sha256: str, content_type: str) -> str:
+    """URL path of the blob with these bytes and type."""
+    return f"{BLOB_URL_PREFIX}{sha256[:2]}/{sha256}{EXTENSIONS_BY_MIME_TYPE[content_type]}"
+
+
+def disk_path(url: str) -> Path:
+    """'/uploads/blobs/ab/x.jpg' -> <BASE_DIR>/uploads/blobs/ab/x.jpg"""
+    return BASE_DIR / url.lstrip('/')
+
+
+def is_local_upload(url: Optional[str]) -> bool:
+    return bool(url) and url.startswith((BLOB_URL_PREFIX, *LEGACY_URL_PREFIXES))
+
+
+def stored_upload(temp_path: Path, sha256: str, content_type: str, size_bytes: int) -> StoredUpload:
+    """A fully written temp file and its content address (see place_blob)."""
+    return StoredUpload(
+        path=blob_url(sha256, content_type),
+        sha256=sha256,
+        content_type=content_type,
+        size_bytes=size_bytes,
+        temp_path=temp_path,
+    )
+
+
+def place_blob(upload: StoredUpload) -> None:
+    """
+    After its reference is committed (see register): move the temp file to
+    its content address. If a file with the same content is already there,
+    the temp file is discarded instead.
+    """
+    target = disk_path(upload.path)
+    if target.exists():
+        os.remove(upload.temp_path)
+        # Fresh mtime: the upload GC leaves recently touched files alone
+        os.utime(target)
+        logger.info(f"Duplicate upload, reusing {upload.path}")
+    else:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(upload.temp_path, target)
+
+
+def discard(upload: StoredUpload) -> None:
+    """Delete the temp file of an upload that will not be placed."""
+    try:
+        os.remove(upload.temp_path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Failed to delete file {upload.temp_path}: {e}")
+
+
+def register(db: Session, upload: StoredUpload) -> None:
+    """Add a reference to an uploaded blob, creating its row on first use. Does not commit."""
+    if _increment(db, upload.path):
+        return
+    try:
+        # Savepoint: a concurrent upload of the same bytes may insert the row first
+        with db.begin_nested():
+            db.add(StoredFile(
+                sha256=upload.sha256,
+                path=upload.path,
+                content_type=upload.content_type,
+                size_bytes=upload.size_bytes,
+                ref_count=1,
+            ))
+    except IntegrityError:
+        _increment(db, upload.path)
+
+
+def _increment(db: Session, path: str) -> bool:
+    updated = db.query(StoredFile).filter(StoredFile.path == path).update(
+        {StoredFile.ref_count: StoredFile.ref_count + 1}, synchronize_session=False
+    )
+    return updated > 0
+
+
+def acquire(db: Session, url: Optional[str]) -> None:
+    """Add a reference to an existing blob (e.g. a photo reused through an update). Does not commit."""
+    if url and url.startswith(BLOB_URL_PREFIX):
+        _increment(db, url)
+
+
+def release(db: Session, url: Optional[str]) -> bool:
+    """
+    Drop a reference. Returns True if the file may have lost its last
+    reference and should be passed to `delete_unreferenced` after the commit.
+    Does not commit.
+    """
+    if not is_local_upload(url):
+        return False
+    if not url.startswith(BLOB_URL_PREFIX):
+        return True
+
+    db.query(StoredFile).filter(StoredFile.path == url, StoredFile.ref_count > 0).update(
+        {StoredFile.ref_count: StoredFile.ref_count - 1}, synchronize_session=False
+    )
+    deleted = db.query(StoredFile).filter(StoredFile.path == url, StoredFile.ref_count <= 0).delete(
+        synchronize_session=False
+    )
+    return deleted > 0
+
+
+def _remove_file_and_variants(path: Path, moved_to: Optional[Path] = None) -> int:
+    """Delete a file (found at `moved_to` if it was moved) and its resized variants; returns the bytes freed."""
+    freed = 0
+    for candidate in [moved_to or path, *path.parent.glob(f"{path.stem}_*")]:
+        try:
+            size = candidate.stat().st_size
+            os.remove(candidate)
+            freed += size
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Failed to delete file {candidate}: {e}")
+    return freed
+
+
+def _is_referenced(db: Session, url: str) -> bool:
+    return db.query(StoredFile.id).filter(StoredFile.path == url).first() is not None
+
+
+def _set_aside_unless_referenced(db: Session, url: str) -> Optional[Path]:
+    """
+    Move the blob out of its address, then check the rows again: an upload
+    of the same bytes may have committed a reference in between. Returns
+    where the file to delete now is, or None to keep it.
+    """
+    if _is_referenced(db, url):
+        return None
+    path = disk_path(url)
+    aside = path.with_name(f"{path.name}.{uuid.uuid4().hex}.deleting")
+    try:
+        os.replace(path, aside)
+    except FileNotFoundError:
+        return path
+    if _is_referenced(db, url):
+        # Put back; an upload that found the address empty may have placed
+        # the same bytes there already, which this overwrites harmlessly
+        os.replace(aside, path)
+        return None
+    return aside
+
+
+def delete_unreferenced(db: Session, urls: Iterable[str]) -> List[str]:
+    """
+    After the commit: delete the files (and variants) of `urls` that no row
+    references any more. Checked again here because the same bytes may have
+    been uploaded again in the meantime.
+    """
+    deleted = []
+    for url in urls:
+        if not is_local_upload(url):
+            continue
+        moved_to = None
+        if url.startswith(BLOB_URL_PREFIX):
+            moved_to = _set_aside_unless_referenced(db, url)
+            if moved_to is None:
+                continue
+        _remove_file_and_variants(disk_path(url), moved_to)
+        deleted.append(url)
+        logger.info(f"Deleted unreferenced file {url}")
+    return deleted
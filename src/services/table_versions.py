@@ -0,0 +1,157 @@
+# src/services/table_versions.py
+
+"""
+Per-table change counters, used to validate cached GET responses.
+
+Every ORM flush that inserts, updates or deletes rows of a tracked table
+(TRACKED_TABLES), and every bulk `insert()` / `update()` / `delete()` run
+through the session on one, is recorded on the session; when the
+transaction commits, the counters of those tables in `table_versions` are
+incremented in the same transaction:
+
+    receipts | 412 | 2026-10-18 15:02:11+00
+    product  | 977 | 2026-10-18 15:02:11+00
+
+A response built from some tables is unchanged as long as their counters
+are, so its ETag is derived from the counters alone (`etag`), and a
+conditional request is answered with one small query instead of loading and
+serializing the rows (see src/conditional.py).
+
+The counters are bumped just before the commit (a `before_commit` listener),
+one row at a time in table-name order: data and counters are committed
+together, the locks on these few shared rows are held only for the commit
+itself, and two bumps cannot deadlock.
+
+The counters are coarse: any write to a table invalidates every response
+read from it. Deletes also count for the tables the database deletes from
+by `ON DELETE CASCADE` (receipt -> items). Writes that bypass the ORM (raw
+SQL) are not counted.
+"""
+
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import event, func, select, update
+from sqlalchemy.orm import Session
+
+from src.database import Base
+from src.models.table_version import TRACKED_TABLES, TableVersion
+
+logger = logging.getLogger(__name__)
+
+
+def _cascades_from(table: str) -> Set[str]:
+    """Tables whose rows the database deletes with rows of `table` (ON DELETE CASCADE), recursively."""
+    children = {
+        child.name
+        for child in Base.metadata.tables.values()
+        for fk in child.foreign_keys
+        if fk.column.table.name == table and (fk.ondelete or "").upper() == "CASCADE"
+    }
+    for child in list(children):
+        if child != table:
+            children |= _cascades_from(child)
+    return children
+
+
+def _with_cascades(tables: Iterable[Optional[str]], deleted_from: Iterable[Optional[str]] = ()) -> Set[str]:
+    """Tracked tables among `tables`, and among `deleted_from` and their cascades."""
+    tables = set(tables)
+    for table in deleted_from:
+        tables |= {table, *_cascades_from(table)}
+    return tables & set(TRACKED_TABLES)
+
+
+def bump(connection, tables: Iterable[str], deleted_from: Iterable[str] = ()) -> None:
+    """
+    Increment the counters of `tables` (the tracked ones) on this connection.
+    `deleted_from`: tables rows were deleted from, also counted for their cascades.
+    One row at a time, in table-name order, so concurrent bumps lock in the same order.
+    """
+    for name in sorted(_with_cascades(tables, deleted_from)):
+        connection.execute(
+            update(TableVersion)
+            .where(TableVersion.table_name == name)
+            .values(version=TableVersion.version + 1, updated_at=func.now())
+        )
+
+
+# session.info key: tracked tables written by the session's open transaction
+_CHANGED_KEY = "table_versions_changed"
+
+
+def _record(session: Session, tables: Iterable[Optional[str]], deleted_from: Iterable[Optional[str]] = ()) -> None:
+    changed = _with_cascades(tables, deleted_from)
+    if changed:
+        session.info.setdefault(_CHANGED_KEY, set()).update(changed)
+
+
+def _mapped_table(obj) -> Optional[str]:
+    table = getattr(type(obj), "__table__", None)
+    return table.name if table is not None else None
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session: Session, flush_context) -> None:
+    changed = {_mapped_table(obj) for obj in session.new}
+    changed |= {_mapped_table(obj) for obj in session.dirty if session.is_modified(obj, include_collections=False)}
+    _record(session, changed, deleted_from={_mapped_table(obj) for obj in session.deleted})
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _after_bulk_write(orm_execute_state) -> None:
+    # Bulk statements (query(...).update(), session.execute(insert(Model), rows)...) skip the flush
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None:
+        return
+    table = mapper.local_table.name
+    if orm_execute_state.is_delete:
+        _record(orm_execute_state.session, (), deleted_from=[table])
+    else:
+        _record(orm_execute_state.session, [table])
+
+
+@event.listens_for(Session, "before_commit")
+def _before_commit(session: Session) -> None:
+    # A savepoint's writes are counted with the outer transaction
+    if session.in_nested_transaction():
+        return
+    # The commit flushes after this listener: record what is still pending first
+    session.flush()
+    changed = session.info.pop(_CHANGED_KEY, None)
+    if changed:
+        bump(session.connection(), changed)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _after_rollback(session: Session, previous_transaction) -> None:
+    # A rolled back savepoint keeps the outer transaction's writes
+    if not previous_transaction.nested:
+        session.info.pop(_CHANGED_KEY, None)
+
+
+def get_versions(db: Session, tables: Iterable[str]) -> Dict[str, Tuple[int, Optional[datetime]]]:
+    """{table: (version, updated_at)} for `tables`, read in one query."""
+    rows = db.execute(
+        select(TableVersion.table_name, TableVersion.version, TableVersion.updated_at)
+        .where(TableVersion.table_name.in_(list(tables)))
+    ).all()
+    return {name: (version, updated_at) for name, version, updated_at in rows}
+
+
+def etag(versions: Dict[str, Tuple[int, Optional[datetime]]], resource: Optional[str] = None) -> str:
+    """Weak ETag for a response read from these table versions (about one `resource`, e.g. 'receipts:12')."""
+    key = ",".join(f"{name}:{versions[name][0]}" for name in sorted(versions))
+    if resource is not None:
+        key = f"{resource};{key}"
+    return f'W/"{hashlib.sha1(key.encode()).hexdigest()[:20]}"'
+
+
+def last_modified(versions: Dict[str, Tuple[int, Optional[datetime]]]) -> Optional[datetime]:
+    """Time of the latest write to any of the tables."""
+    times = [updated_at for _, updated_at in versions.values() if updated_at is not None]
+    return max(times) if times else None
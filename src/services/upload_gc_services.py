@@ -0,0 +1,196 @@
+# src/services/upload_gc_services.py
+
+"""
+Garbage collection of uploaded files nobody references any more.
+
+Files can be orphaned by photo replacements made before reference counting
+(storage_services), by crashes between a commit and the file deletion, or by
+interrupted uploads (`.upload-*.part` temp files).
+
+`collect_orphans`:
+  1. loads every referenced path in one query (product and receipt photos
+     plus the `stored_file` rows); resized variants count as referenced
+     when their photo is,
+  2. walks `uploads/` with os.scandir (nothing is listed in memory),
+  3. skips files modified within the grace period (uploads in progress,
+     variants being generated),
+  4. handles orphans in batches: each batch is checked again against the
+     database, then deleted or moved to the quarantine directory, which
+     keeps the `uploads/` layout and is not served by the app.
+"""
+
+import logging
+import os
+import shutil
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List, Set, Tuple
+
+from sqlalchemy import select, union_all
+from sqlalchemy.orm import Session
+
+from src.models import product as model_product_list
+from src.models import receipt as model_receipt
+from src.models.stored_file import StoredFile
+from src.services import file_services, image_services, storage_services
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+
+
+@dataclass
+class UploadGCReport:
+    """Outcome of a garbage collection run."""
+    scanned: int = 0
+    recent: int = 0
+    orphans: int = 0
+    removed: int = 0
+    reclaimed_bytes: int = 0
+    dry_run: bool = False
+    quarantine: bool = False
+
+    def __str__(self) -> str:
+        action = "would remove" if self.dry_run else ("quarantined" if self.quarantine else "deleted")
+        return (
+            f"scanned {self.scanned} files, {self.recent} within the grace period, "
+            f"{self.orphans} orphaned; {action} {self.removed} "
+            f"({self.reclaimed_bytes / (1024 * 1024):.1f} MB)"
+        )
+
+
+def uploads_directory() -> Path:
+    return storage_services.BASE_DIR / "uploads"
+
+
+def quarantine_directory() -> Path:
+    return storage_services.BASE_DIR / "uploads-quarantine"
+
+
+def _photo_paths(paths=None):
+    """SELECT of the paths in use (entity photos and stored files), optionally only among `paths`."""
+    ProductList = model_product_list.ProductList
+    Receipt = model_receipt.Receipt
+    columns = (ProductList.product_list_photo, Receipt.receipt_photo, StoredFile.path)
+    return union_all(*[
+        select(column).where(column.is_not(None) if paths is None else column.in_(paths))
+        for column in columns
+    ])
+
+
+def referenced_paths(db: Session) -> Set[str]:
+    """Every upload URL path referenced by the database, in one query."""
+    return {path for path in db.execute(_photo_paths()).scalars() if storage_services.is_local_upload(path)}
+
+
+def _photo_of_variant(url: str) -> Tuple[str, str]:
+    """
+    '/uploads/blobs/ab/<sha>_thumb_webp.webp' -> ('/uploads/blobs/ab', '<sha>')
+    For any other file the stem itself is returned.
+    """
+    directory, name = url.rsplit("/", 1)
+    stem = name.rsplit(".", 1)[0]
+    for variant in sorted(image_services.VARIANTS, key=len, reverse=True):
+        if stem.endswith(f"_{variant}"):
+            return directory, stem[: -len(variant) - 1]
+    return directory, stem
+
+
+def _stems(paths: Set[str]) -> Set[Tuple[str, str]]:
+    """Referenced photos as (directory, stem): a file is in use if its photo is."""
+    return {(path.rsplit("/", 1)[0], path.rsplit("/", 1)[1].rsplit(".", 1)[0]) for path in paths}
+
+
+def scan_uploads(root: Path) -> Iterator[os.DirEntry]:
+    """Yield every regular file under `root`, one directory at a time."""
+    pending = [root]
+    while pending:
+        directory = pending.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield entry
+        except FileNotFoundError:
+            continue
+
+
+def _still_referenced(db: Session, batch: List[Tuple[str, Path, int]]) -> Set[Tuple[str, str]]:
+    """Photos of the batch referenced right now (rows may have been added since the scan started)."""
+    # Variants do not know the extension of their photo: try every allowed one
+    candidates = {
+        f"{directory}/{stem}{extension}"
+        for directory, stem in (_photo_of_variant(url) for url, _, _ in batch)
+        for extension in file_services.ALLOWED_EXTENSIONS
+    }
+    return _stems(set(db.execute(_photo_paths(candidates)).scalars()))
+
+
+def _remove_batch(db: Session, batch: List[Tuple[str, Path, int]], report: UploadGCReport) -> None:
+    referenced = _still_referenced(db, batch)
+    uploads = uploads_directory()
+    for url, path, size in batch:
+        if _photo_of_variant(url) in referenced:
+            continue
+        if report.dry_run:
+            logger.info(f"Orphaned upload (dry run): {url}")
+        else:
+            try:
+                if report.quarantine:
+                    target = quarantine_directory() / path.relative_to(uploads)
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    shutil.move(str(path), str(target))
+                else:
+                    os.remove(path)
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logger.warning(f"Failed to remove orphaned upload {path}: {e}")
+                continue
+        report.removed += 1
+        report.reclaimed_bytes += size
+
+
+def collect_orphans(
+    db: Session,
+    grace_seconds: float,
+    quarantine: bool = False,
+    dry_run: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> UploadGCReport:
+    """
+    Delete (or move to the quarantine directory) the files under uploads/
+    that the database does not reference and that were not modified in the
+    last `grace_seconds`. Returns what was found and how much was reclaimed.
+    """
+    report = UploadGCReport(dry_run=dry_run, quarantine=quarantine)
+    uploads = uploads_directory()
+    stems = _stems(referenced_paths(db))
+    cutoff = time.time() - grace_seconds
+
+    batch: List[Tuple[str, Path, int]] = []
+    for entry in scan_uploads(uploads):
+        report.scanned += 1
+        path = Path(entry.path)
+        url = "/uploads/" + path.relative_to(uploads).as_posix()
+        if _photo_of_variant(url) in stems:
+            continue
+        stat = entry.stat(follow_symlinks=False)
+        if stat.st_mtime > cutoff:
+            report.recent += 1
+            continue
+
+        report.orphans += 1
+        batch.append((url, path, stat.st_size))
+        if len(batch) >= batch_size:
+            _remove_batch(db, batch, report)
+            batch = []
+
+    if batch:
+        _remove_batch(db, batch, report)
+
+    logger.info(f"Upload GC: {report}")
+    return report
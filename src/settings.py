@@ -27,6 +27,91 @@ class Settings(BaseSettings):
         default="db" 
     )
 
+    analytics_snapshot_enabled: bool = Field(
+        alias="ANALYTICS_SNAPSHOT_ENABLED",
+        default=False
+    )
+
+    partition_maintenance_enabled: bool = Field(
+        alias="PARTITION_MAINTENANCE_ENABLED",
+        default=False
+    )
+    partition_months_ahead: int = Field(
+        alias="PARTITION_MONTHS_AHEAD",
+        default=3
+    )
+
+    image_workers: int = Field(
+        alias="IMAGE_WORKERS",
+        default=2
+    )
+
+    upload_gc_enabled: bool = Field(
+        alias="UPLOAD_GC_ENABLED",
+        default=False
+    )
+    upload_gc_interval_hours: float = Field(
+        alias="UPLOAD_GC_INTERVAL_HOURS",
+        default=24
+    )
+    upload_gc_grace_hours: float = Field(
+        alias="UPLOAD_GC_GRACE_HOURS",
+        default=24
+    )
+    upload_gc_quarantine: bool = Field(
+        alias="UPLOAD_GC_QUARANTINE",
+        default=True
+    )
+
+    compression_enabled: bool = Field(
+        alias="COMPRESSION_ENABLED",
+        default=True
+    )
+    compression_minimum_size: int = Field(
+        alias="COMPRESSION_MINIMUM_SIZE",
+        default=1024
+    )
+    compression_gzip_level: int = Field(
+        alias="COMPRESSION_GZIP_LEVEL",
+        default=6
+    )
+    compression_brotli_quality: int = Field(
+        alias="COMPRESSION_BROTLI_QUALITY",
+        default=4
+    )
+    compression_zstd_level: int = Field(
+        alias="COMPRESSION_ZSTD_LEVEL",
+        default=3
+    )
+
+    page_cache_reload: bool = Field(
+        alias="PAGE_CACHE_RELOAD",
+        default=False
+    )
+
+    fast_json_enabled: bool = Field(
+        alias="FAST_JSON_ENABLED",
+        default=True
+    )
+
+    idempotency_ttl_hours: float = Field(
+        alias="IDEMPOTENCY_TTL_HOURS",
+        default=24
+    )
+    idempotency_in_progress_minutes: float = Field(
+        alias="IDEMPOTENCY_IN_PROGRESS_MINUTES",
+        default=15
+    )
+
+    master_data_cache_enabled: bool = Field(
+        alias="MASTER_DATA_CACHE_ENABLED",
+        default=True
+    )
+    master_data_check_seconds: float = Field(
+        alias="MASTER_DATA_CHECK_SECONDS",
+        default=1.0
+    )
+
 
 settings = Settings()
 
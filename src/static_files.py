@@ -0,0 +1,156 @@
+# src/static_files.py
+
+"""
+StaticFiles with a cache policy.
+
+- Uploads never change under a given URL (content hashes / uuids), so they
+  are served with a one-year `immutable` Cache-Control: browsers do not even
+  revalidate them.
+- Frontend assets keep their URLs across releases, so they are served with
+  `no-cache` and a strong ETag computed from the file contents: the browser
+  revalidates and gets a 304 with no body while the file is unchanged.
+
+With `precompressed=True` the `.br` / `.gz` siblings written by
+`python -m src.scripts.compress_static` are served instead of the file when
+the client accepts that encoding (no compression work per request). A
+sibling older than its source is ignored, so editing an asset without
+rebuilding never serves stale content.
+
+Byte ranges (206, multipart ranges, If-Range) are handled by Starlette's
+FileResponse, which also uses the ASGI `pathsend` extension when the server
+offers it so the server can send the file itself (e.g. with sendfile).
+"""
+
+import hashlib
+import mimetypes
+import os
+from functools import lru_cache
+from typing import Dict, Optional, Sequence, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+_HASH_CHUNK_SIZE = 64 * 1024
+
+# Content-Encoding -> file suffix, in order of preference
+PRECOMPRESSED_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+def negotiate_encoding(accept_encoding: Optional[str], available: Sequence[str]) -> Optional[str]:
+    """
+    Encoding of `available` (listed in the server's order of preference)
+    to use for an Accept-Encoding header; None means identity.
+    """
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name.strip().lower()] = quality
+    # Highest q-value wins; ties go to the order of `available`
+    best, best_quality = None, 0.0
+    for encoding in available:
+        quality = weights.get(encoding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+@lru_cache(maxsize=1024)
+def _content_etag(path: str, mtime_ns: int, size: int) -> str:
+    """Strong ETag from the file contents; cached until the file changes (mtime/size)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(_HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def content_etag(path: str, stat_result: os.stat_result) -> str:
+    return _content_etag(str(path), stat_result.st_mtime_ns, stat_result.st_size)
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that adds Cache-Control and, optionally, content-based ETags."""
+
+    def __init__(
+        self,
+        *args,
+        cache_control: str = REVALIDATE,
+        content_etags: bool = False,
+        precompressed: bool = False,
+        **kwargs,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.cache_control = cache_control
+        self.content_etags = content_etags
+        self.precompressed = precompressed
+        # full path -> {encoding: (sibling path, stat)}, refreshed by every lookup
+        self._encoded: Dict[str, Dict[str, Tuple[str, os.stat_result]]] = {}
+
+    def lookup_path(self, path: str) -> Tuple[str, Optional[os.stat_result]]:
+        # Runs in a worker thread: do the disk work here so file_response does none
+        full_path, stat_result = super().lookup_path(path)
+        if stat_result is None or not os.path.isfile(full_path):
+            return full_path, stat_result
+        if self.content_etags:
+            content_etag(full_path, stat_result)
+        if self.precompressed:
+            self._encoded[full_path] = self._find_precompressed(full_path, stat_result)
+        return full_path, stat_result
+
+    @staticmethod
+    def _find_precompressed(full_path: str, stat_result: os.stat_result) -> Dict[str, Tuple[str, os.stat_result]]:
+        found = {}
+        for encoding, suffix in PRECOMPRESSED_SUFFIXES.items():
+            try:
+                sibling = os.stat(full_path + suffix)
+            except OSError:
+                continue
+            if sibling.st_mtime_ns >= stat_result.st_mtime_ns:
+                found[encoding] = (full_path + suffix, sibling)
+        return found
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        headers = {"Cache-Control": self.cache_control}
+        if self.content_etags:
+            # FileResponse only sets its (mtime/size) ETag when none is given
+            headers["ETag"] = content_etag(full_path, stat_result)
+
+        media_type = None
+        encoded = self._encoded.get(str(full_path)) if self.precompressed else None
+        if encoded:
+            headers["Vary"] = "Accept-Encoding"
+            encoding = negotiate_encoding(request_headers.get("accept-encoding"), list(encoded))
+            if encoding is not None:
+                media_type = mimetypes.guess_type(str(full_path))[0] or "text/plain"
+                full_path, stat_result = encoded[encoding]
+                headers["Content-Encoding"] = encoding
+                if "ETag" in headers:
+                    headers["ETag"] = f'{headers["ETag"][:-1]}-{encoding}"'
+
+        response = FileResponse(
+            full_path, status_code=status_code, headers=headers, media_type=media_type, stat_result=stat_result
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -43,6 +43,19 @@ export async function getMerchants(params = {}) {
     return _handleApiRequest(endpoint);
 }
 
+/**
+ * Get several merchants in one request, keyed by ID ({"3": {...}, "7": {...}}).
+ * IDs that do not exist are missing from the result.
+ * endpoint: GET /merchants/?ids=3,7
+ */
+export async function getMerchantsByIds(ids) {
+    if (!ids.length) {
+        return {};
+    }
+    const queryString = new URLSearchParams({ ids: [...new Set(ids)].join(',') }).toString();
+    return _handleApiRequest(`/merchants/?${queryString}`);
+}
+
 /**
  * Get merchant by ID.
  */
@@ -43,6 +43,29 @@ export async function getProducts(params = {}) {
     return _handleApiRequest(endpoint);
 }
 
+/**
+ * Get several products in one request, keyed by ID ({"3": {...}, "7": {...}}).
+ * IDs that do not exist are missing from the result.
+ * endpoint: GET /products/?ids=3,7
+ */
+export async function getProductsByIds(ids) {
+    if (!ids.length) {
+        return {};
+    }
+    const queryString = new URLSearchParams({ ids: [...new Set(ids)].join(',') }).toString();
+    return _handleApiRequest(`/products/?${queryString}`);
+}
+
+/**
+ * Search products by part of the name or the start of the barcode, best matches first
+ * (for autocomplete, e.g. when adding items to a receipt).
+ * endpoint: GET /products/search?q=ban&limit=10
+ */
+export async function searchProducts(q, limit = 20) {
+    const queryString = new URLSearchParams({ q, limit: Math.min(limit, 50) }).toString();
+    return _handleApiRequest(`/products/search?${queryString}`);
+}
+
 /**
  * Get a specific product by ID
  * endpoint: GET /products/{product_id}
@@ -54,6 +54,8 @@ export async function getReceipts(params = {}) {
 
 /**
  * Create a new receipt.
+ * Line items can be included as `data.products` ([{product_list_id, price, quantity, description}]):
+ * they are created in the same request and transaction.
  */
 export async function createReceipt(data) {
     return _handleApiRequest("/receipts/", {
@@ -71,6 +73,19 @@ export async function deleteReceipt(id) {
 
 
 
+/**
+ * Get several receipts in one request, keyed by ID ({"3": {...}, "7": {...}}).
+ * IDs that do not exist are missing from the result.
+ * endpoint: GET /receipts/?ids=3,7
+ */
+export async function getReceiptsByIds(ids) {
+    if (!ids.length) {
+        return {};
+    }
+    const queryString = new URLSearchParams({ ids: [...new Set(ids)].join(',') }).toString();
+    return _handleApiRequest(`/receipts/?${queryString}`);
+}
+
 /**
  * Get receipt by ID.
  */
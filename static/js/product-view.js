@@ -72,7 +72,9 @@ function populateProduct(product) {
     // Product photo
     if (product.product_list_photo) {
         const img = document.getElementById('product-image');
-        img.src = product.product_list_photo;
+        // Prefer the resized copy (generated in the background after upload)
+        const variants = product.product_list_photo_variants || {};
+        img.src = variants.medium_webp || variants.medium || product.product_list_photo;
         img.style.display = 'block';
         document.getElementById('no-photo-placeholder').style.display = 'none';
     }
@@ -151,6 +151,7 @@ function renderProducts(products) {
         const item = document.createElement('div');
         item.className = 'list-item receipt-products-edit-grid';
         item.setAttribute('data-product-list-id', productListId);
+        item.setAttribute('data-item-id', product.id);
         item.innerHTML = `
             <input
                 type="text"
@@ -303,9 +304,10 @@ function getProductsFromForm() {
                 quantity: parseFloat(quantityInput.value) || 1
             });
         }
-        // Handle existing products
+        // Handle existing products (sent with their id: only changed items are written)
         else if (productListId && productListId !== 'new' && productListId !== 'null') {
             products.push({
+                id: parseInt(item.getAttribute('data-item-id')) || undefined,
                 product_list_id: parseInt(productListId),
                 price: parseFloat(priceInput.value) || 0,
                 quantity: parseFloat(quantityInput.value) || 1
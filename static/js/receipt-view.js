@@ -82,7 +82,10 @@ function populateReceipt(receipt) {
     if (receipt.receipt_photo) {
         const img = document.getElementById('receipt-image');
         const container = document.getElementById('receipt-image-container');
-        img.src = receipt.receipt_photo;
+        // Prefer the resized copy (generated in the background after upload)
+        const variants = receipt.receipt_photo_variants || {};
+        img.src = variants.medium_webp || variants.medium || receipt.receipt_photo;
+        img.dataset.original = receipt.receipt_photo;
         container.style.display = 'block';
         document.getElementById('no-photo-placeholder').style.display = 'none';
     }
@@ -179,7 +182,8 @@ function openImageModal() {
     const modal = document.getElementById('imageModal');
     const modalImg = document.getElementById('modalImage');
     const receiptImg = document.getElementById('receipt-image');
-    modalImg.src = receiptImg.src;
+    // Zoom shows the full-resolution original
+    modalImg.src = receiptImg.dataset.original || receiptImg.src;
     modal.classList.add('active');
     document.body.style.overflow = 'hidden';
 }
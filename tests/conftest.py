@@ -2,12 +2,13 @@
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from src.main import app
 from src.database import Base, get_db
+from src.services import master_data, product_search
 
 """
 Configuração de Testes com TestClient e SQLite em Memória
@@ -29,6 +30,11 @@ engine = create_engine(
     connect_args={"check_same_thread": False},
     poolclass=StaticPool)
 
+# Como no PostgreSQL: chaves estrangeiras verificadas e ON DELETE CASCADE aplicado pela BD
+@event.listens_for(engine, "connect")
+def _enable_foreign_keys(dbapi_connection, connection_record):
+    dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Esta fixture corre antes de CADA teste individual (scope="function")
@@ -37,6 +43,9 @@ def db():
     """Cria uma nova base de dados em memória para cada teste."""
     # Cria todas as tabelas (Category, Product, Receipt, etc.)
     Base.metadata.create_all(bind=engine) # Cria as tabelas
+    # As caches em memória (dados mestre, índice de pesquisa) não podem passar de um teste para outro
+    master_data.cache.invalidate()
+    product_search.invalidate()
     db = TestingSessionLocal() # Cria sessão
     try:
         yield db
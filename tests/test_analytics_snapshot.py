@@ -0,0 +1,106 @@
+# tests/test_analytics_snapshot.py
+
+"""
+O snapshot analítico em memória tem de devolver exatamente o mesmo que
+as queries SQL de report_services (o "oráculo").
+"""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from src.schemas.product import ProductCreate
+from src.services import report_services
+from src.services.analytics_snapshot import snapshot
+from src.services.crud_receipt import ReceiptService
+from src.services.crud_receipt_product import ReceiptProductService
+
+pytest.importorskip("numpy")
+
+WINDOWS = [
+    (None, None),
+    (date(2025, 1, 1), date(2025, 1, 31)),
+    (date(2025, 2, 1), None),
+    (date(2030, 1, 1), date(2030, 12, 31)),
+]
+
+
+@pytest.fixture
+def dataset(client, db, test_unit):
+    """2 categorias (uma sem itens), 2 merchants, 3 recibos (um vazio)."""
+    fruit = client.post("/categories/", json={"name": "Fruit"}).json()["id"]
+    client.post("/categories/", json={"name": "Empty"})
+    dairy = client.post("/categories/", json={"name": "Dairy"}).json()["id"]
+    banana = client.post("/products/", json={"name": "Banana", "category_id": fruit, "measurement_unit_id": test_unit}).json()["id"]
+    milk = client.post("/products/", json={"name": "Milk", "category_id": dairy, "measurement_unit_id": test_unit}).json()["id"]
+    shop_a = client.post("/merchants/", json={"name": "Shop A", "location": "Lisboa"}).json()["id"]
+    shop_b = client.post("/merchants/", json={"name": "Shop B", "location": "Porto"}).json()["id"]
+
+    receipts = {}
+    for key, merchant_id, purchase_date in (
+        ("jan", shop_a, "2025-01-10"),
+        ("feb", shop_b, "2025-02-20"),
+        ("empty", shop_b, "2025-01-15"),
+    ):
+        receipts[key] = client.post("/receipts/", json={"merchant_id": merchant_id, "purchase_date": purchase_date}).json()["id"]
+
+    for receipt_key, product_id, price, quantity in (
+        ("jan", banana, "1.25", "2"),
+        ("jan", milk, "0.75", "4"),
+        ("feb", milk, "2.50", "1.5"),
+    ):
+        ReceiptProductService.create_product_item_for_receipt(db, receipts[receipt_key], ProductCreate(
+            price=Decimal(price), quantity=Decimal(quantity), product_list_id=product_id
+        ))
+
+    snapshot.build(db)
+    yield {"receipts": receipts, "banana": banana, "milk": milk}
+    snapshot.reset()
+
+
+def _assert_matches_sql(db):
+    for start_date, end_date in WINDOWS:
+        fast = report_services.get_spending_by_category(db, start_date, end_date)
+        sql = report_services.get_spending_by_category(db, start_date, end_date, use_snapshot=False)
+        assert {r.entity_id: r.total_spent for r in fast} == {r.entity_id: Decimal(r.total_spent) for r in sql}
+
+        fast = report_services.get_enriched_merchant_report(db, start_date, end_date)
+        sql = report_services.get_enriched_merchant_report(db, start_date, end_date, use_snapshot=False)
+        assert {r.id: (r.total_spent, r.receipt_count) for r in fast} == {
+            r.id: (Decimal(r.total_spent), r.receipt_count) for r in sql
+        }
+
+        fast = report_services.get_dashboard_kpis(db, start_date, end_date)
+        sql = report_services.get_dashboard_kpis(db, start_date, end_date, use_snapshot=False)
+        assert fast["receipt_count"] == sql["receipt_count"]
+        assert fast["product_item_count"] == sql["product_item_count"]
+        assert fast["total_spent"] == Decimal(sql["total_spent"])
+
+
+def test_snapshot_matches_sql_reports(db, dataset):
+    """Os 3 relatórios coincidem com o SQL para várias janelas de datas"""
+    assert snapshot.is_ready()
+    _assert_matches_sql(db)
+
+
+def test_snapshot_incremental_updates(db, dataset):
+    """Escritas via services atualizam o snapshot sem o reconstruir"""
+    receipts = dataset["receipts"]
+
+    ReceiptProductService.create_product_item_for_receipt(db, receipts["empty"], ProductCreate(
+        price=Decimal("3.00"), quantity=Decimal("1"), product_list_id=dataset["banana"]
+    ))
+    _assert_matches_sql(db)
+
+    ReceiptService.delete_receipt(db, receipts["jan"])
+    _assert_matches_sql(db)
+
+
+def test_reports_fall_back_to_sql_after_reset(db, dataset):
+    """Um snapshot descartado entretanto (refresh falhado noutra thread) faz os relatórios usar SQL"""
+    snapshot.reset()
+    assert snapshot.spending_by_category(db) is None
+    assert snapshot.enriched_merchant_report(db) is None
+    assert snapshot.dashboard_kpis() is None
+    assert report_services.get_dashboard_kpis(db) == report_services.get_dashboard_kpis(db, use_snapshot=False)
@@ -0,0 +1,87 @@
+# tests/test_compression.py
+
+import gzip
+import json
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from src import compression
+
+ROWS = [{"id": i, "name": f"Product {i}", "category": {"id": 1, "name": "Groceries"}} for i in range(500)]
+
+
+def _app(minimum_size=1024):
+    async def large(request):
+        return JSONResponse(ROWS, headers={"ETag": '"v1"'})
+
+    async def small(request):
+        return JSONResponse({"ok": True})
+
+    async def stream(request):
+        async def lines():
+            for row in ROWS:
+                yield json.dumps(row) + "\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    async def not_modified(request):
+        return Response(status_code=304, headers={"ETag": '"v1"'})
+
+    app = Starlette(routes=[
+        Route("/large", large), Route("/small", small), Route("/stream", stream), Route("/304", not_modified)
+    ])
+    return compression.CompressionMiddleware(app, minimum_size=minimum_size)
+
+
+@pytest.fixture
+def client():
+    return TestClient(_app())
+
+
+def test_gzip_large_json(client):
+    """JSON grande é comprimido com Content-Length correto e ETag fraco; pequeno não"""
+    before = compression.stats.snapshot()["bytes_saved"]
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == 'W/"v1"'
+    assert response.json() == ROWS
+    assert int(response.headers["content-length"]) < len(json.dumps(ROWS)) / 5
+    assert compression.stats.snapshot()["bytes_saved"] > before
+
+    small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+    identity = client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+
+
+def test_streaming_response_stays_streamed(client):
+    """Respostas em streaming são comprimidas chunk a chunk (sem Content-Length)"""
+    with client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        raw = b"".join(response.iter_raw())
+    assert gzip.decompress(raw).decode().splitlines()[-1] == json.dumps(ROWS[-1])
+
+
+@pytest.mark.parametrize("encoding, module", [("br", "brotli"), ("zstd", "zstandard")])
+def test_negotiated_encodings(client, encoding, module):
+    """br/zstd quando o cliente aceita e o pacote opcional está instalado"""
+    pytest.importorskip(module)
+    response = client.get("/large", headers={"Accept-Encoding": f"gzip;q=0.5, {encoding}"})
+    assert response.headers["content-encoding"] == encoding
+    assert response.json() == ROWS
+
+
+def test_not_modified_keeps_the_etag_of_its_200(client):
+    """304: ETag fraco só quando o cliente revalida o ETag fraco de um 200 comprimido"""
+    compressed = client.get("/304", headers={"Accept-Encoding": "gzip", "If-None-Match": 'W/"v1"'})
+    assert compressed.status_code == 304 and compressed.headers["etag"] == 'W/"v1"'
+
+    # 200 não comprimido (pequeno, já codificado...): o cliente tem o ETag forte
+    identity = client.get("/304", headers={"Accept-Encoding": "gzip", "If-None-Match": '"v1"'})
+    assert identity.headers["etag"] == '"v1"'
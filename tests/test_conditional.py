@@ -0,0 +1,86 @@
+# tests/test_conditional.py
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src.models.merchant import Merchant
+from src.services import table_versions
+from tests.conftest import engine
+
+
+def test_receipt_not_modified_until_items_change(client, test_category, test_unit):
+    """If-None-Match com o ETag atual -> 304 sem carregar o recibo; alterar os itens muda o ETag"""
+    merchant = client.post("/merchants/", json={"name": "ETag Shop", "location": "Braga"}).json()["id"]
+    product = client.post("/products/", json={
+        "name": "ETag Product", "category_id": test_category, "measurement_unit_id": test_unit
+    }).json()["id"]
+    receipt = client.post("/receipts/", json={"merchant_id": merchant, "purchase_date": "2025-04-01"}).json()["id"]
+
+    first = client.get(f"/receipts/{receipt}")
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"') and first.headers["cache-control"] == "no-cache"
+    assert "last-modified" in first.headers
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        cached = client.get(f"/receipts/{receipt}", headers={"If-None-Match": etag})
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert cached.status_code == 304 and cached.content == b""
+    assert cached.headers["etag"] == etag
+    # Só a verificação da existência e a leitura dos contadores
+    assert len(statements) == 2 and "table_versions" in statements[1]
+
+    # O ETag de um recibo não vale para outro; `*` só para um recibo que existe
+    assert client.get("/receipts/99999", headers={"If-None-Match": etag}).status_code == 404
+    assert client.get("/receipts/99999", headers={"If-None-Match": "*"}).status_code == 404
+    assert client.get(f"/receipts/{receipt}", headers={"If-None-Match": "*"}).status_code == 304
+    other = client.post("/receipts/", json={"merchant_id": merchant, "purchase_date": "2025-04-02"}).json()["id"]
+    etag = client.get(f"/receipts/{receipt}").headers["etag"]
+    assert client.get(f"/receipts/{other}", headers={"If-None-Match": etag}).status_code == 200
+
+    # Itens alterados (delete em massa + inserts) -> novo ETag
+    client.put(f"/receipts/{receipt}/products", json={"products": [
+        {"product_list_id": product, "price": "2.00", "quantity": "1"}
+    ]})
+    changed = client.get(f"/receipts/{receipt}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert len(changed.json()["products"]) == 1
+
+
+def test_collections_conditional_get(client, test_category, test_unit):
+    """Listas de dados mestre: 304 enquanto a tabela não muda, 200 depois de uma escrita"""
+    for url in ("/categories/", "/merchants/", "/measurement-units/", "/products/"):
+        etag = client.get(url).headers["etag"]
+        assert client.get(url, headers={"If-None-Match": f'"other", {etag}'}).status_code == 304
+
+    etag = client.get("/merchants/").headers["etag"]
+    categories_etag = client.get("/categories/").headers["etag"]
+    client.post("/merchants/", json={"name": "New Shop", "location": "Faro"})
+    assert client.get("/merchants/", headers={"If-None-Match": etag}).status_code == 200
+    # Outras tabelas não são afetadas
+    assert client.get("/categories/", headers={"If-None-Match": categories_etag}).status_code == 304
+
+    modified = client.get("/measurement-units/").headers["last-modified"]
+    assert client.get("/measurement-units/", headers={"If-Modified-Since": modified}).status_code == 304
+
+
+def test_versions_bumped_on_commit(db):
+    """Os contadores sobem no commit da própria escrita; um rollback não os altera"""
+    def version():
+        with engine.connect() as connection:
+            return table_versions.get_versions(Session(bind=connection), ["merchants"])["merchants"][0]
+
+    start = version()
+    db.add(Merchant(name="Rolled Back"))
+    db.flush()
+    db.rollback()
+    assert version() == start
+
+    db.add(Merchant(name="Committed"))
+    db.flush()
+    assert version() == start  # table_versions só é escrita no commit
+    db.commit()
+    assert version() == start + 1
@@ -0,0 +1,75 @@
+# tests/test_exports.py
+
+import io
+from decimal import Decimal
+
+import pytest
+from fastapi import status
+
+from src.schemas.product import ProductCreate
+from src.services import export_services
+from src.services.crud_receipt_product import ReceiptProductService
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.parquet as pq
+
+
+@pytest.fixture
+def line_items(client, db, test_category, test_unit):
+    """Cria 2 recibos (em meses diferentes) com 3 itens no total."""
+    merchant_id = client.post("/merchants/", json={"name": "Export Merchant", "location": "Porto"}).json()["id"]
+    product_id = client.post("/products/", json={
+        "name": "Export Product",
+        "category_id": test_category,
+        "measurement_unit_id": test_unit
+    }).json()["id"]
+
+    for purchase_date, n_items in (("2025-01-15", 2), ("2025-02-03", 1)):
+        receipt_id = client.post("/receipts/", json={
+            "merchant_id": merchant_id,
+            "purchase_date": purchase_date
+        }).json()["id"]
+        for i in range(n_items):
+            ReceiptProductService.create_product_item_for_receipt(db, receipt_id, ProductCreate(
+                price=Decimal("1.25"),
+                quantity=Decimal(i + 1),
+                product_list_id=product_id
+            ))
+
+
+def test_export_line_items_parquet(client, line_items):
+    """GET /exports/line-items - exportar em Parquet"""
+    response = client.get("/exports/line-items")
+
+    assert response.status_code == status.HTTP_200_OK
+    table = pq.read_table(io.BytesIO(response.content))
+
+    assert table.num_rows == 3
+    assert pa.types.is_dictionary(table.schema.field("merchant_name").type)
+    assert pa.types.is_dictionary(table.schema.field("category_name").type)
+    assert table.column("merchant_name").to_pylist() == ["Export Merchant"] * 3
+    assert table.column("price").to_pylist()[0] == Decimal("1.2500")
+
+
+def test_export_line_items_arrow_date_range(client, line_items):
+    """GET /exports/line-items - Arrow IPC filtrado por datas"""
+    response = client.get("/exports/line-items", params={
+        "format": "arrow",
+        "start_date": "2025-02-01",
+        "end_date": "2025-02-28"
+    })
+
+    assert response.status_code == status.HTTP_200_OK
+    table = pa.ipc.open_file(pa.py_buffer(response.content)).read_all()
+    assert table.num_rows == 1
+
+
+def test_write_partitioned_line_items(db, line_items, tmp_path):
+    """Dataset particionado por mês: um ficheiro por mês"""
+    files = export_services.write_partitioned_line_items(db, tmp_path, partition_by="month", batch_size=2)
+
+    assert [f.relative_to(tmp_path).parent.as_posix() for f in files] == [
+        "purchase_year=2025/purchase_month=01",
+        "purchase_year=2025/purchase_month=02",
+    ]
+    assert pq.read_table(files[0]).num_rows == 2
@@ -0,0 +1,62 @@
+# tests/test_idempotency.py
+
+import pytest
+
+from src import idempotency
+from src.models.idempotency_key import IdempotencyKey
+from tests.conftest import TestingSessionLocal
+
+
+@pytest.fixture
+def merchant(client, monkeypatch):
+    monkeypatch.setattr(idempotency, "SessionLocal", TestingSessionLocal)
+    return client.post("/merchants/", json={"name": "Retry Shop", "location": "Coimbra"}).json()["id"]
+
+
+def test_retry_with_same_key_returns_stored_response(client, db, merchant):
+    """Repetir o POST com a mesma Idempotency-Key devolve a primeira resposta sem criar outro recibo"""
+    payload = {"merchant_id": merchant, "purchase_date": "2025-05-05"}
+    headers = {"Idempotency-Key": "receipt-1"}
+
+    first = client.post("/receipts/", json=payload, headers=headers)
+    retry = client.post("/receipts/", json=payload, headers=headers)
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.json() == first.json()
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+    assert len(client.get("/receipts/").json()) == 1
+
+    # Mesma chave com outro pedido -> 422; outra chave cria normalmente
+    other = client.post("/receipts/", json={**payload, "notes": "x"}, headers=headers)
+    assert other.status_code == 422
+    assert client.post("/receipts/", json=payload, headers={"Idempotency-Key": "receipt-2"}).status_code == 201
+
+
+def test_failed_request_is_not_stored(client, db, merchant):
+    """Um pedido que falha liberta a chave: a repetição corre de novo"""
+    headers = {"Idempotency-Key": "receipt-bad"}
+    bad = client.post("/receipts/", json={"merchant_id": 9999, "purchase_date": "2025-05-05"}, headers=headers)
+    assert bad.status_code == 400
+    assert db.query(IdempotencyKey).count() == 0
+
+    good = client.post("/receipts/", json={"merchant_id": 9999, "purchase_date": "2025-05-05"}, headers=headers)
+    assert good.status_code == 400 and "idempotent-replayed" not in good.headers
+
+
+def test_failure_after_commit_keeps_stored_response(client, db, merchant, monkeypatch):
+    """A resposta é gravada com o recibo: uma falha depois do commit não liberta a chave"""
+    from src.services import crud_receipt
+
+    def fail(*args):
+        raise RuntimeError("notify failed")
+
+    monkeypatch.setattr(crud_receipt.analytics_snapshot, "notify_receipts_changed", fail)
+    payload = {"merchant_id": merchant, "purchase_date": "2025-05-06"}
+    headers = {"Idempotency-Key": "receipt-after-commit"}
+
+    assert client.post("/receipts/", json=payload, headers=headers).status_code == 500
+    retry = client.post("/receipts/", json=payload, headers=headers)
+    assert retry.status_code == 201
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert len(client.get("/receipts/").json()) == 1
@@ -0,0 +1,94 @@
+# tests/test_master_data.py
+
+from sqlalchemy import event, insert, update
+
+from src.models.category import Category
+from src.models.merchant import Merchant
+from src.services import master_data, table_versions
+from src.settings import settings
+from tests.conftest import engine
+
+
+def _selects_during(action):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        result = action()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return result, [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+
+
+def test_master_data_served_from_cache(client, test_category, test_unit, monkeypatch):
+    """Categorias, unidades e comerciantes vêm da cache; uma escrita local invalida-a"""
+    monkeypatch.setattr(settings, "master_data_check_seconds", 60)
+    merchant = client.post("/merchants/", json={"name": "Cache Shop", "location": "Faro"}).json()["id"]
+    product = client.post("/products/", json={
+        "name": "Cache Product", "category_id": test_category, "measurement_unit_id": test_unit
+    }).json()["id"]
+    client.get(f"/merchants/{merchant}")
+
+    response, selects = _selects_during(lambda: client.get(f"/categories/{test_category}"))
+    assert response.json()["name"] == "Test Category"
+    assert selects == []
+
+    response, selects = _selects_during(lambda: client.post("/receipts/", json={
+        "merchant_id": merchant, "purchase_date": "2025-05-01",
+        "products": [{"product_list_id": product, "price": "1.00", "quantity": "1"}],
+    }))
+    assert response.status_code == 201
+    assert response.json()["products"][0]["product_list"]["measurement_unit"]["id"] == test_unit
+    assert not any("FROM merchants" in s or "FROM category" in s or "FROM measurement_unit" in s for s in selects)
+
+    # Escrita neste processo: a cache é recarregada no pedido seguinte
+    client.put(f"/categories/{test_category}", json={"name": "Renamed Category"})
+    assert client.get(f"/products/{product}").json()["category"]["name"] == "Renamed Category"
+
+
+def test_master_data_reloaded_when_versions_change(client, test_category, monkeypatch):
+    """Uma escrita de outro worker (sem eventos da sessão) é vista pelos contadores de versão"""
+    monkeypatch.setattr(settings, "master_data_check_seconds", 0)
+    assert client.get(f"/categories/{test_category}").json()["name"] == "Test Category"
+
+    # Outro processo: escreve diretamente na BD e incrementa o contador
+    with engine.begin() as connection:
+        connection.execute(update(Category).where(Category.id == test_category).values(name="Other Worker"))
+        table_versions.bump(connection, ["category"])
+
+    assert client.get(f"/categories/{test_category}").json()["name"] == "Other Worker"
+
+
+def test_row_missing_from_cache_is_queried(client, test_category, monkeypatch):
+    """Um comerciante criado por outro worker, ainda fora da cache, é procurado na BD"""
+    monkeypatch.setattr(settings, "master_data_check_seconds", 60)
+    assert client.get(f"/categories/{test_category}").status_code == 200
+
+    with engine.begin() as connection:
+        merchant = connection.execute(
+            insert(Merchant).values(name="Other Worker Shop", location="Porto").returning(Merchant.id)
+        ).scalar_one()
+        table_versions.bump(connection, ["merchants"])
+
+    response = client.post("/receipts/", json={"merchant_id": merchant, "purchase_date": "2025-05-02"})
+    assert response.status_code == 201
+    assert response.json()["merchant"]["name"] == "Other Worker Shop"
+    receipt = response.json()["id"]
+    bulk = client.post("/receipts/bulk", json={"operations": [
+        {"action": "update", "receipt_ids": [receipt], "values": {"merchant_id": merchant}}
+    ]})
+    assert bulk.status_code == 200
+
+
+def test_savepoint_rollback_keeps_pending_writes(db, test_category, monkeypatch):
+    """Um rollback de savepoint não esquece as escritas pendentes da transação exterior"""
+    monkeypatch.setattr(settings, "master_data_check_seconds", 60)
+    master_data.get(db, Category, test_category)
+    db.get(Category, test_category).name = "Pending Rename"
+    db.flush()
+    with db.begin_nested() as savepoint:
+        savepoint.rollback()
+
+    assert master_data.get(db, Category, test_category).name == "Pending Rename"
+    db.commit()
+    assert master_data.get(db, Category, test_category).name == "Pending Rename"
@@ -0,0 +1,25 @@
+# tests/test_money.py
+
+from decimal import Decimal
+
+from src.services import money
+
+
+def test_line_total_cents_rounds_half_up():
+    """Cada linha é arredondada ao cêntimo (half-up) uma única vez"""
+    assert money.line_total_cents(Decimal("1.2500"), Decimal("2.0000")) == 250
+    assert money.line_total_cents(Decimal("0.0050"), Decimal("1")) == 1      # 0.005 -> 0.01
+    assert money.line_total_cents(Decimal("0.0049"), Decimal("1")) == 0
+    assert money.line_total_cents(Decimal("1.2345"), Decimal("3")) == 370    # 3.7035 -> 3.70
+    assert money.line_total_cents(Decimal("9999.9999"), Decimal("0.0001")) == 100
+
+
+def test_sum_and_conversions():
+    """Soma de linhas arredondadas e conversões cents <-> Decimal"""
+    lines = [(Decimal("0.3333"), Decimal("1")), (Decimal("0.3333"), Decimal("1"))]
+    assert money.sum_line_totals_cents(lines) == 66
+
+    assert money.to_cents("2.675") == 268
+    assert money.to_units(1.5) == 15000
+    assert money.cents_to_decimal(370) == Decimal("3.70")
+    assert str(money.cents_to_decimal(5)) == "0.05"
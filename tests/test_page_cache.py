@@ -0,0 +1,47 @@
+# tests/test_page_cache.py
+
+import gzip
+import os
+
+from starlette.datastructures import Headers
+
+from src.page_cache import PageCache
+
+HTML = b"<html><body>" + b"<p>Infinexpense</p>" * 100 + b"</body></html>"
+
+
+def test_pages_served_from_memory(client):
+    """Páginas e templates vêm da cache em memória, com ETag e 304; página inexistente -> 404"""
+    response = client.get("/receipt/list.html", headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/html")
+    etag = response.headers["etag"]
+
+    cached = client.get("/receipt/list.html", headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+    assert cached.status_code == 304
+
+    assert client.get("/static/templates/header.html").status_code == 200
+    assert client.get("/").text == client.get("/index.html").text
+    assert client.get("/receipt/missing.html").status_code == 404
+
+
+def test_precompressed_and_reload(tmp_path):
+    """Variantes comprimidas negociadas por Accept-Encoding; alterações no disco são detetadas"""
+    (tmp_path / "receipt").mkdir()
+    page = tmp_path / "receipt" / "list.html"
+    page.write_bytes(HTML)
+    cache = PageCache(tmp_path)
+    assert cache.build() == 1
+
+    response = cache.response("receipt/list.html", Headers({"accept-encoding": "gzip"}))
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(response.body) == HTML
+    assert cache.refresh_if_changed() is False
+
+    page.write_bytes(HTML + b"<!-- v2 -->")
+    stat = page.stat()
+    os.utime(page, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    (tmp_path / "new.html").write_bytes(b"<p>new</p>")
+    assert cache.refresh_if_changed() is True
+    assert cache.get("receipt/list.html").body.endswith(b"<!-- v2 -->")
+    assert cache.get("new.html").encoded == {}
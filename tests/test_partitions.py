@@ -0,0 +1,20 @@
+# tests/test_partitions.py
+
+from datetime import date
+
+from src.services import partition_services
+
+
+def test_month_helpers():
+    """Limites mensais das partições, incluindo a passagem de ano"""
+    assert partition_services.month_start(date(2025, 3, 17)) == date(2025, 3, 1)
+    assert partition_services.add_months(date(2025, 11, 30), 1) == date(2025, 12, 1)
+    assert partition_services.add_months(date(2025, 12, 5), 1) == date(2026, 1, 1)
+    assert partition_services.add_months(date(2025, 1, 1), -1) == date(2024, 12, 1)
+
+
+def test_partition_names():
+    """Nome da partição <-> mês (a DEFAULT não tem mês)"""
+    assert partition_services.partition_name("receipts", date(2025, 1, 31)) == "receipts_p2025_01"
+    assert partition_services.partition_month("product_p2025_01") == date(2025, 1, 1)
+    assert partition_services.partition_month("product_default") is None
@@ -131,3 +131,36 @@ def test_create_duplicate_name_fails(client: TestClient, test_category, test_uni
     
     assert response.status_code == status.HTTP_409_CONFLICT
     assert "already exists" in response.json()["detail"]
+
+
+def test_search_products(client: TestClient, test_category, test_unit):
+    """GET /products/search - pesquisa por nome ou início do barcode, ordenada pelo tipo de correspondência"""
+    ids = {}
+    for name, barcode in [
+        ("Banana", "5601000000011"),
+        ("Banana Split", None),
+        ("Madeira Banana", "5601000000028"),
+        ("Pera Rocha", "1560100000000"),
+    ]:
+        ids[name] = client.post("/products/", json={
+            "name": name, "barcode": barcode, "category_id": test_category, "measurement_unit_id": test_unit
+        }).json()["id"]
+
+    # nome igual, depois prefixo do nome, depois uma palavra do nome
+    response = client.get("/products/search", params={"q": "banana"})
+    assert response.status_code == status.HTTP_200_OK
+    assert [p["id"] for p in response.json()] == [ids["Banana"], ids["Banana Split"], ids["Madeira Banana"]]
+    assert response.json()[0]["category"]["id"] == test_category
+
+    # prefixo do barcode
+    results = client.get("/products/search", params={"q": "5601"}).json()
+    assert [p["name"] for p in results] == ["Banana", "Madeira Banana"]
+    assert client.get("/products/search", params={"q": "ba", "limit": 1}).json()[0]["name"] == "Banana"
+
+    # o índice acompanha as alterações aos produtos
+    client.put(f"/products/{ids['Pera Rocha']}", json={"name": "Banana da Terra"})
+    assert ids["Pera Rocha"] in [p["id"] for p in client.get("/products/search", params={"q": "terra"}).json()]
+
+    assert client.get("/products/search", params={"q": "kiwi"}).json() == []
+    assert client.get("/products/search", params={"q": " "}).status_code == status.HTTP_400_BAD_REQUEST
+    assert client.get("/products/search").status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
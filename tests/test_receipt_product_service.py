@@ -4,6 +4,7 @@ Tests the business logic for creating, reading, updating, and deleting products
 """
 
 import pytest
+from datetime import date
 from decimal import Decimal
 from src.services.crud_receipt_product import ReceiptProductService
 from src.schemas.product import ProductCreate, ProductUpdate
@@ -70,6 +71,22 @@ class TestReceiptProductServiceCreate:
         assert result.description == "Test item"
         assert result.receipt_id == test_receipt_for_products
         assert result.product_list_id == test_product_for_receipt
+        # Coluna gerada: price * quantity arredondado ao cêntimo
+        assert result.line_total == Decimal("11.98")
+        # Cópia da data do recibo (chave de partição)
+        assert result.purchase_date == date(2023, 11, 20)
+
+    def test_receipt_date_change_updates_items(self, client, db, test_product_for_receipt, test_receipt_for_products):
+        """Mudar a data do recibo atualiza a purchase_date dos itens"""
+        item = ReceiptProductService.create_product_item_for_receipt(db, test_receipt_for_products, ProductCreate(
+            price=Decimal("1.00"), quantity=Decimal("1"), product_list_id=test_product_for_receipt
+        ))
+
+        response = client.put(f"/receipts/{test_receipt_for_products}", json={"purchase_date": "2024-02-29"})
+        assert response.status_code == 200
+
+        db.refresh(item)
+        assert item.purchase_date == date(2024, 2, 29)
 
 
 class TestReceiptProductServiceRead:
@@ -4,6 +4,8 @@ from fastapi import status
 from fastapi.testclient import TestClient
 import pytest
 
+from src.models.receipt_product import Product
+
 
 @pytest.fixture
 def test_merchant(client):
@@ -146,3 +148,121 @@ def test_create_receipt_invalid_merchant(client: TestClient):
     
     # O service lança ValueError -> Router retorna 400 Bad Request
     assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_create_receipt_with_items(client: TestClient, test_merchant, test_category, test_unit):
+    """POST /receipts com itens - tudo numa transação; um product_list_id inválido não grava nada"""
+    product = client.post("/products/", json={
+        "name": "Nested Product", "category_id": test_category, "measurement_unit_id": test_unit
+    }).json()["id"]
+    payload = {
+        "merchant_id": test_merchant,
+        "purchase_date": "2024-02-10",
+        "products": [
+            {"product_list_id": product, "price": "1.25", "quantity": "3"},
+            {"product_list_id": product, "price": "0.99", "quantity": "1.5", "description": "promo"},
+        ],
+    }
+    response = client.post("/receipts/", json=payload)
+
+    assert response.status_code == status.HTTP_201_CREATED
+    data = response.json()
+    assert data["total_price"] == 5.24  # 3.75 + 1.49 (arredondado ao cêntimo)
+    assert [item["product_list"]["name"] for item in data["products"]] == ["Nested Product"] * 2
+    assert client.get(f"/receipts/{data['id']}").json() == data
+
+    payload["products"].append({"product_list_id": 9999, "price": "1", "quantity": "1"})
+    response = client.post("/receipts/", json=payload)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "9999" in response.json()["detail"]
+    assert len(client.get("/receipts/").json()) == 1
+
+
+def test_update_receipt_products_writes_only_changes(client: TestClient, test_merchant, test_category, test_unit):
+    """PUT /receipts/{id}/products - só as diferenças são escritas e os itens mantidos conservam o id"""
+    apple, pear = (
+        client.post("/products/", json={
+            "name": name, "category_id": test_category, "measurement_unit_id": test_unit
+        }).json()["id"]
+        for name in ("Diff Apple", "Diff Pear")
+    )
+    receipt = client.post("/receipts/", json={
+        "merchant_id": test_merchant,
+        "purchase_date": "2024-03-01",
+        "products": [
+            {"product_list_id": apple, "price": "1.00", "quantity": "2", "description": "promo"},
+            {"product_list_id": apple, "price": "1.50", "quantity": "1"},
+            {"product_list_id": pear, "price": "0.80", "quantity": "3"},
+        ],
+    }).json()
+    first, second, third = (item["id"] for item in receipt["products"])
+
+    # Mesma lista sem ids, só uma quantidade alterada; a pera sai e entra outra maçã
+    response = client.put(f"/receipts/{receipt['id']}/products", json={"products": [
+        {"product_list_id": apple, "price": 1, "quantity": 2},
+        {"product_list_id": apple, "price": 1.5, "quantity": 4},
+        {"product_list_id": apple, "price": 2, "quantity": 1},
+    ]})
+    assert response.status_code == 200
+    data = response.json()
+    changes = data["changes"]
+    assert changes["unchanged"] == [first] and changes["updated"] == [second] and changes["deleted"] == [third]
+    assert len(changes["inserted"]) == 1
+    assert [item["id"] for item in data["products"]] == [first, second, changes["inserted"][0]]
+    # A descrição não enviada é mantida
+    assert data["products"][0]["description"] == "promo"
+    assert data["total_price"] == 10.0
+
+    # Sem alterações: nada é escrito
+    same = client.put(f"/receipts/{receipt['id']}/products", json={"products": [
+        {"id": item["id"], "product_list_id": apple, "price": item["price"], "quantity": item["quantity"]}
+        for item in data["products"]
+    ]})
+    assert same.json()["changes"]["unchanged"] == [item["id"] for item in data["products"]]
+
+    # id de outro recibo -> 400
+    response = client.put(f"/receipts/{receipt['id']}/products", json={"products": [
+        {"id": 9999, "product_list_id": apple, "price": 1, "quantity": 1}
+    ]})
+    assert response.status_code == 400
+
+
+def test_bulk_receipt_operations(client: TestClient, db, test_merchant, test_category, test_unit):
+    """POST /receipts/bulk - updates/deletes em massa numa transação, com resultado por recibo"""
+    other_merchant = client.post("/merchants/", json={"name": "Bulk Shop", "location": "Porto"}).json()["id"]
+    product = client.post("/products/", json={
+        "name": "Bulk Product", "category_id": test_category, "measurement_unit_id": test_unit
+    }).json()["id"]
+    ids = [
+        client.post("/receipts/", json={
+            "merchant_id": test_merchant, "purchase_date": "2024-05-01",
+            "products": [{"product_list_id": product, "price": "1", "quantity": "1"}],
+        }).json()["id"]
+        for _ in range(3)
+    ]
+
+    response = client.post("/receipts/bulk", json={"operations": [
+        {"action": "update", "receipt_ids": ids[:2], "values": {"purchase_date": "2024-06-15", "merchant_id": other_merchant}},
+        {"action": "delete", "receipt_ids": [ids[2], 9999]},
+        {"action": "update", "receipt_ids": [ids[2]], "values": {"purchase_date": "2024-07-01"}},
+    ]})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["updated"] == 2 and data["deleted"] == 1
+    assert [(r["operation"], r["status"]) for r in data["results"]] == [
+        (0, "updated"), (0, "updated"), (1, "deleted"), (1, "not_found"), (2, "not_found")
+    ]
+
+    updated = client.get(f"/receipts/{ids[0]}").json()
+    assert updated["purchase_date"] == "2024-06-15" and updated["merchant"]["id"] == other_merchant
+    assert client.get(f"/receipts/{ids[2]}").status_code == 404
+    # Itens do recibo apagado removidos pela BD (ON DELETE CASCADE)
+    assert db.query(Product).filter(Product.receipt_id == ids[2]).count() == 0
+
+    # Operação inválida: nada é aplicado
+    response = client.post("/receipts/bulk", json={"operations": [
+        {"action": "delete", "receipt_ids": [ids[0]]},
+        {"action": "update", "receipt_ids": [ids[1]], "values": {"merchant_id": 9999}},
+    ]})
+    assert response.status_code == 400
+    assert client.get(f"/receipts/{ids[0]}").status_code == 200
@@ -0,0 +1,105 @@
+# tests/test_responses.py
+
+from decimal import Decimal
+
+import pytest
+
+from sqlalchemy import event
+
+from src.responses import FastJSONResponse
+from src.settings import settings
+from tests.conftest import engine
+
+
+@pytest.fixture
+def receipt_with_items(client, test_category, test_unit):
+    merchant = client.post("/merchants/", json={"name": "Fast Shop", "location": "Porto"}).json()["id"]
+    product = client.post("/products/", json={
+        "name": "Fast Product", "category_id": test_category, "measurement_unit_id": test_unit
+    }).json()["id"]
+    receipt = client.post("/receipts/", json={"merchant_id": merchant, "purchase_date": "2025-03-01"}).json()["id"]
+    response = client.put(f"/receipts/{receipt}/products", json={"products": [
+        {"product_list_id": product, "price": "1.2500", "quantity": "3", "description": "promo"},
+        {"product_list_id": product, "price": "0.99", "quantity": "1.5"},
+    ]})
+    assert response.status_code == 200
+    return receipt, product, merchant
+
+
+@pytest.mark.parametrize("url", [
+    "/receipts/", "/receipts/{receipt}", "/receipts/merchant/{merchant}", "/products/", "/products/{product}",
+    "/receipts/?ids={receipt}", "/products/?ids={product}", "/merchants/?ids={merchant}",
+])
+def test_fast_path_matches_default(client, receipt_with_items, monkeypatch, url):
+    """O caminho rápido devolve exatamente o mesmo JSON que o caminho do FastAPI (response_model)"""
+    receipt, product, merchant = receipt_with_items
+    url = url.format(receipt=receipt, product=product, merchant=merchant)
+
+    monkeypatch.setattr(settings, "fast_json_enabled", False)
+    default = client.get(url)
+    monkeypatch.setattr(settings, "fast_json_enabled", True)
+    fast = client.get(url)
+
+    assert fast.status_code == default.status_code == 200
+    assert fast.headers["content-type"] == "application/json"
+    assert fast.json() == default.json()
+
+
+def test_fast_json_response_decimals():
+    """FastJSONResponse converte Decimal como o jsonable_encoder (inteiro ou float)"""
+    body = FastJSONResponse({"total": Decimal("12.50"), "count": Decimal("3"), 1: "a"}).body
+    assert body.replace(b" ", b"") == b'{"total":12.5,"count":3,"1":"a"}'
+
+
+def test_sparse_fieldsets(client, receipt_with_items):
+    """fields=/expand= devolvem só os campos pedidos, com o mesmo formato da resposta completa"""
+    receipt, product, merchant = receipt_with_items
+    full = client.get(f"/receipts/{receipt}").json()
+
+    sparse = client.get("/receipts/", params={"fields": "id,purchase_date,total_price"}).json()
+    assert sparse == [{"id": receipt, "purchase_date": "2025-03-01", "total_price": full["total_price"]}]
+
+    nested = client.get(f"/receipts/merchant/{merchant}", params={
+        "fields": "total_price,merchant.name,products.price", "expand": "products.product_list.category"
+    }).json()[0]
+    assert nested["merchant"] == {"id": merchant, "name": "Fast Shop"}
+    assert [item["price"] for item in nested["products"]] == [item["price"] for item in full["products"]]
+    assert nested["products"][0]["product_list"]["category"] == full["products"][0]["product_list"]["category"]
+    assert "measurement_unit" not in nested["products"][0]["product_list"]
+    assert set(nested) == {"id", "total_price", "merchant", "products"}
+
+    products = client.get("/products/", params={"fields": "name", "expand": "category"}).json()
+    assert products[0].keys() == {"id", "name", "category"}
+
+    assert client.get("/receipts/", params={"fields": "id,nope"}).status_code == 400
+    assert client.get("/products/", params={"expand": "receipts"}).status_code == 400
+
+
+def test_batch_fetch_by_ids(client, receipt_with_items, monkeypatch):
+    """ids= devolve {id: objeto} com uma query por relação, independentemente do número de ids"""
+    # Sem verificação das versões dos dados mestre durante o teste
+    monkeypatch.setattr(settings, "master_data_check_seconds", 60)
+    receipt, product, merchant = receipt_with_items
+    other = client.post("/receipts/", json={"merchant_id": merchant, "purchase_date": "2025-03-02"}).json()["id"]
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        response = client.get("/receipts/", params={"ids": f"{other},{receipt},9999,{receipt}"})
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert list(body) == [str(other), str(receipt)]
+    assert body[str(receipt)] == client.get(f"/receipts/{receipt}").json()
+    # receipts, items, products (merchants, categories and units come from the master data cache)
+    assert len([s for s in statements if s.lstrip().upper().startswith("SELECT")]) == 3
+
+    assert client.get("/products/", params={"ids": f"{product}", "fields": "name"}).json() == {
+        str(product): {"id": product, "name": "Fast Product"}
+    }
+    assert client.get("/merchants/", params={"ids": "9999"}).json() == {}
+    assert client.get("/merchants/", params={"ids": "1,abc"}).status_code == 400
+    assert client.get("/products/", params={"ids": ",".join(map(str, range(1, 1002)))}).status_code == 400
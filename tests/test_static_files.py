@@ -0,0 +1,70 @@
+# tests/test_static_files.py
+
+import gzip
+import os
+from pathlib import Path
+
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+from src.scripts import compress_static
+from src.static_files import CachedStaticFiles
+
+UPLOAD = next(p for p in (Path(__file__).resolve().parent.parent / "uploads" / "products").iterdir() if p.is_file())
+
+
+def test_asset_etag_and_not_modified(client):
+    """Assets do frontend: ETag pelo conteúdo, revalidação com 304 sem corpo"""
+    response = client.get("/css/buttons.css", headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "no-cache"
+    etag = response.headers["etag"]
+
+    cached = client.get("/css/buttons.css", headers={"If-None-Match": etag, "Accept-Encoding": "identity"})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+
+
+def test_upload_immutable_and_ranges(client):
+    """Uploads: Cache-Control imutável e pedidos parciais (Range)"""
+    url = f"/uploads/products/{UPLOAD.name}"
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+
+    partial = client.get(url, headers={"Range": "bytes=0-99"})
+    assert partial.status_code == 206
+    assert partial.content == UPLOAD.read_bytes()[:100]
+    assert partial.headers["content-range"] == f"bytes 0-99/{UPLOAD.stat().st_size}"
+
+
+def test_precompressed_assets(tmp_path):
+    """Serve o .br/.gz gerado pelo script conforme Accept-Encoding; sem sibling atualizado serve o original"""
+    css = b"body { color: red; }\n" * 200
+    (tmp_path / "app.css").write_bytes(css)
+    stats = compress_static.compress_directory(tmp_path)
+    assert stats["assets"] == 1 and (tmp_path / "app.css.gz").exists()
+
+    app = Starlette(routes=[Mount("/s", CachedStaticFiles(directory=tmp_path, content_etags=True, precompressed=True))])
+    client = TestClient(app)
+
+    gzipped = client.get("/s/app.css", headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzipped.headers["content-type"].startswith("text/css")
+    assert gzipped.headers["vary"] == "Accept-Encoding"
+    assert gzipped.content == css  # descomprimido pelo cliente
+    assert int(gzipped.headers["content-length"]) == len(gzip.compress(css, compresslevel=9, mtime=0))
+
+    identity = client.get("/s/app.css", headers={"Accept-Encoding": "gzip;q=0, identity"})
+    assert "content-encoding" not in identity.headers
+    assert identity.headers["etag"] != gzipped.headers["etag"]
+
+    # Fonte alterada depois da compressão: o sibling desatualizado é ignorado
+    (tmp_path / "app.css").write_bytes(css + b"p {}\n")
+    future = os.stat(tmp_path / "app.css.gz").st_mtime_ns + 10**9
+    os.utime(tmp_path / "app.css", ns=(future, future))
+    stale = client.get("/s/app.css", headers={"Accept-Encoding": "gzip, br"})
+    assert "content-encoding" not in stale.headers
+    assert stale.content.endswith(b"p {}\n")
@@ -0,0 +1,72 @@
+# tests/test_upload_gc.py
+
+import os
+import time
+
+import pytest
+
+from src.models.product import ProductList
+from src.models.stored_file import StoredFile
+from src.services import storage_services, upload_gc_services
+
+OLD = time.time() - 3 * 24 * 60 * 60
+
+
+@pytest.fixture
+def uploads(tmp_path, monkeypatch, db, test_category, test_unit):
+    """Pasta de uploads temporária com ficheiros referenciados, órfãos e recentes."""
+    monkeypatch.setattr(storage_services, "BASE_DIR", tmp_path)
+    root = tmp_path / "uploads"
+    files = {
+        "products/used.png": b"a" * 100,
+        "products/used_thumb.png": b"b" * 10,
+        "products/old.png": b"c" * 1000,
+        "products/old_thumb_webp.webp": b"d" * 50,
+        "blobs/ab/ab12.jpg": b"e" * 200,
+        "blobs/cd/cd34.jpg": b"f" * 300,
+        "blobs/cd/.upload-x.part": b"g" * 5,
+    }
+    for name, content in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+        os.utime(path, (OLD, OLD))
+
+    # Ficheiro órfão mas recente: protegido pelo período de graça
+    (root / "products" / "new.png").write_bytes(b"h" * 7)
+
+    db.add(ProductList(
+        name="GC Product", category_id=test_category, measurement_unit_id=test_unit,
+        product_list_photo="/uploads/products/used.png"
+    ))
+    db.add(StoredFile(sha256="ab12", path="/uploads/blobs/ab/ab12.jpg", content_type="image/jpeg",
+                      size_bytes=200, ref_count=1))
+    db.commit()
+    return root
+
+
+def remaining(root):
+    return sorted(p.relative_to(root).as_posix() for p in root.rglob("*") if p.is_file())
+
+
+def test_gc_deletes_orphans(db, uploads):
+    """Apaga só os ficheiros não referenciados e antigos, e conta os bytes recuperados"""
+    dry = upload_gc_services.collect_orphans(db, grace_seconds=60 * 60, dry_run=True, batch_size=2)
+    assert dry.orphans == 4 and dry.reclaimed_bytes == 1000 + 50 + 300 + 5
+    assert len(remaining(uploads)) == 8
+
+    report = upload_gc_services.collect_orphans(db, grace_seconds=60 * 60, batch_size=2)
+    assert report.scanned == 8 and report.recent == 1
+    assert report.removed == 4 and report.reclaimed_bytes == 1355
+    assert remaining(uploads) == [
+        "blobs/ab/ab12.jpg", "products/new.png", "products/used.png", "products/used_thumb.png"
+    ]
+
+
+def test_gc_quarantine(db, uploads):
+    """Em quarentena os órfãos são movidos (mesma estrutura) para fora de uploads/"""
+    report = upload_gc_services.collect_orphans(db, grace_seconds=60 * 60, quarantine=True)
+    assert report.removed == 4
+    assert remaining(upload_gc_services.quarantine_directory()) == [
+        "blobs/cd/.upload-x.part", "blobs/cd/cd34.jpg", "products/old.png", "products/old_thumb_webp.webp"
+    ]
@@ -0,0 +1,133 @@
+# tests/test_uploads.py
+
+from io import BytesIO
+
+import pytest
+
+from src.models.stored_file import StoredFile
+from src.services import file_services, image_services, storage_services
+from tests.conftest import TestingSessionLocal
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 1024
+
+
+@pytest.fixture
+def upload_dirs(tmp_path, monkeypatch):
+    """Redireciona as pastas de uploads para uma pasta temporária."""
+    monkeypatch.setattr(storage_services, "BASE_DIR", tmp_path)
+    monkeypatch.setattr(storage_services, "BLOB_DIRECTORY", tmp_path / "uploads" / "blobs")
+    return tmp_path / "uploads"
+
+
+def blob_files(upload_dirs):
+    return sorted(p.name for p in (upload_dirs / "blobs").rglob("*") if p.is_file())
+
+
+@pytest.fixture
+def product_list(client, test_category, test_unit):
+    response = client.post("/products/", json={
+        "name": "Upload Product", "category_id": test_category, "measurement_unit_id": test_unit
+    })
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def test_upload_product_photo_replaces_old_file(client, upload_dirs, product_list):
+    """Upload em streaming: grava o ficheiro, atualiza a BD e apaga a foto antiga"""
+    first = client.post(f"/uploads/product-list/{product_list}/photo", files={"file": ("a.png", PNG, "image/png")})
+    assert first.status_code == 200
+    first_path = upload_dirs.parent / first.json()["product_list_photo"].lstrip("/")
+    assert first_path.read_bytes() == PNG
+
+    second = client.post(
+        f"/uploads/product-list/{product_list}/photo", files={"file": ("b.png", PNG + b"\x01", "image/png")}
+    )
+    assert second.status_code == 200
+    assert not first_path.exists()
+    # Sem ficheiros temporários deixados para trás
+    assert blob_files(upload_dirs) == [second.json()["product_list_photo"].split("/")[-1]]
+
+
+def test_upload_receipt_photo_too_large(client, upload_dirs, monkeypatch):
+    """Ficheiro acima do limite é rejeitado e não fica nada no disco"""
+    merchant = client.post("/merchants/", json={"name": "Upload Shop", "location": "Lisboa"}).json()["id"]
+    receipt = client.post("/receipts/", json={"merchant_id": merchant, "purchase_date": "2025-01-10"}).json()["id"]
+    monkeypatch.setattr(file_services, "MAX_FILE_SIZE", 512)
+
+    response = client.post(f"/uploads/receipt/{receipt}/photo", files={"file": ("r.png", PNG, "image/png")})
+    assert response.status_code == 400
+    assert "too large" in response.json()["detail"]
+    assert blob_files(upload_dirs) == []
+    assert client.get(f"/receipts/{receipt}").json()["receipt_photo"] is None
+
+
+def test_upload_same_bytes_is_stored_once(client, db, upload_dirs, product_list, test_category, test_unit):
+    """Mesmo conteúdo -> mesmo ficheiro com ref_count; só é apagado quando deixa de ser usado"""
+    other = client.post("/products/", json={
+        "name": "Other Upload Product", "category_id": test_category, "measurement_unit_id": test_unit
+    }).json()["id"]
+
+    first = client.post(f"/uploads/product-list/{product_list}/photo", files={"file": ("a.png", PNG, "image/png")})
+    second = client.post(f"/uploads/product-list/{other}/photo", files={"file": ("copy.png", PNG, "image/png")})
+    path = first.json()["product_list_photo"]
+    assert path.startswith("/uploads/blobs/") and second.json()["product_list_photo"] == path
+    assert db.query(StoredFile).filter(StoredFile.path == path).one().ref_count == 2
+    assert len(blob_files(upload_dirs)) == 1
+
+    # Um dos produtos deixa de usar a foto: o ficheiro fica
+    client.put(f"/products/{other}", json={"product_list_photo": None})
+    db.expire_all()
+    assert db.query(StoredFile).filter(StoredFile.path == path).one().ref_count == 1
+    assert (upload_dirs.parent / path.lstrip("/")).exists()
+
+    # O último também: o ficheiro e a linha desaparecem
+    client.delete(f"/products/{product_list}")
+    db.expire_all()
+    assert db.query(StoredFile).filter(StoredFile.path == path).first() is None
+    assert blob_files(upload_dirs) == []
+
+
+def test_upload_invalid_type_and_missing_entity(client, upload_dirs, product_list):
+    """Tipo inválido -> 400; produto inexistente -> 404"""
+    response = client.post(f"/uploads/product-list/{product_list}/photo", files={"file": ("x.txt", b"hi", "text/plain")})
+    assert response.status_code == 400
+
+    response = client.post("/uploads/product-list/9999/photo", files={"file": ("a.png", PNG, "image/png")})
+    assert response.status_code == 404
+
+
+def test_upload_generates_variants(client, db, upload_dirs, product_list, monkeypatch):
+    """Depois da resposta são geradas as variantes (thumb/medium/WebP) e gravadas no modelo"""
+    Image = pytest.importorskip("PIL.Image")
+
+    monkeypatch.setattr(image_services, "SessionLocal", TestingSessionLocal)
+    buffer = BytesIO()
+    Image.new("RGB", (1600, 1200), (200, 30, 30)).save(buffer, format="JPEG")
+
+    response = client.post(
+        f"/uploads/product-list/{product_list}/photo", files={"file": ("big.jpg", buffer.getvalue(), "image/jpeg")}
+    )
+    assert response.status_code == 200
+
+    # O TestClient corre as background tasks antes de devolver a resposta
+    variants = client.get(f"/products/{product_list}").json()["product_list_photo_variants"]
+    assert set(variants) == set(image_services.VARIANTS)
+    with Image.open(upload_dirs.parent / variants["thumb_webp"].lstrip("/")) as thumb:
+        assert thumb.format == "WEBP" and max(thumb.size) == 200
+    with Image.open(upload_dirs.parent / variants["medium"].lstrip("/")) as medium:
+        assert medium.format == "JPEG" and medium.size == (800, 600)
+
+
+def test_delete_keeps_blob_reused_meanwhile(client, db, upload_dirs, product_list, monkeypatch):
+    """Se um upload dos mesmos bytes regista a referência durante a remoção, o ficheiro é reposto"""
+    path = client.post(
+        f"/uploads/product-list/{product_list}/photo", files={"file": ("a.png", PNG, "image/png")}
+    ).json()["product_list_photo"]
+    db.query(StoredFile).filter(StoredFile.path == path).delete()
+    db.commit()
+
+    # Sem referência na primeira verificação; o upload concorrente faz commit antes da segunda
+    checks = iter([False, True])
+    monkeypatch.setattr(storage_services, "_is_referenced", lambda db, url: next(checks))
+    assert storage_services.delete_unreferenced(db, [path]) == []
+    assert blob_files(upload_dirs) == [path.split("/")[-1]]